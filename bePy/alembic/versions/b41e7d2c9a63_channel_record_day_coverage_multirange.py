@@ -0,0 +1,52 @@
+"""channel record day coverage multirange
+
+Revision ID: b41e7d2c9a63
+Revises: 9c08c94ca10e
+Create Date: 2026-10-18 09:12:40.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e7d2c9a63'
+down_revision: Union[str, Sequence[str], None] = '9c08c94ca10e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # tsmultirange / range_agg cần PostgreSQL >= 14
+    op.add_column('channel_record_days', sa.Column('coverage', postgresql.TSMULTIRANGE(), nullable=True))
+
+    # backfill từ các time range đang có
+    op.execute(
+        """
+        UPDATE channel_record_days AS d
+        SET coverage = agg.coverage
+        FROM (
+            SELECT record_day_id, range_agg(tsrange(start_time, end_time, '[)')) AS coverage
+            FROM channel_record_time_ranges
+            WHERE start_time < end_time
+            GROUP BY record_day_id
+        ) AS agg
+        WHERE d.id = agg.record_day_id
+        """
+    )
+
+    op.create_index('ix_channel_record_day_coverage', 'channel_record_days', ['coverage'], unique=False, postgresql_using='gist')
+
+    # trùng với ix_channel_record_time_ranges_record_day_id (index=True)
+    op.drop_index('ix_record_day_time_range', table_name='channel_record_time_ranges')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_record_day_time_range', 'channel_record_time_ranges', ['record_day_id'], unique=False)
+    op.drop_index('ix_channel_record_day_coverage', table_name='channel_record_days', postgresql_using='gist')
+    op.drop_column('channel_record_days', 'coverage')
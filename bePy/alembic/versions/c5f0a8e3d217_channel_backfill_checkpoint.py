@@ -0,0 +1,30 @@
+"""channel backfill checkpoint
+
+Revision ID: c5f0a8e3d217
+Revises: b41e7d2c9a63
+Create Date: 2026-10-18 10:03:11.274915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f0a8e3d217'
+down_revision: Union[str, Sequence[str], None] = 'b41e7d2c9a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('channels', sa.Column('backfill_until', sa.Date(), nullable=True))
+    # channel đã init theo cách cũ (ghi hết 1 lần) coi như backfill xong
+    op.execute("UPDATE channels SET backfill_until = oldest_record_date")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('channels', 'backfill_until')
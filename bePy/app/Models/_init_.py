@@ -2,6 +2,8 @@ from app.Models.channel import Channel
 from app.Models.channel_record_day import ChannelRecordDay
 from app.Models.device_user import DeviceUser
 from app.Models.AlarmMessege import AlarmMessage
+from app.Models.background_job import BackgroundJob
+from app.Models.webhook_outbox import WebhookOutbox
 from app.Models.channel_extensions import ChannelExtension
 from app.Models.channel_recoding_mode_time_line import ChannelRecordingModeTimeline
 from app.Models.channel_record_time_range import ChannelRecordTimeRange
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, String, DateTime, Text, Integer, Boolean, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+
+    id = Column(Integer, primary_key=True)
+
+    job_type = Column(String(64), nullable=False)
+    # queued | running | succeeded | failed | cancelled
+    status = Column(String(16), nullable=False, default="queued")
+
+    params = Column(JSONB, nullable=False, default=dict)
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+
+    progress_done = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=True)
+    progress_message = Column(String(255), nullable=True)
+
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    # job bị đưa lại hàng đợi (shutdown / mất heartbeat) → handler biết đây là lần chạy tiếp, không phải job mới
+    requeued = Column(Boolean, nullable=False, default=False, server_default="false")
+
+    owner_superadmin_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # worker cập nhật định kỳ khi job đang chạy → job "running" mà heartbeat quá cũ là worker đã chết
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_background_job_status_type", "status", "job_type", "id"),
+    )
@@ -17,6 +17,8 @@ class Channel(Base):
     oldest_record_date = Column(Date, index=True)
     latest_record_date = Column(Date, index=True)
     last_sync_at = Column(DateTime, nullable=True)
+    # checkpoint init/backfill: mọi ngày >= backfill_until đã ghi xong
+    backfill_until = Column(Date, nullable=True)
     is_active = Column(Boolean, default=True)
     last_channel_sync_at = Column(DateTime, nullable=True)  
     record_days = relationship(
@@ -1,5 +1,6 @@
 # app/models/channel_record_day.py
 from sqlalchemy import Column, Integer, Date, Boolean, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import TSMULTIRANGE
 
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -19,6 +20,9 @@ class ChannelRecordDay(Base):
     record_date = Column(Date, nullable=False)
     has_record = Column(Boolean, default=True)
 
+    # toàn bộ segment của ngày gộp thành 1 tsmultirange (xem coverage_store.py)
+    coverage = Column(TSMULTIRANGE, nullable=True)
+
     channel = relationship(
         "Channel",
         back_populates="record_days"
@@ -31,4 +35,9 @@ class ChannelRecordDay(Base):
             "record_date",
             unique=True
         ),
+        Index(
+            "ix_channel_record_day_coverage",
+            "coverage",
+            postgresql_using="gist"
+        ),
     )
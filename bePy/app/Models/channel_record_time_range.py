@@ -1,5 +1,5 @@
 # app/models/channel_record_time_range.py
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -19,7 +19,3 @@ class ChannelRecordTimeRange(Base):
     end_time = Column(DateTime, nullable=False)
 
     record_day = relationship("ChannelRecordDay", backref="time_ranges")
-
-    __table_args__ = (
-        Index("ix_record_day_time_range", "record_day_id"),
-    )
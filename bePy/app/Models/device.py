@@ -21,6 +21,12 @@ class Device(Base):
     brand = Column(String(50))
     is_checked = Column(Boolean, default=True)
 
+    # pull: giữ alertStream | push: device gửi event tới HTTP host (xem ALARM_MODE_*)
+    alarm_mode = Column(String(8), nullable=False, default="pull", server_default="pull")
+
+    # tăng mỗi lần channel của device được sửa / sync lại → channel_cache ở process khác biết để load lại
+    channels_version = Column(Integer, nullable=False, default=0, server_default="0")
+
     #  OWNER – GÁN TỪ TOKEN
     
 
@@ -0,0 +1,50 @@
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class WebhookOutbox(Base):
+    __tablename__ = "webhook_outbox"
+
+    id = Column(Integer, primary_key=True)
+
+    # tenant: owner superadmin của device (giống alarm_messages.user_id)
+    user_id = Column(
+        String(36),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    alarm_message_id = Column(
+        Integer,
+        ForeignKey("alarm_messages.id", ondelete="CASCADE"),
+        nullable=True
+    )
+
+    # 1 event trong body webhook
+    payload = Column(JSONB, nullable=False)
+
+    # pending | delivered | failed
+    status = Column(String(16), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    # delivered_at - created_at
+    latency_ms = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_webhook_outbox_status_next_attempt", "status", "next_attempt_at", "id"),
+    )
@@ -0,0 +1,66 @@
+import hmac
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal, get_async_db as get_db
+from app.Models.device import Device
+from app.api.deps import CurrentUser, get_current_user
+from app.core.device_crypto import device_push_token
+from app.core.exceptions import DeviceNotFoundError
+from app.schemas.alarmMessSche import AlarmModeUpdate
+from app.schemas.job import JobOut
+from app.features.alarm_nofi.push_mode import build_alarm_mode_job_params, ingest_pushed_events
+from app.features.jobs.queue import enqueue_job
+from app.core.constants import ALARM_MODE_PUSH, JOB_TYPE_CONFIGURE_ALARM_MODE
+
+router = APIRouter(
+    prefix="/api/alarm",
+    tags=["Alarm"]
+)
+
+
+# =========================
+# POST: /api/alarm/push/{device_id}/{token}
+# =========================
+@router.post("/push/{device_id}/{token}")
+async def receive_pushed_alarm(
+    device_id: int,
+    token: str,
+    request: Request
+):
+    """ Device (HTTP host notification) gửi event tới đây, không dùng JWT:
+        token trong URL = device_push_token(device_id), được ghi lên device khi cấu hình push.
+        Device không ở push mode (vừa đổi về pull) → bỏ qua, vẫn trả 200 để device không gửi lại """
+    if not hmac.compare_digest(token, device_push_token(device_id)):
+        raise DeviceNotFoundError()
+
+    # session ngắn: không giữ connection trong lúc đọc body
+    async with AsyncSessionLocal() as db:
+        device = await db.get(Device, device_id)
+    if not device:
+        raise DeviceNotFoundError()
+
+    if not device.is_checked or device.alarm_mode != ALARM_MODE_PUSH:
+        return {"ignored": True}
+
+    return await ingest_pushed_events(
+        device,
+        request.stream(),
+        request.headers.get("content-type")
+    )
+
+
+# =========================
+# POST: /api/alarm/mode
+# =========================
+@router.post("/mode", response_model=JobOut, status_code=202)
+async def set_alarm_mode(
+    dto: AlarmModeUpdate,
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """ Đổi cách nhận alarm (pull | push) cho nhiều device, chạy nền bằng job configure_alarm_mode.
+        push: ghi http host (host / port, mặc định ALARM_PUSH_HOST / ALARM_PUSH_PORT) lên device,
+        thành công mới đổi mode. Kết quả từng device: GET /api/jobs/{id}/result """
+    params = await build_alarm_mode_job_params(db, dto.model_dump(), user.superadmin_id)
+    return await enqueue_job(db, JOB_TYPE_CONFIGURE_ALARM_MODE, params, user.superadmin_id)
@@ -15,6 +15,7 @@ from app.Models.channel_stream_config import ChannelStreamConfig
 from app.features.GetDevicesDetail.WorkWithDb import sync_channel_config
 from app.features.Schedule_Racord_Mode.work_with_db import get_channel_recording_mode_from_db, sync_channel_recording_mode
 from app.services.device_service import get_device_or_404, get_channel_or_404
+from app.services.channel_cache import channel_cache
 from app.core.constants import ERROR_MSG_DEVICE_NOT_FOUND, ERROR_MSG_CHANNEL_NOT_FOUND
 from app.core.logger import setup_logger
 
@@ -97,6 +98,7 @@ async def update_channel_info(
 
     # -------- BASIC INFO --------
     channel.name = data.channel_name
+    await channel_cache.invalidate_on_commit(db, device_id)
 
     # -------- MOTION --------
     if not channel.extension:
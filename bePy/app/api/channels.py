@@ -6,7 +6,9 @@ from app.Models.device import Device
 from app.Models.channel import Channel
 from app.api.deps import get_current_user, CurrentUser
 from app.features.deps import build_hik_auth
-from app.features.Schedule_Racord_Mode.work_with_db import sync_channel_recording_mode
+from app.features.Schedule_Racord_Mode.work_with_db import sync_recording_mode_of_channels
+from app.features.jobs.queue import enqueue_job
+from app.core.constants import JOB_TYPE_SYNC_RECORDING_MODE
 from app.services.device_service import get_device_or_404, get_device_channels
 from app.core.logger import setup_logger
 
@@ -21,12 +23,14 @@ router = APIRouter(
 @router.post("/recording-mode/sync")
 async def sync_recording_mode_all_channels(
     device_id: int,
+    background: bool = False,
     db: AsyncSession = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
     
 ):
     """
     Sync recording mode for all channels of a device from ISAPI.
+    background=true: chạy bằng job queue, trả về job_id (xem /api/jobs)
     """
     device = await get_device_or_404(db, device_id)
     channels = await get_device_channels(db, device_id)
@@ -34,30 +38,21 @@ async def sync_recording_mode_all_channels(
     if not channels:
         raise HTTPException(404, "No channels found")
 
+    if background:
+        job = await enqueue_job(
+            db,
+            JOB_TYPE_SYNC_RECORDING_MODE,
+            {"device_id": device.id},
+            user.superadmin_id
+        )
+        return {"job_id": job.id, "status": job.status}
+
     headers = build_hik_auth(device)
 
-    success = []
-    failed = []
-
-    for ch in channels:
-        try:
-            await sync_channel_recording_mode(
-                db=db,
-                device=device,
-                channel=ch,
-                headers=headers
-            )
-            success.append(ch.id)
-        except Exception as e:
-            logger.error(f"Failed to sync recording mode for channel {ch.id}: {e}")
-            failed.append({
-                "channel_id": ch.id,
-                "error": str(e)
-            })
-
-    return {
-        "success": True,
-        "synced_channels": success,
-        "failed_channels": failed
-    }
+    return await sync_recording_mode_of_channels(
+        db=db,
+        device=device,
+        channels=channels,
+        headers=headers
+    )
 
@@ -1,8 +1,10 @@
+import base64
+import struct
 from datetime import datetime, timedelta, date
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Response, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
-from sqlalchemy import func, select, delete
+from sqlalchemy import select, delete
 
 from app.api.deps import get_current_user, CurrentUser
 from app.db.session import get_async_db as get_db
@@ -16,8 +18,16 @@ from app.schemas.channel_record import ChannelRecordDayOut
 from app.core.time_provider import TimeProvider
 from app.features.deps import build_hik_auth, check_hikvision_auth, check_ip_reachable
 from app.features.RecordInfo.hikrecord import HikRecordService
+from app.features.RecordInfo.daily_distribution_cache import daily_distribution_cache
+from app.services.channel_cache import channel_cache
 from app.Models.channel_record_day import ChannelRecordDay
 from app.features.background.trigger_init_record_data import trigger_device_init_data
+from app.services.footage_search_service import find_channels_with_footage
+from app.features.jobs.queue import enqueue_job
+from app.services.record_timeline_service import (
+    get_device_month_timeline,
+    get_device_month_coverage
+)
 from app.services.device_service import (
     get_device_or_404,
     get_all_devices,
@@ -30,7 +40,14 @@ from app.core.constants import (
     ERROR_MSG_CANNOT_REACH_DEVICE,
     ERROR_MSG_UNSUPPORTED_BRAND,
     ERROR_MSG_AUTH_FAILED,
-    ERROR_MSG_INVALID_DATE_FORMAT
+    ERROR_MSG_INVALID_DATE_FORMAT,
+    ERROR_MSG_INVALID_COVERAGE_RESOLUTION,
+    ERROR_MSG_INVALID_TIME_WINDOW,
+    ERROR_MSG_TIME_WINDOW_TOO_LARGE,
+    COVERAGE_RESOLUTIONS_MINUTES,
+    FOOTAGE_SEARCH_MAX_WINDOW_DAYS,
+    JOB_TYPE_DEVICE_INIT,
+    JOB_TYPE_DEVICE_BACKFILL
 )
 from app.core.logger import setup_logger
 
@@ -110,6 +127,74 @@ async def get_active_devices_endpoint(
 
 
 
+# =========================
+# GET: /api/devices/record-cache/stats
+# =========================
+@router.get("/record-cache/stats")
+async def get_record_cache_stats(
+    user: CurrentUser = Depends(get_current_user)
+):
+    """Hit / miss của cache dailyDistribution (record status theo tháng)"""
+    return daily_distribution_cache.stats()
+
+
+# =========================
+# GET: /api/devices/channel-cache/stats
+# =========================
+@router.get("/channel-cache/stats")
+async def get_channel_cache_stats(
+    user: CurrentUser = Depends(get_current_user)
+):
+    """Hit / miss của cache metadata channel (tên channel cho alarm...)"""
+    return channel_cache.stats()
+
+
+# =========================
+# GET: /api/devices/footage
+# =========================
+@router.get("/footage")
+async def find_footage(
+    start: datetime,
+    end: datetime,
+    device_id: Optional[list[int]] = Query(None),
+    channel_id: Optional[list[int]] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """ channel nào có record trong [start, end) trên toàn bộ device của tenant.
+        start / end: giờ device (naive), vd 2026-01-20T14:02:00
+        device_id / channel_id: lọc thêm (lặp lại param để truyền nhiều giá trị)
+        Response: { start, end, channels: [ {channel_id, device_id, channel_no, name,
+                    overlap_seconds, first_start, last_end} ] } """
+    start = start.replace(tzinfo=None)
+    end = end.replace(tzinfo=None)
+
+    if start >= end:
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR_MSG_INVALID_TIME_WINDOW
+        )
+    if end - start > timedelta(days=FOOTAGE_SEARCH_MAX_WINDOW_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR_MSG_TIME_WINDOW_TOO_LARGE
+        )
+
+    channels = await find_channels_with_footage(
+        db,
+        start,
+        end,
+        owner_superadmin_id=user.superadmin_id,
+        device_ids=device_id,
+        channel_ids=channel_id
+    )
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "channels": channels
+    }
+
+
 from app.core.device_crypto import encrypt_device_password
 # =========================
 # POST: /api/devices
@@ -202,6 +287,7 @@ async def delete_device(
     device = await get_device_or_404(db, id, user.superadmin_id)
     
     await db.delete(device)
+    await channel_cache.invalidate_on_commit(db, id)
     await db.commit()
     return
 
@@ -249,18 +335,49 @@ async def get_channel_record_days_full(
 @router.post("/{id}/get_channels_record_info")
 async def update_channels_record_info(
     id: int,
+    background: bool = False,
     db: AsyncSession = Depends(get_db),
     user: CurrentUser = Depends(get_current_user)
 ):
+    """ init channel + record data: trả về ngay sau khi tuần hiện tại đã được ghi,
+        phần lịch sử còn lại backfill bằng job device_backfill (lùi dần, commit theo chunk; xem /api/jobs)
+        background=true: chạy toàn bộ bằng job queue, trả về job_id (xem /api/jobs) """
     device = await get_device_or_404(db, id, user.superadmin_id)
+
+    if background:
+        job = await enqueue_job(
+            db,
+            JOB_TYPE_DEVICE_INIT,
+            {"device_id": device.id},
+            user.superadmin_id
+        )
+        return {"job_id": job.id, "status": job.status}
+
     hikservice = HikRecordService()
 
     try:
-        await hikservice.device_channels_init_data(
+        done = await hikservice.device_channels_init_data(
             db=db,
-            device=device
+            device=device,
+            max_chunks=1
         )
-        return {"message": "Channels record info updated successfully"}
+
+        # phần lịch sử còn lại chạy bằng job queue (process giữ lease job_worker, có tiến độ / cancel),
+        # không chạy trong API process
+        backfill_job = None
+        if not done:
+            backfill_job = await enqueue_job(
+                db,
+                JOB_TYPE_DEVICE_BACKFILL,
+                {"device_id": device.id},
+                user.superadmin_id
+            )
+
+        return {
+            "message": "Channels record info updated successfully",
+            "backfill_pending": not done,
+            "backfill_job_id": backfill_job.id if backfill_job else None
+        }
 
     except Exception as e:
         await db.rollback()
@@ -275,6 +392,7 @@ async def update_channels_record_info(
 async def get_all_channels_data_in_month(
     id: int,
     date_str: str,
+    columnar: bool = False,
     db: AsyncSession = Depends(get_db),
     user: CurrentUser = Depends(get_current_user)
 ):
@@ -283,7 +401,8 @@ async def get_all_channels_data_in_month(
           Response shape:
             [ { channel: {id,name,channel_no,oldest_record_date,latest_record_date},
               record_days: [ {record_date, has_record,
-                time_ranges: [{start_time,end_time}, ...] } ] }, ... ] """
+                time_ranges: [{start_time,end_time}, ...] } ] }, ... ]
+        columnar=true: trả dạng cột (xem get_device_month_timeline) """
     device = await get_device_or_404(db, id, user.superadmin_id)
 
     try:
@@ -301,75 +420,100 @@ async def get_all_channels_data_in_month(
     else:
         last_day = date(year, month + 1, 1) - timedelta(days=1)
 
-    result = await db.execute(select(Channel).where(
-        Channel.device_id == device.id
-    ))
-    channels = result.scalars().all()
-
-    oldest_record_date_query = await db.execute(
-        select(func.min(Channel.oldest_record_date).label('oldest_record_date'))
-        .where(Channel.device_id == device.id)
+    # số query cố định (không N+1 theo channel)
+    return await get_device_month_timeline(
+        db,
+        device.id,
+        first_day,
+        last_day,
+        columnar=columnar
     )
-    oldest_record_date = oldest_record_date_query.scalar()
 
-    # Extract month and year from the oldest record date if available
-    oldest_record_month = None
-    if oldest_record_date:
-        oldest_record_month = oldest_record_date.strftime("%Y-%m")
 
+@router.get("/{id}/channels/month_coverage/{date_str}")
+async def get_all_channels_coverage_in_month(
+    id: int,
+    date_str: str,
+    resolution: int = 1,
+    binary: bool = False,
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """ độ phủ record của mọi channel trong tháng dạng bitmap (cho calendar / timeline bar).
+        date_str format: "YYYY-MM", resolution: số phút / bit (COVERAGE_RESOLUTIONS_MINUTES)
+
+        Bitmap ngày: bit i (MSB trước) = 1 nếu có record trong phút [i*resolution, (i+1)*resolution)
+        has_record_bits: bit d-1 (LSB trước) = ngày d có record
+
+        binary=false (JSON):
+            { resolution_minutes, bytes_per_day,
+              channels: [ {id, channel_no, name, has_record_bits,
+                           days: {"YYYY-MM-DD": base64 bitmap} } ] }
+        binary=true (application/octet-stream, little-endian):
+            header  : uint16 resolution_minutes, uint16 bytes_per_day,
+                      uint8 days_in_month, uint16 channel_count
+            channel : int32 id, int32 channel_no, uint32 has_record_bits,
+                      days_in_month * bytes_per_day bitmap (ngày không có record = 0) """
+    device = await get_device_or_404(db, id, user.superadmin_id)
 
-    result = []
+    try:
+        parsed_date = datetime.strptime(date_str, "%Y-%m")
+        year, month = parsed_date.year, parsed_date.month
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR_MSG_INVALID_DATE_FORMAT
+        )
 
-    for ch in channels:
-        query = (
-            select(ChannelRecordDay)
-            .options(joinedload(ChannelRecordDay.time_ranges))
-            .where(
-                ChannelRecordDay.channel_id == ch.id,
-                ChannelRecordDay.record_date >= first_day,
-                ChannelRecordDay.record_date <= last_day
-            )
-            .order_by(ChannelRecordDay.record_date.desc())
+    if resolution not in COVERAGE_RESOLUTIONS_MINUTES:
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR_MSG_INVALID_COVERAGE_RESOLUTION
         )
-        days_result = await db.execute(query)
-        days = days_result.scalars().unique().all()
-
-        rd_list = []
-        for rd in days:
-            rd_list.append({
-                "record_date": rd.record_date.isoformat(),
-                "has_record": rd.has_record,
-                "time_ranges": [
-                    {
-                        "start_time": tr.start_time.isoformat(),
-                        "end_time": tr.end_time.isoformat()
+
+    first_day = date(year, month, 1)
+    if month == 12:
+        last_day = date(year + 1, 1, 1) - timedelta(days=1)
+    else:
+        last_day = date(year, month + 1, 1) - timedelta(days=1)
+
+    channels, coverage = await get_device_month_coverage(
+        db,
+        device.id,
+        first_day,
+        last_day,
+        resolution
+    )
+    bytes_per_day = (1440 // resolution + 7) // 8
+
+    if not binary:
+        return {
+            "resolution_minutes": resolution,
+            "bytes_per_day": bytes_per_day,
+            "channels": [
+                {
+                    "id": ch.id,
+                    "channel_no": ch.channel_no,
+                    "name": ch.name,
+                    "has_record_bits": cov["has_record_bits"],
+                    "days": {
+                        day.isoformat(): base64.b64encode(bitmap).decode("ascii")
+                        for day, bitmap in sorted(cov["days"].items())
                     }
-                    for tr in rd.time_ranges
-                ]
-            })
-
-        result.append({
-            "channel": {
-                "id": ch.id,
-                "channel_no": ch.channel_no,
-                "name": ch.name,
-                "oldest_record_date": (
-                    ch.oldest_record_date.isoformat()
-                    if ch.oldest_record_date else None
-                ),
-                "latest_record_date": (
-                    ch.latest_record_date.isoformat()
-                    if ch.latest_record_date else None
-                )
-            },
-            "record_days": rd_list
-        })
+                }
+                for ch, cov in zip(channels, coverage)
+            ]
+        }
+
+    empty_day = bytes(bytes_per_day)
+    parts = [struct.pack("<HHBH", resolution, bytes_per_day, last_day.day, len(channels))]
+    for ch, cov in zip(channels, coverage):
+        parts.append(struct.pack("<iiI", ch.id, ch.channel_no, cov["has_record_bits"]))
+        for d in range(last_day.day):
+            parts.append(cov["days"].get(first_day + timedelta(days=d), empty_day))
+
+    return Response(content=b"".join(parts), media_type="application/octet-stream")
 
-    return {
-        "oldest_record_month": oldest_record_month,
-        "channels": result
-    }
-   
 @router.post("/{id}/channelsdata/sync")
 async def sync_device_channels_data(
     id: int,
@@ -5,13 +5,20 @@ from sqlalchemy import select
 from app.db.session import get_async_db as get_db
 from app.api.deps import get_current_user, CurrentUser
 from app.Models.device import Device
-from app.Models.device_user import DeviceUser
 from app.features.deps import build_hik_auth
 from app.features.GetDevicesDetail.HikDetailService import HikDetailService
-from app.features.GetDevicesDetail.WorkWithDb import save_permissions,sync_device_users_from_isapi
+from app.features.GetDevicesDetail.WorkWithDb import (
+    save_permissions,
+    sync_all_user_permissions_of_device
+)
+from app.features.jobs.queue import enqueue_job
 from app.utils.response_builders import build_permission_response
 from app.services.device_service import get_device_or_404, get_device_user_or_404
-from app.core.constants import ERROR_MSG_LOW_PRIVILEGE, ERROR_MSG_INVALID_OPERATION
+from app.core.constants import (
+    ERROR_MSG_LOW_PRIVILEGE,
+    ERROR_MSG_INVALID_OPERATION,
+    JOB_TYPE_SYNC_USER_PERMISSIONS
+)
 
 router = APIRouter(
     prefix="/api/device/{id}/user",
@@ -163,87 +170,26 @@ async def update_device_user_permissions(
 @router.post("/syncall")
 async def sync_all_device_user_permissions(
     id: int,
+    background: bool = False,
     db: AsyncSession = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
 ):
+    """ background=true: chạy bằng job queue, trả về job_id (xem /api/jobs) """
     device = await get_device_or_404(db, id)
+
+    if background:
+        job = await enqueue_job(
+            db,
+            JOB_TYPE_SYNC_USER_PERMISSIONS,
+            {"device_id": device.id},
+            user.superadmin_id
+        )
+        return {"job_id": job.id, "status": job.status}
+
     headers = build_hik_auth(device)
 
-    # =========================
-    # STEP 1: SYNC DEVICE USERS
-    # =========================
-    users = await sync_device_users_from_isapi(
+    return await sync_all_user_permissions_of_device(
         db=db,
         device=device,
         headers=headers
     )
-
-
-    # =========================
-    # STEP 2: LOAD USERS FROM DB
-    # =========================
-    # =========================
-    # STEP 2: LOAD USERS FROM DB
-    # =========================
-    result = await db.execute(
-        select(DeviceUser).where(DeviceUser.device_id == id)
-    )
-    device_users = result.scalars().all()
-
-    if not device_users:
-        return {
-            "success": True,
-            "message": "No device users found after sync",
-            "total": 0,
-            "synced": 0,
-            "errors": []
-        }
-
-    # =========================
-    # STEP 3: SYNC PERMISSIONS
-    # =========================
-    hik = HikDetailService()
-    success_count = 0
-    errors = []
-
-    for device_user in device_users:
-        try:
-            permission_data = await hik.fetch_permission_for_1_user(
-                device=device,
-                headers=headers,
-                user_id=device_user.user_id
-            )
-
-            if not permission_data:
-                errors.append({
-                    "device_user_id": device_user.id,
-                    "user_id": device_user.user_id,
-                    "error": "FETCH_FAILED"
-                })
-                continue
-
-            await save_permissions(
-                db=db,
-                device_user_id=device_user.id,
-                permission_data=permission_data
-            )
-
-            success_count += 1
-
-        except Exception as e:
-            errors.append({
-                "device_user_id": device_user.id,
-                "user_id": device_user.user_id,
-                "error": str(e)
-            })
-
-    await db.commit()
-
-    return {
-        "success": True,
-        "device_id": id,
-        "total": len(device_users),
-        "synced": success_count,
-        "failed": len(errors),
-        "errors": errors
-    }
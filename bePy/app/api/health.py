@@ -0,0 +1,67 @@
+import asyncio
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from app.db.session import async_engine
+from app.core.leader import lease_manager
+from app.features.background.warmup import warmup_state
+from app.features.alarm_nofi.ingest_queue import alarm_ingest_queue
+from app.features.alarm_nofi.webhook_outbox import webhook_delivery_worker
+from app.features.RecordInfo.refresh_queue import channel_refresh_queue
+from app.core.constants import RUN_BACKGROUND_DUTIES_IN_API, HEALTH_DB_TIMEOUT_SECONDS
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"]
+)
+
+
+# =========================
+# GET: /health/live
+# =========================
+@router.get("/live")
+async def live():
+    """ process còn sống và event loop còn phản hồi (không kiểm tra DB / device) """
+    return {"status": "ok"}
+
+
+# =========================
+# GET: /health/ready
+# =========================
+@router.get("/ready")
+async def ready():
+    """ nhận request được chưa: DB kết nối được → 200, ngược lại 503.
+        warmup: tiến độ sync lúc khởi động (chỉ có nếu process này giữ lease record_sync),
+        không ảnh hưởng ready vì API vẫn phục vụ được bằng dữ liệu đã có trong DB.
+        alarm_ingest: queue, backpressure, drop của alarm trong process này (pull + push).
+        webhook: kết quả gửi webhook (nếu giữ lease alarm_stream)
+        channel_refresh: refresh segment theo event alarm (running=False nếu process này không chạy queue) """
+    database_ok = True
+    database_error = None
+    try:
+        async with async_engine.connect() as conn:
+            await asyncio.wait_for(
+                conn.execute(text("SELECT 1")),
+                timeout=HEALTH_DB_TIMEOUT_SECONDS
+            )
+    except Exception as e:
+        database_ok = False
+        database_error = str(e) or type(e).__name__
+
+    leases = lease_manager.stats()
+    body = {
+        "status": "ready" if database_ok else "not_ready",
+        "checks": {
+            "database": {"ok": database_ok, "error": database_error},
+        },
+        "background": {
+            "enabled_in_process": RUN_BACKGROUND_DUTIES_IN_API,
+            **leases,
+        },
+        "warmup": warmup_state.snapshot() if "record_sync" in leases["held"] else None,
+        "alarm_ingest": alarm_ingest_queue.stats(),
+        "webhook": webhook_delivery_worker.stats() if "alarm_stream" in leases["held"] else None,
+        "channel_refresh": channel_refresh_queue.stats(),
+    }
+    return JSONResponse(status_code=200 if database_ok else 503, content=body)
@@ -0,0 +1,132 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.api.deps import get_current_user, CurrentUser
+from app.db.session import get_async_db as get_db
+from app.Models.background_job import BackgroundJob
+from app.schemas.job import JobCreate, JobOut, JobResultOut
+from app.services.device_service import get_device_or_404
+from app.features.jobs.queue import enqueue_job, request_cancel, JOB_FINISHED_STATUSES
+from app.features.alarm_nofi.push_mode import build_alarm_mode_job_params
+from app.core.constants import (
+    JOB_TYPE_CONCURRENCY,
+    JOB_TYPE_SYNC_NOW,
+    JOB_TYPE_CONFIGURE_ALARM_MODE,
+    ERROR_MSG_JOB_NOT_FOUND,
+    ERROR_MSG_UNKNOWN_JOB_TYPE,
+    ERROR_MSG_JOB_NOT_FINISHED
+)
+
+router = APIRouter(
+    prefix="/api/jobs",
+    tags=["Jobs"]
+)
+
+
+async def get_job_or_404(db: AsyncSession, job_id: int, user: CurrentUser) -> BackgroundJob:
+    result = await db.execute(
+        select(BackgroundJob).where(
+            BackgroundJob.id == job_id,
+            BackgroundJob.owner_superadmin_id == user.superadmin_id
+        )
+    )
+    job = result.scalars().first()
+    if not job:
+        raise HTTPException(404, ERROR_MSG_JOB_NOT_FOUND)
+    return job
+
+
+# =========================
+# POST: api/jobs
+# =========================
+@router.post("", response_model=JobOut, status_code=202)
+async def create_job(
+    dto: JobCreate,
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """ job_type: device_init | device_backfill | sync_device_user_permissions | sync_recording_mode
+                  | sync_now | configure_alarm_mode
+        params: {"device_id": int} (trừ sync_now),
+                configure_alarm_mode: {"device_ids": [int], "mode": "pull" | "push", "host", "port"} """
+    if dto.job_type not in JOB_TYPE_CONCURRENCY:
+        raise HTTPException(400, ERROR_MSG_UNKNOWN_JOB_TYPE)
+
+    if dto.job_type == JOB_TYPE_SYNC_NOW:
+        params = {"superadmin_id": str(user.superadmin_id)}
+    elif dto.job_type == JOB_TYPE_CONFIGURE_ALARM_MODE:
+        params = await build_alarm_mode_job_params(db, dto.params, user.superadmin_id)
+    else:
+        device_id = dto.params.get("device_id")
+        if not isinstance(device_id, int):
+            raise HTTPException(400, "params.device_id is required")
+        device = await get_device_or_404(db, device_id, user.superadmin_id)
+        params = {"device_id": device.id}
+
+    return await enqueue_job(db, dto.job_type, params, user.superadmin_id)
+
+
+# =========================
+# GET: api/jobs
+# =========================
+@router.get("", response_model=list[JobOut])
+async def list_jobs(
+    status: Optional[str] = None,
+    job_type: Optional[str] = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user)
+):
+    query = select(BackgroundJob).where(BackgroundJob.owner_superadmin_id == user.superadmin_id)
+    if status:
+        query = query.where(BackgroundJob.status == status)
+    if job_type:
+        query = query.where(BackgroundJob.job_type == job_type)
+
+    result = await db.execute(
+        query.order_by(BackgroundJob.id.desc()).limit(min(max(limit, 1), 200))
+    )
+    return result.scalars().all()
+
+
+# =========================
+# GET: api/jobs/{job_id}
+# =========================
+@router.get("/{job_id}", response_model=JobOut)
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """ trạng thái + tiến độ (progress_done / progress_total) của job """
+    return await get_job_or_404(db, job_id, user)
+
+
+# =========================
+# POST: api/jobs/{job_id}/cancel
+# =========================
+@router.post("/{job_id}/cancel", response_model=JobOut)
+async def cancel_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user)
+):
+    job = await get_job_or_404(db, job_id, user)
+    return await request_cancel(db, job)
+
+
+# =========================
+# GET: api/jobs/{job_id}/result
+# =========================
+@router.get("/{job_id}/result", response_model=JobResultOut)
+async def get_job_result(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user)
+):
+    job = await get_job_or_404(db, job_id, user)
+    if job.status not in JOB_FINISHED_STATUSES:
+        raise HTTPException(409, ERROR_MSG_JOB_NOT_FINISHED)
+    return job
@@ -8,15 +8,28 @@ from app.features.sync.engine import SyncEngine
 from app.Models.sync_setting import SyncSetting
 from app.schemas.sync_setting import SyncSettingOut
 from app.schemas.sync_setting import SyncSettingUpdate
+from app.features.jobs.queue import enqueue_job
+from app.core.constants import JOB_TYPE_SYNC_NOW
 
 router = APIRouter(prefix="/api/sync", tags=["Sync"])
 
 
 @router.post("/now")
 async def sync_now(
+    background: bool = False,
     db: AsyncSession = Depends(get_db),
     user: CurrentUser = Depends(get_current_user)
 ):
+    """ background=true: chạy bằng job queue, trả về job_id (xem /api/jobs) """
+    if background:
+        job = await enqueue_job(
+            db,
+            JOB_TYPE_SYNC_NOW,
+            {"superadmin_id": str(user.superadmin_id)},
+            user.superadmin_id
+        )
+        return {"job_id": job.id, "status": job.status}
+
     engine = SyncEngine()
     await engine.sync_by_superadmin(db, user.superadmin_id)
     return {"message": "Sync started"}
@@ -1,3 +1,4 @@
+import os
 
 
 # =========================
@@ -30,6 +31,176 @@ DEFAULT_IP_PORT = 80
 DEFAULT_CONNECTION_TIMEOUT = 3
 DEFAULT_AUTH_TIMEOUT = 5
 
+# =========================
+# RECORD SYNC
+# =========================
+# Số request ISAPI chạy song song tối đa trên 1 device khi sync record (tránh làm NVR quá tải)
+#  from: app/features/RecordInfo/hikrecord.py
+RECORD_SYNC_CONCURRENCY = int(os.getenv("RECORD_SYNC_CONCURRENCY", "4"))
+
+# Worker pool cho auto_sync_all_devices: số device sync cùng lúc, jitter trước mỗi device
+# và deadline cho cả 1 lượt (nên < interval 5p của scheduler)
+#  from: app/features/background/update_data_record.py
+DEVICE_SYNC_WORKERS = int(os.getenv("DEVICE_SYNC_WORKERS", "8"))
+DEVICE_SYNC_JITTER_SECONDS = float(os.getenv("DEVICE_SYNC_JITTER_SECONDS", "2"))
+DEVICE_SYNC_RUN_DEADLINE_SECONDS = float(os.getenv("DEVICE_SYNC_RUN_DEADLINE_SECONDS", "270"))
+
+# Sync 2 tầng (app/features/background/scheduler.py):
+# - tầng nóng: chỉ segment hôm nay, chạy dày
+# - tầng chậm: đối soát toàn bộ từ last_sync_at (auto_sync_all_devices)
+HOT_SYNC_INTERVAL_MINUTES = int(os.getenv("HOT_SYNC_INTERVAL_MINUTES", "1"))
+HOT_SYNC_RUN_DEADLINE_SECONDS = float(os.getenv("HOT_SYNC_RUN_DEADLINE_SECONDS", "50"))
+# Trong bao nhiêu phút đầu ngày thì tầng nóng làm mới cả hôm qua (segment cuối ngày hôm qua vừa đóng)
+HOT_SYNC_YESTERDAY_GRACE_MINUTES = int(os.getenv("HOT_SYNC_YESTERDAY_GRACE_MINUTES", "60"))
+RECONCILE_SYNC_INTERVAL_MINUTES = int(os.getenv("RECONCILE_SYNC_INTERVAL_MINUTES", "30"))
+
+# Refresh segment theo event từ alertStream: gom event cùng channel trong DEBOUNCE giây
+# rồi mới hỏi NVR (segment cần vài giây để xuất hiện trên device)
+#  from: app/features/RecordInfo/refresh_queue.py
+CHANNEL_REFRESH_DEBOUNCE_SECONDS = float(os.getenv("CHANNEL_REFRESH_DEBOUNCE_SECONDS", "15"))
+CHANNEL_REFRESH_WORKERS = int(os.getenv("CHANNEL_REFRESH_WORKERS", "4"))
+
+# Init record data từ gần tới xa: chunk đầu là tuần hiện tại (commit ngay cho UI),
+# sau đó lùi dần mỗi chunk BACKFILL_CHUNK_DAYS ngày, commit + checkpoint (channel.backfill_until)
+#  from: HikRecordService.backfill_device_record_data
+BACKFILL_FIRST_CHUNK_DAYS = int(os.getenv("BACKFILL_FIRST_CHUNK_DAYS", "7"))
+BACKFILL_CHUNK_DAYS = int(os.getenv("BACKFILL_CHUNK_DAYS", "31"))
+# Số device được resume backfill cùng lúc khi start server
+BACKFILL_RESUME_WORKERS = int(os.getenv("BACKFILL_RESUME_WORKERS", "2"))
+
+# Cache dailyDistribution: tháng hiện tại còn thay đổi nên TTL ngắn, tháng đã qua gần như cố định
+#  from: app/features/RecordInfo/daily_distribution_cache.py
+DAILY_DIST_CACHE_CURRENT_MONTH_TTL_SECONDS = float(os.getenv("DAILY_DIST_CACHE_CURRENT_MONTH_TTL_SECONDS", "120"))
+DAILY_DIST_CACHE_CLOSED_MONTH_TTL_SECONDS = float(os.getenv("DAILY_DIST_CACHE_CLOSED_MONTH_TTL_SECONDS", "86400"))
+
+# Cache metadata channel theo device (tên channel cho alarm, hot sync...), ngoài TTL còn bị xóa khi channel được sửa / sync lại
+#  from: app/services/channel_cache.py
+CHANNEL_CACHE_TTL_SECONDS = float(os.getenv("CHANNEL_CACHE_TTL_SECONDS", "300"))
+# Chu kỳ đối chiếu entry với devices.channels_version → process khác thấy channel đổi chậm nhất sau chừng này
+CHANNEL_CACHE_REVALIDATE_SECONDS = float(os.getenv("CHANNEL_CACHE_REVALIDATE_SECONDS", "5"))
+
+# Nơi lưu segment record của mỗi channel-day
+# - "rows":       1 row / segment trong channel_record_time_ranges (cách cũ)
+# - "multirange": 1 giá trị tsmultirange channel_record_days.coverage (GiST index)
+# - "dual":       ghi cả 2, đọc từ multirange (giai đoạn chuyển đổi, có thể quay lại "rows")
+#  from: app/features/RecordInfo/coverage_store.py
+RECORD_STORAGE_ROWS = "rows"
+RECORD_STORAGE_MULTIRANGE = "multirange"
+RECORD_STORAGE_DUAL = "dual"
+RECORD_COVERAGE_STORAGE = os.getenv("RECORD_COVERAGE_STORAGE", RECORD_STORAGE_DUAL)
+
+# Khoảng thời gian tối đa cho 1 lần tìm "channel nào có record lúc T" (/api/devices/footage)
+#  from: app/services/footage_search_service.py
+FOOTAGE_SEARCH_MAX_WINDOW_DAYS = int(os.getenv("FOOTAGE_SEARCH_MAX_WINDOW_DAYS", "31"))
+
+# Độ phân giải (phút / bit) cho bitmap độ phủ record (/channels/month_coverage)
+#  1 phút → 1440 bit = 180 byte / ngày
+COVERAGE_RESOLUTIONS_MINUTES = (1, 5, 10, 15, 30, 60)
+
+# =========================
+# ALARM
+# =========================
+
+# Buffer tối đa (byte) của parser alertStream cho 1 device
+#  from: app/features/alarm_nofi/alert_stream_parser.py
+ALERT_STREAM_MAX_BUFFER_BYTES = int(os.getenv("ALERT_STREAM_MAX_BUFFER_BYTES", "65536"))
+
+# Hàng đợi alarm giữa listener và sink (DB / webhook)
+#  from: app/features/alarm_nofi/ingest_queue.py
+ALARM_QUEUE_MAX_SIZE = int(os.getenv("ALARM_QUEUE_MAX_SIZE", "10000"))
+# queue đầy: listener chờ tối đa bấy nhiêu giây rồi bỏ alarm
+ALARM_QUEUE_PUT_TIMEOUT_SECONDS = float(os.getenv("ALARM_QUEUE_PUT_TIMEOUT_SECONDS", "1"))
+# insert alarm_messages theo batch: đủ số row hoặc hết thời gian thì ghi
+ALARM_DB_BATCH_SIZE = int(os.getenv("ALARM_DB_BATCH_SIZE", "500"))
+ALARM_DB_FLUSH_SECONDS = float(os.getenv("ALARM_DB_FLUSH_SECONDS", "1"))
+
+# Cách nhận alarm của từng device (devices.alarm_mode)
+# - "pull": server giữ 1 kết nối alertStream / device (AlarmSupervisor)
+# - "push": device gửi event tới HTTP host = server này (POST /api/alarm/push/...)
+#  from: app/features/alarm_nofi/push_mode.py
+ALARM_MODE_PULL = "pull"
+ALARM_MODE_PUSH = "push"
+ALARM_MODES = (ALARM_MODE_PULL, ALARM_MODE_PUSH)
+# địa chỉ server mà device push tới (mặc định khi request không truyền host / port)
+ALARM_PUSH_HOST = os.getenv("ALARM_PUSH_HOST", "")
+ALARM_PUSH_PORT = int(os.getenv("ALARM_PUSH_PORT", "8000"))
+# slot httpHosts/{id} trên device dành cho server này
+ALARM_PUSH_HTTP_HOST_ID = int(os.getenv("ALARM_PUSH_HTTP_HOST_ID", "1"))
+ALARM_PUSH_PATH = "/api/alarm/push"
+# số device cấu hình cùng lúc trong 1 job configure_alarm_mode
+ALARM_MODE_CONFIGURE_CONCURRENCY = int(os.getenv("ALARM_MODE_CONFIGURE_CONCURRENCY", "8"))
+
+# Outbox webhook n8n (ghi cùng transaction với alarm_messages, worker gửi theo batch)
+#  from: app/features/alarm_nofi/webhook_outbox.py
+WEBHOOK_STATUS_PENDING = "pending"
+WEBHOOK_STATUS_DELIVERED = "delivered"
+# hết số lần thử
+WEBHOOK_STATUS_FAILED = "failed"
+
+# số row outbox lấy ra mỗi vòng
+WEBHOOK_CLAIM_BATCH_SIZE = int(os.getenv("WEBHOOK_CLAIM_BATCH_SIZE", "500"))
+# số event tối đa trong 1 request webhook (cùng 1 user)
+WEBHOOK_MAX_EVENTS_PER_CALL = int(os.getenv("WEBHOOK_MAX_EVENTS_PER_CALL", "50"))
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "4"))
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "10"))
+# row đã lấy ra nhưng chưa cập nhật kết quả sau bấy nhiêu giây (worker chết) → được lấy lại
+WEBHOOK_CLAIM_SECONDS = int(os.getenv("WEBHOOK_CLAIM_SECONDS", "60"))
+# retry: min(BASE * 2^attempts, MAX) giây, tối đa MAX_ATTEMPTS lần
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+WEBHOOK_RETRY_BASE_SECONDS = int(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", "5"))
+WEBHOOK_RETRY_MAX_SECONDS = int(os.getenv("WEBHOOK_RETRY_MAX_SECONDS", "600"))
+WEBHOOK_POLL_INTERVAL_SECONDS = float(os.getenv("WEBHOOK_POLL_INTERVAL_SECONDS", "2"))
+# row delivered / failed cũ hơn bấy nhiêu ngày thì xóa
+WEBHOOK_OUTBOX_RETENTION_DAYS = int(os.getenv("WEBHOOK_OUTBOX_RETENTION_DAYS", "7"))
+
+# =========================
+# BACKGROUND JOBS
+# =========================
+#  from: app/features/jobs/queue.py
+
+JOB_TYPE_DEVICE_INIT = "device_init"
+# chỉ backfill tiếp từ checkpoint (channel.backfill_until), không init lại channel
+JOB_TYPE_DEVICE_BACKFILL = "device_backfill"
+JOB_TYPE_SYNC_USER_PERMISSIONS = "sync_device_user_permissions"
+JOB_TYPE_SYNC_RECORDING_MODE = "sync_recording_mode"
+JOB_TYPE_SYNC_NOW = "sync_now"
+JOB_TYPE_CONFIGURE_ALARM_MODE = "configure_alarm_mode"
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_SUCCEEDED = "succeeded"
+JOB_STATUS_FAILED = "failed"
+JOB_STATUS_CANCELLED = "cancelled"
+
+# Số job chạy cùng lúc tối đa theo từng loại (trong 1 worker process)
+JOB_TYPE_CONCURRENCY = {
+    JOB_TYPE_DEVICE_INIT: int(os.getenv("JOB_DEVICE_INIT_CONCURRENCY", "2")),
+    JOB_TYPE_DEVICE_BACKFILL: int(os.getenv("JOB_DEVICE_BACKFILL_CONCURRENCY", "2")),
+    JOB_TYPE_SYNC_USER_PERMISSIONS: int(os.getenv("JOB_SYNC_USER_PERMISSIONS_CONCURRENCY", "4")),
+    JOB_TYPE_SYNC_RECORDING_MODE: int(os.getenv("JOB_SYNC_RECORDING_MODE_CONCURRENCY", "4")),
+    JOB_TYPE_SYNC_NOW: int(os.getenv("JOB_SYNC_NOW_CONCURRENCY", "1")),
+    JOB_TYPE_CONFIGURE_ALARM_MODE: int(os.getenv("JOB_CONFIGURE_ALARM_MODE_CONCURRENCY", "1")),
+}
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+# job "running" không có heartbeat quá lâu (worker chết / restart) → đưa lại vào hàng đợi
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+
+# =========================
+# BACKGROUND LEASES
+# =========================
+#  from: app/core/leader.py
+# Mỗi duty background giữ 1 pg advisory lock → chỉ 1 process chạy duty đó
+# Process chưa có lease thử lại sau LEASE_RETRY_SECONDS; process đang giữ kiểm tra connection
+# mỗi LEASE_CHECK_SECONDS (mất connection = mất lease → dừng duty)
+LEASE_RETRY_SECONDS = float(os.getenv("LEASE_RETRY_SECONDS", "10"))
+LEASE_CHECK_SECONDS = float(os.getenv("LEASE_CHECK_SECONDS", "5"))
+# false → API process không chạy duty background nào (chạy bằng `python -m app.worker`)
+RUN_BACKGROUND_DUTIES_IN_API = os.getenv("RUN_BACKGROUND_DUTIES_IN_API", "true").lower() == "true"
+# /health/ready: chờ DB trả lời SELECT 1 tối đa bao lâu
+HEALTH_DB_TIMEOUT_SECONDS = float(os.getenv("HEALTH_DB_TIMEOUT_SECONDS", "2"))
+# Duty crash (exception) khi vẫn giữ lease → chờ bao lâu rồi chạy lại
+LEASE_DUTY_RESTART_SECONDS = float(os.getenv("LEASE_DUTY_RESTART_SECONDS", "5"))
+
 # =========================
 # HTTP ERROR MESSAGES
 # =========================
@@ -45,7 +216,18 @@ ERROR_MSG_TOKEN_EXPIRED = "Token expired"
 ERROR_MSG_INVALID_TOKEN = "Invalid token"
 ERROR_MSG_DEVICE_EXISTS = "Device already exists"
 ERROR_MSG_INVALID_DATE_FORMAT = "Invalid date format. Use YYYY-MM"
+ERROR_MSG_JOB_NOT_FOUND = "Job not found"
+ERROR_MSG_UNKNOWN_JOB_TYPE = "Unknown job type"
+ERROR_MSG_JOB_NOT_FINISHED = "Job is not finished yet"
+ERROR_MSG_INVALID_TIME_WINDOW = "Invalid time window. start must be before end"
+ERROR_MSG_TIME_WINDOW_TOO_LARGE = f"Time window too large. Max {FOOTAGE_SEARCH_MAX_WINDOW_DAYS} days"
+ERROR_MSG_INVALID_COVERAGE_RESOLUTION = "Invalid resolution. Use one of (minutes): " + ", ".join(
+    str(m) for m in COVERAGE_RESOLUTIONS_MINUTES
+)
 ERROR_MSG_ALARM_NOT_FOUND = "Alarm not found"
+ERROR_MSG_INVALID_ALARM_MODE = "Invalid alarm mode. Use one of: " + ", ".join(ALARM_MODES)
+ERROR_MSG_ALARM_PUSH_HOST_REQUIRED = "host is required for push mode (or set ALARM_PUSH_HOST)"
+ERROR_MSG_NO_DEVICES = "device_ids is empty"
 ERROR_MSG_LOW_PRIVILEGE = "Không đủ quyền để thay đổi permission trên thiết bị"
 ERROR_MSG_INVALID_OPERATION = "Thao tác không hợp lệ"
 ERROR_MSG_CANNOT_REACH_DEVICE = "Cannot reach device IP"
@@ -1,5 +1,7 @@
 import os
 import base64
+import hashlib
+import hmac
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives import hashes
@@ -44,3 +46,15 @@ def decrypt_device_password(cipher_text: str) -> str:
     encrypted = raw[12:]
     aesgcm = AESGCM(KEY)
     return aesgcm.decrypt(nonce, encrypted, None).decode()
+
+
+def device_push_token(device_id: int) -> str:
+    """
+    Token trong URL push alarm của device (HMAC theo device_id, không cần lưu DB).
+    Đổi DEVICE_SECRET_KEY → phải cấu hình push lại cho device.
+    """
+    return hmac.new(
+        DEVICE_SECRET_KEY.encode(),
+        f"alarm-push:{device_id}".encode(),
+        hashlib.sha256
+    ).hexdigest()[:32]
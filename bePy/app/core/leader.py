@@ -0,0 +1,118 @@
+"""
+Lease cho các duty background khi chạy nhiều process (uvicorn --workers N)
+
+Mỗi duty giữ 1 PostgreSQL advisory lock (session-level) trên 1 connection riêng:
+- process lấy được lock → chạy duty, ping connection mỗi LEASE_CHECK_SECONDS
+- process không lấy được → thử lại sau LEASE_RETRY_SECONDS
+- process chết / mất connection → Postgres tự nhả lock, process khác nhận lease
+  ở lần thử tiếp theo; process cũ (nếu còn sống) thấy ping lỗi thì dừng duty
+"""
+import asyncio
+import hashlib
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+
+from app.db.session import async_engine
+from app.core.constants import (
+    LEASE_RETRY_SECONDS,
+    LEASE_CHECK_SECONDS,
+    LEASE_DUTY_RESTART_SECONDS,
+)
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+Duty = Callable[[], Awaitable[None]]
+
+
+def lease_key(name: str) -> int:
+    """Tên duty → key bigint cố định cho pg_try_advisory_lock"""
+    digest = hashlib.sha1(f"bepy:lease:{name}".encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class LeaseManager:
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.held: set[str] = set()
+
+    def start(self, name: str, duty: Duty):
+        """Chạy `duty` (coroutine chạy mãi) chỉ khi process này giữ lease `name`"""
+        if name not in self._tasks:
+            self._tasks[name] = asyncio.create_task(self._hold(name, duty))
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        self.held.clear()
+
+    def stats(self) -> dict:
+        return {
+            "duties": sorted(self._tasks),
+            "held": sorted(self.held),
+        }
+
+    async def _hold(self, name: str, duty: Duty):
+        key = lease_key(name)
+
+        while True:
+            try:
+                async with async_engine.connect() as conn:
+                    conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                    acquired = (
+                        await conn.execute(
+                            text("SELECT pg_try_advisory_lock(:key)"),
+                            {"key": key}
+                        )
+                    ).scalar()
+
+                    if acquired:
+                        try:
+                            await self._run_while_held(name, duty, conn)
+                        finally:
+                            self.held.discard(name)
+                            # đóng hẳn connection (không trả về pool) → chắc chắn nhả lock
+                            await conn.invalidate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[LEASE] {name}: {e}")
+
+            await asyncio.sleep(LEASE_RETRY_SECONDS)
+
+    async def _run_while_held(self, name: str, duty: Duty, conn):
+        self.held.add(name)
+        logger.info(f"[LEASE] acquired {name}")
+        duty_task = asyncio.create_task(duty())
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({duty_task}, timeout=LEASE_CHECK_SECONDS)
+
+                if done:
+                    # duty tự dừng / crash → giữ lease, chạy lại
+                    if not duty_task.cancelled() and duty_task.exception():
+                        logger.error(f"[LEASE] {name} duty crashed: {duty_task.exception()}")
+                    await asyncio.sleep(LEASE_DUTY_RESTART_SECONDS)
+                    duty_task = asyncio.create_task(duty())
+                    continue
+
+                # mất connection = Postgres đã nhả lock → phải dừng duty
+                await asyncio.wait_for(
+                    conn.execute(text("SELECT 1")),
+                    timeout=LEASE_CHECK_SECONDS
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[LEASE] lost {name}: {e}")
+        finally:
+            duty_task.cancel()
+            await asyncio.gather(duty_task, return_exceptions=True)
+            logger.info(f"[LEASE] released {name}")
+
+
+lease_manager = LeaseManager()
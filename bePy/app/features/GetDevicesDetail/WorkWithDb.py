@@ -406,3 +406,90 @@ async def save_permissions(
     except Exception:
         await db.rollback()
         raise
+
+
+async def sync_all_user_permissions_of_device(
+    db: AsyncSession,
+    device,
+    headers,
+    progress=None
+) -> dict:
+    """
+    Sync device user từ ISAPI rồi sync permission của từng user.
+    progress(done, total): callback tiến độ (vd JobContext.progress), có thể None.
+    """
+    # =========================
+    # STEP 1: SYNC DEVICE USERS
+    # =========================
+    await sync_device_users_from_isapi(
+        db=db,
+        device=device,
+        headers=headers
+    )
+
+    # =========================
+    # STEP 2: LOAD USERS FROM DB
+    # =========================
+    result = await db.execute(
+        select(DeviceUser).where(DeviceUser.device_id == device.id)
+    )
+    device_users = result.scalars().all()
+
+    if not device_users:
+        return {
+            "success": True,
+            "message": "No device users found after sync",
+            "total": 0,
+            "synced": 0,
+            "errors": []
+        }
+
+    # =========================
+    # STEP 3: SYNC PERMISSIONS
+    # =========================
+    hik = HikDetailService()
+    success_count = 0
+    errors = []
+
+    for index, device_user in enumerate(device_users):
+        try:
+            permission_data = await hik.fetch_permission_for_1_user(
+                device=device,
+                headers=headers,
+                user_id=device_user.user_id
+            )
+
+            if not permission_data:
+                errors.append({
+                    "device_user_id": device_user.id,
+                    "user_id": device_user.user_id,
+                    "error": "FETCH_FAILED"
+                })
+            else:
+                await save_permissions(
+                    db=db,
+                    device_user_id=device_user.id,
+                    permission_data=permission_data
+                )
+                success_count += 1
+
+        except Exception as e:
+            errors.append({
+                "device_user_id": device_user.id,
+                "user_id": device_user.user_id,
+                "error": str(e)
+            })
+
+        if progress:
+            await progress(index + 1, len(device_users))
+
+    await db.commit()
+
+    return {
+        "success": True,
+        "device_id": device.id,
+        "total": len(device_users),
+        "synced": success_count,
+        "failed": len(errors),
+        "errors": errors
+    }
@@ -0,0 +1,86 @@
+"""
+Adapter lưu segment record dạng tsmultirange (channel_record_days.coverage)
+
+Mỗi channel-day chỉ là 1 giá trị tsmultirange thay vì N row trong
+channel_record_time_ranges → ít row, ít index, ghi lại 1 ngày = 1 UPDATE,
+và query theo khoảng thời gian dùng được GiST index (&&, @>).
+
+Chế độ lưu chọn bằng RECORD_COVERAGE_STORAGE (app/core/constants.py).
+"""
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import Range
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.channel_record_day import ChannelRecordDay
+from app.schemas.record import RecordTimeRange
+from app.core.constants import (
+    RECORD_COVERAGE_STORAGE,
+    RECORD_STORAGE_ROWS,
+    RECORD_STORAGE_MULTIRANGE,
+)
+
+# cùng giới hạn bind param asyncpg như work_with_db.BULK_CHUNK_SIZE
+BULK_CHUNK_SIZE = 5000
+
+
+def writes_rows() -> bool:
+    return RECORD_COVERAGE_STORAGE != RECORD_STORAGE_MULTIRANGE
+
+
+def writes_multirange() -> bool:
+    return RECORD_COVERAGE_STORAGE != RECORD_STORAGE_ROWS
+
+
+def reads_multirange() -> bool:
+    return RECORD_COVERAGE_STORAGE != RECORD_STORAGE_ROWS
+
+
+def to_multirange(segments: list[RecordTimeRange]) -> list[Range]:
+    """[RecordTimeRange] đã merge → giá trị tsmultirange (các range [start, end))"""
+    return [
+        Range(seg.start_time, seg.end_time, bounds="[)")
+        for seg in sorted(segments, key=lambda s: s.start_time)
+        if seg.start_time < seg.end_time
+    ]
+
+
+def to_spans(coverage: list[Range] | None) -> list[tuple[datetime, datetime]]:
+    """tsmultirange đọc từ DB → [(start, end)] (Postgres trả về đã sort, không chồng lấn)"""
+    if not coverage:
+        return []
+    return [(r.lower, r.upper) for r in coverage if not r.isempty]
+
+
+async def bulk_write_coverage(
+    db: AsyncSession,
+    ranges_by_day: dict[int, list[RecordTimeRange]]
+) -> int:
+    """
+    ranges_by_day = { record_day_id: [RecordTimeRange] }
+    So với coverage đang lưu, chỉ UPDATE ngày có thay đổi.
+    Trả về số record day được cập nhật.
+    """
+    day_ids = list(ranges_by_day.keys())
+
+    stored: dict[int, list[tuple[datetime, datetime]]] = {}
+    for i in range(0, len(day_ids), BULK_CHUNK_SIZE):
+        result = await db.execute(
+            select(ChannelRecordDay.id, ChannelRecordDay.coverage)
+            .where(ChannelRecordDay.id.in_(day_ids[i:i + BULK_CHUNK_SIZE]))
+        )
+        for row in result:
+            stored[row.id] = to_spans(row.coverage)
+
+    update_rows = []
+    for record_day_id, segments in ranges_by_day.items():
+        coverage = to_multirange(segments)
+        if to_spans(coverage) != stored.get(record_day_id):
+            update_rows.append({"id": record_day_id, "coverage": coverage})
+
+    for i in range(0, len(update_rows), BULK_CHUNK_SIZE):
+        # ORM bulk UPDATE theo primary key (executemany)
+        await db.execute(update(ChannelRecordDay), update_rows[i:i + BULK_CHUNK_SIZE])
+
+    return len(update_rows)
@@ -0,0 +1,81 @@
+"""
+Cache dailyDistribution theo (device_id, channel_no, year, month)
+
+Tháng hiện tại vẫn đang ghi nên TTL ngắn, các tháng đã qua chỉ đổi ở biên
+retention (ngày cũ nhất bị NVR xóa) → TTL dài + invalidate khi oldest đổi.
+"""
+import time
+
+from app.core.time_provider import TimeProvider
+from app.core.constants import (
+    DAILY_DIST_CACHE_CURRENT_MONTH_TTL_SECONDS,
+    DAILY_DIST_CACHE_CLOSED_MONTH_TTL_SECONDS
+)
+
+CacheKey = tuple[int, int, int, int]
+
+
+class DailyDistributionCache:
+    """
+    In-process cache { dayOfMonth: has_record } cho từng tháng của từng channel.
+    """
+
+    def __init__(
+        self,
+        current_month_ttl: float = DAILY_DIST_CACHE_CURRENT_MONTH_TTL_SECONDS,
+        closed_month_ttl: float = DAILY_DIST_CACHE_CLOSED_MONTH_TTL_SECONDS
+    ):
+        self.current_month_ttl = current_month_ttl
+        self.closed_month_ttl = closed_month_ttl
+        self.time_provider = TimeProvider()
+
+        # key -> (expires_at monotonic, record_map)
+        self._entries: dict[CacheKey, tuple[float, dict[int, bool]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self, year: int, month: int) -> float:
+        now = self.time_provider.now()
+        if (year, month) >= (now.year, now.month):
+            return self.current_month_ttl
+        return self.closed_month_ttl
+
+    def get(self, device_id: int, channel_no: int, year: int, month: int) -> dict[int, bool] | None:
+        key = (device_id, channel_no, year, month)
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[1]
+
+    def set(self, device_id: int, channel_no: int, year: int, month: int, record_map: dict[int, bool]):
+        self._entries[(device_id, channel_no, year, month)] = (
+            time.monotonic() + self._ttl(year, month),
+            record_map
+        )
+
+    def invalidate_channel(self, device_id: int, channel_no: int):
+        """Xóa mọi tháng của 1 channel (vd: oldest_record_date vừa đổi)"""
+        for key in [k for k in self._entries if k[0] == device_id and k[1] == channel_no]:
+            del self._entries[key]
+
+    def invalidate_device(self, device_id: int):
+        """Xóa mọi tháng của mọi channel thuộc device (vd: init lại device)"""
+        for key in [k for k in self._entries if k[0] == device_id]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+daily_distribution_cache = DailyDistributionCache()
@@ -1,8 +1,9 @@
+import asyncio
 import httpx
 import uuid
 import xml.etree.ElementTree as ET
 from sqlalchemy.exc import SQLAlchemyError
-from datetime import datetime, timedelta, time
+from datetime import date, datetime, timedelta, time
 from typing import List
 from app.schemas.record import (
     ChannelRecordInfo,
@@ -11,85 +12,208 @@ from app.schemas.record import (
 from app.features.deps import build_hik_auth, to_date
 from app.core.time_provider import TimeProvider
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update, or_
 from app.Models.device import Device    
 from app.Models.channel import Channel
-from app.Models.channel_record_day import ChannelRecordDay
 from collections import defaultdict
-from app.Models.channel_record_time_range import ChannelRecordTimeRange
 from app.core.http_client import get_http_client
+from app.core.constants import (
+    RECORD_SYNC_CONCURRENCY,
+    HOT_SYNC_YESTERDAY_GRACE_MINUTES,
+    BACKFILL_FIRST_CHUNK_DAYS,
+    BACKFILL_CHUNK_DAYS
+)
+from app.features.RecordInfo.daily_distribution_cache import daily_distribution_cache
+from app.services.channel_cache import channel_cache
+from app.features.RecordInfo.work_with_db import bulk_write_channel_record_data, lock_device_record_writes
+from app.features.RecordInfo import intervals
 from app.core.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# CMSearch: số kết quả mỗi trang và số trang tối đa cho 1 lần search (chặn loop vô hạn)
+CM_SEARCH_PAGE_SIZE = 200
+CM_SEARCH_MAX_PAGES = 500
+# Số trackID tối đa trong 1 CMSearch (NVR cũ giới hạn trackList)
+CM_SEARCH_MAX_TRACKS = 16
+# Lùi tối đa bao nhiêu tháng khi tìm oldest_record_date
+OLDEST_RECORD_MAX_MONTHS = 120
+
+
+class CMSearchError(Exception):
+    """CMSearch trả HTTP != 200 (ở bất kỳ trang nào) → kết quả thiếu, không được coi là không có record"""
+
+
+def bucket_spans_by_day(
+    spans: list[tuple[str, str]],
+    start_day: date,
+    end_day: date
+) -> dict[date, list[RecordTimeRange]]:
+    """
+    Clip các span (start, end) dạng chuỗi ISO vào từng ngày trong [start_day, end_day] và merge trong ngày.
+    Mỗi ngày được clip trong [00:00:00, 23:59:59] giống get_time_ranges_segment cũ.
+    Tính toán trên mảng int64 (xem intervals.py), chỉ tạo RecordTimeRange cho kết quả cuối.
+    """
+    by_day = intervals.split_by_day(intervals.from_iso_spans(spans), start_day, end_day)
+    return {
+        day: intervals.to_ranges(day_intervals)
+        for day, day_intervals in by_day.items()
+    }
+
+
+def month_chunks(start_day: date, end_day: date) -> list[tuple[date, date]]:
+    """
+    Chia [start_day, end_day] thành các đoạn theo tháng dương lịch.
+    """
+    chunks = []
+    current = start_day
+
+    while current <= end_day:
+        if current.month == 12:
+            next_month = date(current.year + 1, 1, 1)
+        else:
+            next_month = date(current.year, current.month + 1, 1)
+
+        chunk_end = min(end_day, next_month - timedelta(days=1))
+        chunks.append((current, chunk_end))
+        current = next_month
+
+    return chunks
+
+
 class HikRecordService():
     def __init__(self):
         self.client = get_http_client()
 
-    async def oldest_record_date(self, device, channel_id: int, headers) -> str | None:
-        time_provider = TimeProvider()
-        now = time_provider.now()
-        year = now.year
-        month = now.month
-
-        base_url = f"http://{device.ip_web}"
-        oldest_date: str | None = None
-
-        while True:
-            payload = f"""<?xml version="1.0" encoding="utf-8"?>
+    async def _fetch_daily_distribution(
+        self,
+        device,
+        channel_id: int,
+        year: int,
+        month: int,
+        headers,
+        use_cache: bool = True
+    ) -> dict[int, bool] | None:
+        """
+        dailyDistribution của 1 tháng: { dayOfMonth: has_record }.
+        Trả None nếu device trả lỗi.
+        use_cache=False: luôn hỏi device (vẫn ghi lại vào cache).
+        """
+        if use_cache:
+            cached = daily_distribution_cache.get(device.id, channel_id, year, month)
+            if cached is not None:
+                return cached
+
+        url = (
+            f"http://{device.ip_web}"
+            f"/ISAPI/ContentMgmt/record/tracks/{channel_id}/dailyDistribution"
+        )
+        payload = f"""<?xml version="1.0" encoding="utf-8"?>
     <trackDailyParam>
         <year>{year}</year>
         <monthOfYear>{month}</monthOfYear>
     </trackDailyParam>
     """
 
-            url = (
-                f"{base_url}"
-                f"/ISAPI/ContentMgmt/record/tracks/{channel_id}/dailyDistribution"
-            )
-            # logger.info(f"Requesting URL: {url}")
+        resp = await self.client.post(url, content=payload, headers=headers)
 
-            resp = await self.client.post(
-                url,
-                content=payload,
-                headers=headers
+        if resp.status_code != 200:
+            logger.error(
+                f"dailyDistribution channel {channel_id} {year}-{month:02d}: "
+                f"HTTP {resp.status_code}"
             )
+            return None
 
-            # print(f"Response Status Code: {resp.status_code}")
+        root = ET.fromstring(resp.text)
 
-            if resp.status_code != 200:
-                logger.error("Error: API returned non-200 status.")
-                break
-
-            root = ET.fromstring(resp.text)
-            days = root.findall(".//{*}day")
+        record_map = {}
+        for day in root.findall(".//{*}day"):
+            day_num = int(day.find("{*}dayOfMonth").text)
+            record_text = day.find("{*}record")
+            record_map[day_num] = (
+                record_text is not None and record_text.text.lower() == "true"
+            )
 
-            found_in_month = False
+        daily_distribution_cache.set(device.id, channel_id, year, month, record_map)
+        return record_map
 
-            for d in days:
-                record = d.find("{*}record")
-                if record is not None and record.text.lower() == "true":
-                    day_num = int(d.find("{*}dayOfMonth").text)
+    async def oldest_record_date(self, device, channel_id: int, headers, hint=None) -> str | None:
+        """
+        Tìm ngày có record cũ nhất của channel.
 
-                    # Lưu lại ngày oldest của tháng này
-                    oldest_date = f"{year}-{month:02d}-{day_num:02d}"
-                    logger.info(f"Found record at: {oldest_date}")
+        Coi các tháng có record là 1 dải liên tục tính từ tháng hiện tại lùi về
+        (retention của NVR), nên tìm biên bằng cách nhảy lùi 1, 2, 4, 8... tháng
+        rồi chia đôi → O(log n) request thay vì 1 request / tháng.
 
-                    found_in_month = True
-                    break  # không cần duyệt tiếp ngày trong tháng
+        hint: oldest_record_date cũ của channel hoặc của channel khác cùng device.
+        Nếu biên không đổi thì chỉ tốn 2 request.
+        """
+        now = TimeProvider().now()
+        now_index = now.year * 12 + now.month - 1
 
-            #  cả tháng không có record → dừng luôn
-            if not found_in_month:
-                logger.info(f"No records found for {year}-{month}, stop searching.")
-                break
+        # offset (số tháng lùi từ tháng hiện tại) -> ngày đầu tiên có record, None nếu tháng trống
+        probed: dict[int, int | None] = {}
 
-            #  có record → lùi tháng
-            month -= 1
-            if month == 0:
-                month = 12
-                year -= 1
+        async def first_record_day(offset: int) -> int | None:
+            if offset not in probed:
+                year, month_index = divmod(now_index - offset, 12)
+                record_map = await self._fetch_daily_distribution(
+                    device, channel_id, year, month_index + 1, headers
+                )
+                recorded = sorted(
+                    day for day, has_record in (record_map or {}).items() if has_record
+                )
+                probed[offset] = recorded[0] if recorded else None
+            return probed[offset]
+
+        # lo: offset chắc chắn có record, hi: offset chắc chắn trống (hoặc chưa biết)
+        lo = None
+        hi = None
+
+        hint_day = to_date(hint) if hint else None
+        if hint_day:
+            hint_offset = now_index - (hint_day.year * 12 + hint_day.month - 1)
+            if 0 < hint_offset <= OLDEST_RECORD_MAX_MONTHS:
+                if await first_record_day(hint_offset) is not None:
+                    lo = hint_offset
+                else:
+                    hi = hint_offset
+
+        if lo is None:
+            if await first_record_day(0) is None:
+                logger.info(f"No records found for current month, channel {channel_id}")
+                return None
+            lo = 0
+
+        # gallop lùi cho tới khi gặp tháng trống
+        if hi is None:
+            step = 1
+            while True:
+                probe = min(lo + step, OLDEST_RECORD_MAX_MONTHS)
+                if probe == lo:
+                    hi = lo + 1
+                    break
+                if await first_record_day(probe) is None:
+                    hi = probe
+                    break
+                lo = probe
+                step *= 2
+
+        # chia đôi trong (lo, hi)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if await first_record_day(mid) is not None:
+                lo = mid
+            else:
+                hi = mid
+
+        year, month_index = divmod(now_index - lo, 12)
+        oldest_date = f"{year}-{month_index + 1:02d}-{probed[lo]:02d}"
 
-        logger.info(f"Returning oldest record date: {oldest_date}")
+        logger.info(
+            f"Returning oldest record date: {oldest_date} "
+            f"(channel {channel_id}, {len(probed)} requests)"
+        )
         return oldest_date
 
 
@@ -134,27 +258,38 @@ class HikRecordService():
 
         return channels
 
-    async def get_time_ranges_segment(self, device, channel_id: int, date_str: str, headers) -> list[RecordTimeRange]:
-            day = to_date(date_str)
-            day_start = datetime.combine(day, time(0, 0, 0))
-            day_end = datetime.combine(day, time(23, 59, 59))
-
-
-            # Expand the search by ±1 day to be sure
-            search_start = day_start - timedelta(days=1)
-            search_end = day_end + timedelta(days=1) 
+    async def _search_record_spans(
+        self,
+        device,
+        channel_ids: list[int],
+        search_start: datetime,
+        search_end: datetime,
+        headers
+    ) -> dict[int, list[tuple[str, str]]]:
+        """
+        CMSearch nhiều channel (trackList) trong [search_start, search_end] bằng 1 request/trang.
+        Tự phân trang qua searchResultPostion cho tới khi device hết trả "MORE",
+        kết quả được tách lại theo trackID, dạng chuỗi ISO (start, end).
+        Raise CMSearchError nếu có trang lỗi (không trả về span thiếu).
+        """
+        # Giữ nguyên searchID cho mọi trang của cùng 1 lần search
+        search_id = str(uuid.uuid4()).upper()
+        url = f"http://{device.ip_web}/ISAPI/ContentMgmt/search"
+        track_list = "".join(
+            f"<trackID>{channel_id}</trackID>" for channel_id in channel_ids
+        )
 
-            # ========================
-            # ISAPI SEARCH
-            # ========================
-            search_id = str(uuid.uuid4()).upper()
-            base_url = f"http://{device.ip_web}"
+        spans: dict[int, list[tuple[str, str]]] = {
+            channel_id: [] for channel_id in channel_ids
+        }
+        position = 0
 
+        for _ in range(CM_SEARCH_MAX_PAGES):
             payload = f"""<?xml version="1.0" encoding="utf-8"?>
     <CMSearchDescription>
     <searchID>{search_id}</searchID>
     <trackList>
-        <trackID>{channel_id}</trackID>
+        {track_list}
     </trackList>
     <timeSpanList>
         <timeSpan>
@@ -162,28 +297,21 @@ class HikRecordService():
         <endTime>{search_end.strftime('%Y-%m-%dT%H:%M:%S')}Z</endTime>
         </timeSpan>
     </timeSpanList>
-    <maxResults>200</maxResults>
-    <searchResultPostion>0</searchResultPostion>
+    <maxResults>{CM_SEARCH_PAGE_SIZE}</maxResults>
+    <searchResultPostion>{position}</searchResultPostion>
     <metadataList>
         <metadataDescriptor>//recordType.meta.std-cgi.com</metadataDescriptor>
     </metadataList>
     </CMSearchDescription>
     """
 
-            #print(f"Tìm từ ngày {search_start} tới {search_end}.")
-            
-           
-            resp = await self.client.post(
-                    f"{base_url}/ISAPI/ContentMgmt/search",
-                    content=payload,
-                    headers=headers
-                )
-            #  print(f"Requesting URL: {repr(f'{base_url}/ISAPI/ContentMgmt/search')}")
-            # print(f"Response Status Code: {resp.status_code}")
+            resp = await self.client.post(url, content=payload, headers=headers)
 
             if resp.status_code != 200:
-                #print("Error: API returned non-200 status.")
-                return []
+                raise CMSearchError(
+                    f"CMSearch tracks {channel_ids} failed at position {position}: "
+                    f"HTTP {resp.status_code}"
+                )
 
             # =========================
             # PARSE XML
@@ -191,8 +319,6 @@ class HikRecordService():
             root = ET.fromstring(resp.text)
             items = root.findall(".//{*}searchMatchItem")
 
-            result: list[RecordTimeRange] = []
-
             for item in items:
                 ts = item.find("./{*}timeSpan")
                 if ts is None:
@@ -203,52 +329,107 @@ class HikRecordService():
                 if s is None or e is None:
                     continue
 
-                start = datetime.fromisoformat(s.text.replace("Z", ""))
-                end = datetime.fromisoformat(e.text.replace("Z", ""))
-                
-                # ====================
-                # CLIP VÀ CHỈ GIỮ TRONG NGÀY
-                # ====================
-                if end <= day_start or start >= day_end:
+                track_text = item.findtext("{*}trackID")
+                if track_text and track_text.strip().isdigit():
+                    track_id = int(track_text)
+                elif len(channel_ids) == 1:
+                    # 1 track thì không cần trackID để biết của channel nào
+                    track_id = channel_ids[0]
+                else:
                     continue
 
-                clipped_start = max(start, day_start)
-                clipped_end = min(end, day_end)
-                if clipped_start < clipped_end:
-                    result.append(
-                        RecordTimeRange(
-                            start_time=clipped_start,
-                            end_time=clipped_end
-                        )
-                    )
+                if track_id not in spans:
+                    continue
+
+                # giữ chuỗi ISO, intervals.from_iso_spans parse hàng loạt sau
+                spans[track_id].append((
+                    s.text.replace("Z", ""),
+                    e.text.replace("Z", "")
+                ))
+
+            status = (root.findtext("{*}responseStatusStrg") or "").upper()
+            num_matches = int(root.findtext("{*}numOfMatches") or len(items))
+
+            if status != "MORE" or num_matches == 0:
+                break
+
+            position += num_matches
+
+        return spans
+
+    async def get_time_ranges_by_day_multi(
+        self,
+        device,
+        channel_ids: list[int],
+        start_date,
+        end_date,
+        headers
+    ) -> dict[int, dict[date, list[RecordTimeRange]]]:
+        """
+        Như get_time_ranges_by_day nhưng cho nhiều channel của cùng 1 NVR:
+        gom tối đa CM_SEARCH_MAX_TRACKS channel vào 1 lần search.
+        Trả về { channel_id: { ngày: [RecordTimeRange] } } (đã merge trong ngày).
+        """
+        start_day = to_date(start_date)
+        end_day = to_date(end_date)
+
+        # Expand the search by ±1 day to be sure (chỉ ở 2 đầu khoảng, không phải mỗi ngày)
+        search_start = datetime.combine(start_day, time(0, 0, 0)) - timedelta(days=1)
+        search_end = datetime.combine(end_day, time(23, 59, 59)) + timedelta(days=1)
+
+        result: dict[int, dict[date, list[RecordTimeRange]]] = {}
+
+        for i in range(0, len(channel_ids), CM_SEARCH_MAX_TRACKS):
+            batch = channel_ids[i:i + CM_SEARCH_MAX_TRACKS]
+            spans = await self._search_record_spans(
+                device,
+                batch,
+                search_start,
+                search_end,
+                headers
+            )
+            for channel_id in batch:
+                result[channel_id] = bucket_spans_by_day(
+                    spans.get(channel_id, []),
+                    start_day,
+                    end_day
+                )
 
-        # print(f"Tìm thấy {len(result)} record segment.")
-        # print(f"Time ranges: {', '.join([f'{r.start_time.strftime('%Y-%m-%d %H:%M:%S')} → {r.end_time.strftime('%Y-%m-%d %H:%M:%S')}' for r in result])}")
-            return result
+        return result
+
+    async def get_time_ranges_by_day(
+        self,
+        device,
+        channel_id: int,
+        start_date,
+        end_date,
+        headers
+    ) -> dict[date, list[RecordTimeRange]]:
+        """
+        1 lần search (có phân trang) cho cả khoảng ngày, rồi clip + merge segment theo từng ngày.
+        Segment vắt qua nửa đêm sẽ có mặt ở cả 2 ngày.
+        Ngày không có segment thì không có key.
+        """
+        by_channel = await self.get_time_ranges_by_day_multi(
+            device,
+            [channel_id],
+            start_date,
+            end_date,
+            headers
+        )
+        return by_channel.get(channel_id, {})
+
+    async def get_time_ranges_segment(self, device, channel_id: int, date_str: str, headers) -> list[RecordTimeRange]:
+            day = to_date(date_str)
+            by_day = await self.get_time_ranges_by_day(device, channel_id, day, day, headers)
+            return by_day.get(day, [])
 
     async def merge_time_ranges(self, ranges: List[RecordTimeRange], gap_seconds: int = 5) -> List[RecordTimeRange]:
             if not ranges:
                 return []
 
-            ranges = sorted(ranges, key=lambda r: r.start_time)
-            merged: List[RecordTimeRange] = []
-            tol = timedelta(seconds=gap_seconds)
-
-            for r in ranges:
-                if not merged:
-                    merged.append(r)
-                    continue
-
-                last = merged[-1]
-                if r.start_time <= last.end_time + tol:
-                    last.end_time = max(last.end_time, r.end_time)
-                else:
-                    merged.append(r)
-            
-            #print(f"Merged {len(merged)} time ranges. ")
-            #print(f"Time ranges after merge: {', '.join([f'{r.start_time.strftime('%Y-%m-%d %H:%M:%S')} → {r.end_time.strftime('%Y-%m-%d %H:%M:%S')} ' for r in merged])}")
-        
-            return merged
+            merged = intervals.merge_intervals(intervals.from_ranges(ranges), gap_seconds)
+            return intervals.to_ranges(merged)
 
     async def record_status_of_channel(
         self,
@@ -256,16 +437,15 @@ class HikRecordService():
         channel_id: int,
         start_date: str,
         end_date: str,
-        header
+        header,
+        use_cache: bool = True
     ) -> list[dict]:
         """
         Kiểm tra trạng thái record của channel trong khoảng ngày.
-        
+        dailyDistribution được cache theo tháng (xem daily_distribution_cache),
+        use_cache=False để bắt buộc hỏi lại device.
         """
 
-        base_url = f"http://{device.ip_web}"
-        url = f"{base_url}/ISAPI/ContentMgmt/record/tracks/{channel_id}/dailyDistribution"
-
         start_dt = to_date(start_date)
         end_dt = to_date(end_date)
 
@@ -281,36 +461,17 @@ class HikRecordService():
         
         for (year, month), days_in_month in months.items():
 
-                payload = f"""<?xml version="1.0" encoding="utf-8"?>
-                <trackDailyParam>
-                    <year>{year}</year>
-                    <monthOfYear>{month}</monthOfYear>
-                </trackDailyParam>
-                """
-
-                resp = await self.client.post(url, content=payload, headers=header)
-
-                if resp.status_code != 200:
-                    # Nếu lỗi → đánh false cho toàn bộ ngày trong tháng đó
-                    for d in days_in_month:
-                        results.append({
-                            "date": d.strftime("%Y-%m-%d"),
-                            "has_record": False
-                        })
-                    continue
-
-                # Parse XML
-                root = ET.fromstring(resp.text)
-
-                # Map dayOfMonth -> has_record
-                record_map = {}
+                record_map = await self._fetch_daily_distribution(
+                    device,
+                    channel_id,
+                    year,
+                    month,
+                    header,
+                    use_cache=use_cache
+                )
 
-                for day in root.findall(".//{*}day"):
-                    day_num = int(day.find("{*}dayOfMonth").text)
-                    record_text = day.find("{*}record")
-                    record_map[day_num] = (
-                        record_text is not None and record_text.text.lower() == "true"
-                    )
+                # Nếu lỗi → đánh false cho toàn bộ ngày trong tháng đó
+                record_map = record_map or {}
 
                 # Lấy đúng các ngày cần kiểm tra
                 for d in days_in_month:
@@ -324,8 +485,15 @@ class HikRecordService():
     async def sync_device_channels_data_core(
         self,
         db: AsyncSession,
-        device: Device
+        device: Device,
+        concurrency: int | None = None
     ):
+            """
+            Sync channel list + record data của device.
+            Channel và ngày trong channel được fetch song song (tối đa `concurrency`
+            request cùng lúc, mặc định RECORD_SYNC_CONCURRENCY; concurrency=1 == tuần tự),
+            sau đó ghi db theo thứ tự trong 1 lượt.
+            """
             logger.info(f"Start syncing device {device.id} channels data...")
             headers = build_hik_auth(device)
             hik_service = HikRecordService()
@@ -333,7 +501,7 @@ class HikRecordService():
             today = time_provider.now().date()
 
             # =========================
-            # 1. SYNC CHANNEL LIST
+            # 1. CHANNEL LIST (NVR vs DB)
             # =========================
             nvr_channels = await hik_service._get_channels(device, headers)
             if not nvr_channels:
@@ -347,6 +515,48 @@ class HikRecordService():
             db_map = {c.channel_no: c for c in db_channels}
             nvr_ids = {c["id"] for c in nvr_channels}
 
+            # chỉ xóa cache metadata channel khi có channel mới / đổi tên / đổi trạng thái
+            channels_changed = any(
+                ch["id"] not in db_map
+                or (db_map[ch["id"]].name, db_map[ch["id"]].connected_type, db_map[ch["id"]].is_active)
+                != (ch["name"], ch["connected_type"], True)
+                for ch in nvr_channels
+            ) or any(
+                ch.is_active for ch_no, ch in db_map.items() if ch_no not in nvr_ids
+            )
+
+            # =========================
+            # 2. FETCH RECORD DATA
+            # =========================
+            #  channel active sau sync = đúng các channel NVR trả về (channel mới sync từ hôm nay)
+            sync_ranges = {}
+            for ch in nvr_channels:
+                channel = db_map.get(ch["id"])
+                if channel and channel.last_sync_at:
+                    sync_from = channel.last_sync_at.date()
+                else:
+                    sync_from = (channel.oldest_record_date if channel else None) or today
+                sync_ranges[ch["id"]] = sync_from
+
+                logger.info(f"Syncing channel {ch['id']} from {sync_from}")
+
+            #  FETCH SONG SONG TỪ NVR (chỉ network, chưa ghi gì → transaction chưa giữ lock nào)
+            sem = asyncio.Semaphore(max(1, concurrency or RECORD_SYNC_CONCURRENCY))
+            fetched = await self._fetch_device_record_data(
+                device,
+                sync_ranges,
+                today,
+                headers,
+                sem
+            )
+
+            # =========================
+            # 3. GHI DB 1 LƯỢT CHO CẢ DEVICE
+            # =========================
+            #  khóa ghi record của device trước lệnh ghi đầu tiên (xem lock_device_record_writes)
+            await lock_device_record_writes(db, device.id)
+
+            active_channels = []
             for ch in nvr_channels:
                 if ch["id"] not in db_map:
                     channel = Channel(
@@ -357,7 +567,6 @@ class HikRecordService():
                         is_active=True
                     )
                     db.add(channel)
-                    await db.flush()
                 else:
                     channel = db_map[ch["id"]]
                     channel.name = ch["name"]
@@ -365,116 +574,241 @@ class HikRecordService():
                     channel.is_active = True
 
                 channel.last_channel_sync_at = datetime.utcnow()
+                active_channels.append(channel)
 
             for ch_no, ch in db_map.items():
                 if ch_no not in nvr_ids:
                     ch.is_active = False
 
-            await db.flush()
+            await db.flush()  #  cần channel.id của channel mới
 
-            # =========================
-            # 2. SYNC RECORD DATA
-            # =========================
+            #  bump channels_version (UPDATE devices) cũng sau fetch: không giữ row device lúc chờ NVR
+            if channels_changed:
+                await channel_cache.invalidate_on_commit(db, device.id)
 
-            
-            result = await db.execute(
-                select(Channel).where(
-                    Channel.device_id == device.id,
-                    Channel.is_active == True
-                )
+            #  bulk upsert, vài statement
+            day_count, range_changes = await bulk_write_channel_record_data(
+                db,
+                {
+                    channel.id: fetched[channel.channel_no]
+                    for channel in active_channels
+                }
             )
-            active_channels = result.scalars().all()
 
             for channel in active_channels:
-                if channel.last_sync_at:
-                    sync_from = channel.last_sync_at.date()
-                else:
-                    sync_from = channel.oldest_record_date or today
+                channel.last_sync_at =  datetime.now()
+                channel.latest_record_date = today
 
-                logger.info(f"Syncing channel {channel.channel_no} from {sync_from}")
+            logger.info(
+                f"Device {device.id} synced: {day_count} record days | "
+                f"time ranges {range_changes}"
+            )
 
-                #  (1) LOAD TRƯỚC record_day CỦA CHANNEL
-                result = await db.execute(
-                    select(ChannelRecordDay).where(ChannelRecordDay.channel_id == channel.id)
-                )
-                existing_days = {
-                    d.record_date: d
-                    for d in result.scalars().all()
-                }
+    async def sync_device_today_segments(
+        self,
+        db: AsyncSession,
+        device: Device,
+        concurrency: int | None = None,
+        channel_nos: list[int] | None = None
+    ):
+        """
+        Tầng nóng: chỉ làm mới segment hôm nay (và hôm qua trong HOT_SYNC_YESTERDAY_GRACE_MINUTES
+        phút đầu ngày) cho các channel active.
+        Không gọi dailyDistribution, không sync channel list, không đụng last_sync_at
+        → đoạn lịch sử vẫn do sync_device_channels_data_core đối soát.
+        channel_nos: chỉ refresh các channel này (vd: channel vừa có event từ alertStream).
+        """
+        now = TimeProvider().now()
+        today = now.date()
+
+        # danh sách channel lấy từ channel_cache (chạy dày cho mọi device → không query channels mỗi lượt)
+        device_channels = await channel_cache.get_device_channels(device.id)
+        active_channels = [
+            channel for channel in device_channels.values()
+            if channel["is_active"]
+            and (channel_nos is None or channel["channel_no"] in channel_nos)
+        ]
+        if not active_channels:
+            return
+
+        days = [today]
+        if now.hour * 60 + now.minute < HOT_SYNC_YESTERDAY_GRACE_MINUTES:
+            days.insert(0, today - timedelta(days=1))
+
+        headers = build_hik_auth(device)
+        channel_nos = [channel["channel_no"] for channel in active_channels]
+        sem = asyncio.Semaphore(max(1, concurrency or RECORD_SYNC_CONCURRENCY))
 
-                #  (2) LẤY STATUS RECORD
-                record_days = await hik_service.record_status_of_channel(
+        failed_channel_nos: set[int] = set()
+
+        async def fetch_batch(batch: list[int]):
+            async with sem:
+                try:
+                    return await self.get_time_ranges_by_day_multi(
+                        device,
+                        batch,
+                        days[0],
+                        today,
+                        headers
+                    )
+                except CMSearchError as ex:
+                    # search lỗi ≠ không có record: bỏ qua batch này, giữ nguyên dữ liệu cũ trong db
+                    logger.error(f"Device {device.id} hot sync skipped channels {batch}: {ex}")
+                    failed_channel_nos.update(batch)
+                    return {}
+
+        batch_results = await asyncio.gather(*(
+            fetch_batch(channel_nos[i:i + CM_SEARCH_MAX_TRACKS])
+            for i in range(0, len(channel_nos), CM_SEARCH_MAX_TRACKS)
+        ))
+        by_channel = {}
+        for batch_result in batch_results:
+            by_channel.update(batch_result)
+
+        active_channels = [
+            channel for channel in active_channels
+            if channel["channel_no"] not in failed_channel_nos
+        ]
+        if not active_channels:
+            return
+
+        data_by_channel = {}
+        for channel in active_channels:
+            channel_segments = by_channel.get(channel["channel_no"], {})
+            channel_data = []
+            for day in days:
+                segments = channel_segments.get(day, [])
+                channel_data.append((day, bool(segments), segments))
+            data_by_channel[channel["id"]] = channel_data
+
+        await lock_device_record_writes(db, device.id)
+        _, range_changes = await bulk_write_channel_record_data(db, data_by_channel)
+
+        await db.execute(
+            update(Channel)
+            .where(Channel.id.in_(list(data_by_channel)))
+            .values(latest_record_date=today)
+        )
+
+        logger.info(f"Device {device.id} today segments refreshed: {range_changes}")
+
+    async def _fetch_device_record_data(
+        self,
+        device,
+        sync_ranges: dict[int, date],
+        until: date,
+        headers,
+        sem: asyncio.Semaphore
+    ) -> dict[int, list[tuple[date, bool, list[RecordTimeRange]]]]:
+        """
+        Lấy record status + segment (đã merge) cho nhiều channel của 1 device.
+        sync_ranges = { channel_no: sync_from }, lấy từ sync_from tới until (thường là hôm nay).
+
+        - dailyDistribution: song song theo channel
+        - CMSearch: 1 search / tháng cho mọi channel có record trong tháng đó (trackList),
+          các tháng chạy song song; search lỗi thì CMSearchError được raise lên để
+          caller không ghi đè dữ liệu (không commit last_sync_at / backfill_until)
+        Mọi request đều đi qua `sem` để giới hạn số request đồng thời tới cùng 1 NVR.
+        """
+        async def fetch_status(channel_no: int, sync_from: date) -> list[dict]:
+            async with sem:
+                return await self.record_status_of_channel(
                     device,
-                    channel.channel_no,
+                    channel_no,
                     sync_from.strftime("%Y-%m-%d"),
-                    today.strftime("%Y-%m-%d"),
+                    until.strftime("%Y-%m-%d"),
                     headers
                 )
 
-                
-                for rd in record_days:
-                    record_date = datetime.strptime(rd["date"], "%Y-%m-%d").date()
-                    has_record = rd["has_record"]
-
-                    record_day = existing_days.get(record_date)
-
-                    if not record_day:
-                        record_day = ChannelRecordDay(
-                            channel_id=channel.id,
-                            record_date=record_date,
-                            has_record=has_record
-                        )
-                        db.add(record_day)
-                        await db.flush()
-                        existing_days[record_date] = record_day
-                    else:
-                        record_day.has_record = has_record
-
-                    #  CHỈ SYNC SEGMENT GẦN HIỆN TẠI thì thêm "and record_date >= today - timedelta(days=2)"" vào if condition
-                    if has_record :
-                        segments = await hik_service.get_time_ranges_segment(
-                            device,
-                            channel.channel_no,
-                            record_date.strftime("%Y-%m-%d"),
-                            headers
-                        )
-                        segments = await hik_service.merge_time_ranges(segments)
-
-                        await db.execute(
-                            delete(ChannelRecordTimeRange).where(
-                                ChannelRecordTimeRange.record_day_id == record_day.id
-                            )
-                        )
-
-                        for seg in segments:
-                            db.add(ChannelRecordTimeRange(
-                                record_day_id=record_day.id,
-                                start_time=seg.start_time,
-                                end_time=seg.end_time
-                            ))
+        statuses = await asyncio.gather(*(
+            fetch_status(channel_no, sync_from)
+            for channel_no, sync_from in sync_ranges.items()
+        ))
+        record_days_map = dict(zip(sync_ranges, statuses))
+
+        recorded_map = {
+            channel_no: [to_date(rd["date"]) for rd in record_days if rd["has_record"]]
+            for channel_no, record_days in record_days_map.items()
+        }
+
+        #  Gom channel theo tháng: (year, month) -> [start, end, channel_nos]
+        #  CHỈ SYNC SEGMENT GẦN HIỆN TẠI thì lọc thêm "record_date >= today - timedelta(days=2)"
+        month_tracks: dict[tuple[int, int], list] = {}
+        for channel_no, recorded_days in recorded_map.items():
+            if not recorded_days:
+                continue
+            for chunk_start, chunk_end in month_chunks(recorded_days[0], recorded_days[-1]):
+                entry = month_tracks.setdefault(
+                    (chunk_start.year, chunk_start.month),
+                    [chunk_start, chunk_end, []]
+                )
+                entry[0] = min(entry[0], chunk_start)
+                entry[1] = max(entry[1], chunk_end)
+                entry[2].append(channel_no)
 
-                channel.last_sync_at =  datetime.now()
-                channel.latest_record_date = today
+        async def fetch_month(chunk_start: date, chunk_end: date, channel_nos: list[int]):
+            async with sem:
+                return await self.get_time_ranges_by_day_multi(
+                    device,
+                    channel_nos,
+                    chunk_start,
+                    chunk_end,
+                    headers
+                )
+
+        month_results = await asyncio.gather(*(
+            fetch_month(chunk_start, chunk_end, channel_nos)
+            for chunk_start, chunk_end, channel_nos in month_tracks.values()
+        ))
+
+        segments_map: dict[int, dict[date, list[RecordTimeRange]]] = defaultdict(dict)
+        for month_result in month_results:
+            for channel_no, by_day in month_result.items():
+                segments_map[channel_no].update(by_day)
+
+        # segment đã được clip + merge theo ngày trong bucket_spans_by_day
+        result = {}
+        for channel_no, record_days in record_days_map.items():
+            channel_segments = segments_map.get(channel_no, {})
+            result[channel_no] = [
+                (
+                    to_date(rd["date"]),
+                    rd["has_record"],
+                    channel_segments.get(to_date(rd["date"]), []) if rd["has_record"] else []
+                )
+                for rd in record_days
+            ]
+
+        return result
 
 
     async def device_channels_init_data(
         self,
         db: AsyncSession,
-        device: Device
-    ):
+        device: Device,
+        max_chunks: int | None = None
+    ) -> bool:
+        """
+        Tạo lại channel của device, tìm oldest_record_date rồi backfill record data
+        (xem backfill_device_record_data). Trả về True nếu đã backfill xong hết.
+        """
         headers = build_hik_auth(device)
         hik_service = HikRecordService()
         today = TimeProvider().now().date()
 
-        # KHÔNG begin / commit ở đây
+        # commit theo từng bước để UI thấy dữ liệu sớm và restart resume được
         logger.info("Inside init data")
+        daily_distribution_cache.invalidate_device(device.id)
         channels_data = await hik_service._get_channels(device, headers)
         if not channels_data:
             raise Exception("No channels returned from device")
 
+        # xóa channel cascade cả record day / time range → chờ writer khác của device xong trước
+        await lock_device_record_writes(db, device.id)
         await db.execute(
             delete(Channel).where(Channel.device_id == device.id)
         )
+        await channel_cache.invalidate_on_commit(db, device.id)
 
 
         # =========================
@@ -504,77 +838,113 @@ class HikRecordService():
         # BATCH RECORD DAY + TIME RANGE
         # =========================
 
-        all_record_days = []
-        all_time_ranges = []
-
+        # ---- oldest của từng channel ----
+        #  các channel cùng NVR thường có cùng retention → dùng oldest của channel trước làm hint
+        sibling_oldest = None
         for ch in channels_data:
             channel = channel_map[ch["id"]]
 
-            # ---- gọi API ----
             oldest_date = to_date(
-                await hik_service.oldest_record_date(device, ch["id"], headers)
+                await hik_service.oldest_record_date(
+                    device,
+                    ch["id"],
+                    headers,
+                    hint=sibling_oldest
+                )
             )
             channel.oldest_record_date = oldest_date
+            channel.backfill_until = None
+            sibling_oldest = oldest_date or sibling_oldest
 
+        await db.commit()
 
-            record_days = await hik_service.record_status_of_channel(
-                device,
-                ch["id"],
-                start_date=oldest_date,
-                end_date=today.strftime("%Y-%m-%d"),
-                header=headers
-            )
- 
-            record_day_map = {}
-
-            # ---- BATCH RECORD DAY ----
-            for rd in record_days:
-                record_date_obj = to_date(rd["date"])
-                rd_obj = ChannelRecordDay(
-                    channel_id=channel.id,
-                    record_date=record_date_obj,
-                    has_record=rd["has_record"]
-                )
-                all_record_days.append(rd_obj)
-                record_day_map[rd["date"]] = rd_obj
+        # ---- status + segment: tuần hiện tại trước, sau đó lùi dần, commit từng chunk ----
+        return await self.backfill_device_record_data(db, device, max_chunks=max_chunks)
 
-            # ---- TIME RANGE (CHƯA ADD DB) ----
-            for rd in record_days:
-                if not rd["has_record"]:
-                    continue
-
-                segments = await hik_service.get_time_ranges_segment(
-                    device,
-                    ch["id"],
-                    rd["date"],
-                    headers
-                )
-                segments = await hik_service.merge_time_ranges(segments)
+    async def backfill_device_record_data(
+        self,
+        db: AsyncSession,
+        device: Device,
+        max_chunks: int | None = None
+    ) -> bool:
+        """
+        Backfill record day + segment từ gần tới xa, commit sau mỗi chunk:
+        chunk đầu là BACKFILL_FIRST_CHUNK_DAYS ngày gần nhất, sau đó mỗi chunk lùi
+        BACKFILL_CHUNK_DAYS ngày cho tới oldest_record_date.
+
+        Checkpoint theo channel: channel.backfill_until = ngày xa nhất đã ghi xong
+        → restart thì chạy tiếp từ backfill_until - 1 thay vì làm lại từ đầu.
+        max_chunks: dừng sau bấy nhiêu chunk (None = tới hết).
+        Trả về True nếu mọi channel đã backfill xong.
+        """
+        headers = build_hik_auth(device)
+        today = TimeProvider().now().date()
+        sem = asyncio.Semaphore(RECORD_SYNC_CONCURRENCY)
 
-                record_day = record_day_map[rd["date"]]
+        def chunk_end_of(channel: Channel) -> date:
+            if channel.backfill_until is None:
+                return today
+            return channel.backfill_until - timedelta(days=1)
 
-                for seg in segments:
-                    all_time_ranges.append(
-                        ChannelRecordTimeRange(
-                            record_day=record_day,  #  ORM relationship, chưa cần id
-                            start_time=seg.start_time,
-                            end_time=seg.end_time
-                        )
+        chunks_done = 0
+        while max_chunks is None or chunks_done < max_chunks:
+            result = await db.execute(
+                select(Channel).where(
+                    Channel.device_id == device.id,
+                    Channel.is_active == True,
+                    Channel.oldest_record_date.is_not(None),
+                    or_(
+                        Channel.backfill_until.is_(None),
+                        Channel.backfill_until > Channel.oldest_record_date
                     )
+                )
+            )
+            pending = result.scalars().all()
+            if not pending:
+                return True
+
+            # các channel cùng checkpoint (thường là cả device) đi chung 1 lượt fetch
+            chunk_end = max(chunk_end_of(channel) for channel in pending)
+            chunk_days = BACKFILL_FIRST_CHUNK_DAYS if chunk_end >= today else BACKFILL_CHUNK_DAYS
+            chunk_start = chunk_end - timedelta(days=chunk_days - 1)
+
+            batch = [channel for channel in pending if chunk_end_of(channel) == chunk_end]
+            sync_ranges = {
+                channel.channel_no: max(channel.oldest_record_date, chunk_start)
+                for channel in batch
+            }
+
+            fetched = await self._fetch_device_record_data(
+                device,
+                sync_ranges,
+                chunk_end,
+                headers,
+                sem
+            )
 
-        # =========================
-        # COMMIT DB
-        # =========================
+            await lock_device_record_writes(db, device.id)
+            day_count, range_changes = await bulk_write_channel_record_data(
+                db,
+                {
+                    channel.id: fetched[channel.channel_no]
+                    for channel in batch
+                }
+            )
 
-        db.add_all(all_record_days)
-        await db.flush()  #  sinh record_day.id
+            for channel in batch:
+                channel.backfill_until = sync_ranges[channel.channel_no]
+                # đoạn từ hôm nay trở đi để tầng sync thường lo, không sync lại cả lịch sử
+                if channel.last_sync_at is None:
+                    channel.last_sync_at = datetime.now()
 
-        db.add_all(all_time_ranges)
-        await db.flush()
+            await db.commit()
+            chunks_done += 1
 
-        logger.info(
-            f"Batch done: {len(channels_to_add)} channels | "
-            f"{len(all_record_days)} record days | "
-            f"{len(all_time_ranges)} time ranges"
-        )
+            logger.info(
+                f"Device {device.id} backfill {chunk_start} → {chunk_end}: "
+                f"{len(batch)} channels | {day_count} record days | "
+                f"{range_changes['inserted']} time ranges"
+            )
+
+        return False
 
@@ -0,0 +1,243 @@
+"""
+Interval engine cho record segment
+
+Segment được giữ dưới dạng mảng int64 shape (n, 2) = [start, end] tính bằng
+epoch giây (datetime naive giữ nguyên giờ device, không đổi timezone).
+Mọi phép toán là vectorized NumPy, không tạo object Pydantic cho từng segment;
+chỉ đổi sang RecordTimeRange ở bước cuối (sau khi đã merge).
+"""
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+
+from app.schemas.record import RecordTimeRange
+
+# Khoảng hở tối đa (giây) giữa 2 segment vẫn coi là liền nhau
+DEFAULT_MERGE_GAP_SECONDS = 5
+
+EMPTY = np.empty((0, 2), dtype=np.int64)
+
+
+# =========================
+# CONVERT
+# =========================
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(value: datetime) -> int:
+    return (
+        (value.toordinal() - _EPOCH_ORDINAL) * 86400
+        + value.hour * 3600 + value.minute * 60 + value.second
+    )
+
+
+def from_epoch(value: int) -> datetime:
+    return _EPOCH + timedelta(seconds=int(value))
+
+
+def from_iso_spans(spans: list[tuple[str, str]]) -> np.ndarray:
+    """
+    [(start, end)] chuỗi ISO "YYYY-MM-DDTHH:MM:SS" (đã bỏ "Z") → mảng int64 (n, 2).
+    NumPy parse thẳng chuỗi nên không tạo datetime cho từng segment.
+    """
+    if not spans:
+        return EMPTY
+    return np.array(spans, dtype="datetime64[s]").astype(np.int64).reshape(-1, 2)
+
+
+def from_spans(spans: list[tuple[datetime, datetime]]) -> np.ndarray:
+    """[(start, end)] datetime → mảng int64 (n, 2)"""
+    if not spans:
+        return EMPTY
+    return np.array(
+        [(to_epoch(start), to_epoch(end)) for start, end in spans],
+        dtype=np.int64
+    ).reshape(-1, 2)
+
+
+def from_ranges(ranges: list[RecordTimeRange]) -> np.ndarray:
+    return from_spans([(r.start_time, r.end_time) for r in ranges])
+
+
+def to_ranges(intervals: np.ndarray) -> list[RecordTimeRange]:
+    """Mảng int64 (n, 2) → [RecordTimeRange] (giá trị đã hợp lệ nên bỏ qua validate)"""
+    return [
+        RecordTimeRange.model_construct(
+            start_time=from_epoch(start),
+            end_time=from_epoch(end)
+        )
+        for start, end in intervals.tolist()
+    ]
+
+
+# =========================
+# OPERATIONS
+# =========================
+
+def sort_intervals(intervals: np.ndarray) -> np.ndarray:
+    if len(intervals) < 2:
+        return intervals
+    return intervals[np.lexsort((intervals[:, 1], intervals[:, 0]))]
+
+
+def merge_intervals(intervals: np.ndarray, gap_seconds: int = DEFAULT_MERGE_GAP_SECONDS) -> np.ndarray:
+    """
+    Sort + gộp các interval chồng nhau hoặc cách nhau <= gap_seconds.
+    Cùng kết quả với HikRecordService.merge_time_ranges cũ.
+    """
+    if len(intervals) < 2:
+        return intervals
+
+    intervals = sort_intervals(intervals)
+    starts = intervals[:, 0]
+    ends = intervals[:, 1]
+
+    # end lớn nhất tính tới interval trước đó
+    running_end = np.maximum.accumulate(ends)
+    new_group = np.empty(len(intervals), dtype=bool)
+    new_group[0] = True
+    new_group[1:] = starts[1:] > running_end[:-1] + gap_seconds
+
+    group_idx = np.flatnonzero(new_group)
+    return np.column_stack((
+        starts[group_idx],
+        np.maximum.reduceat(ends, group_idx)
+    ))
+
+
+def clip_intervals(intervals: np.ndarray, window_start: int, window_end: int) -> np.ndarray:
+    """Cắt interval vào [window_start, window_end], bỏ interval rỗng"""
+    if len(intervals) == 0:
+        return intervals
+
+    starts = np.maximum(intervals[:, 0], window_start)
+    ends = np.minimum(intervals[:, 1], window_end)
+    keep = starts < ends
+    return np.column_stack((starts[keep], ends[keep]))
+
+
+def intersect_intervals(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Giao của 2 tập interval (cả 2 đã merge, không chồng lấn)"""
+    if len(a) == 0 or len(b) == 0:
+        return EMPTY
+
+    # với mỗi interval của a: các interval của b có thể chồng lên là [lo, hi)
+    lo = np.searchsorted(b[:, 1], a[:, 0], side="right")
+    hi = np.searchsorted(b[:, 0], a[:, 1], side="left")
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return EMPTY
+
+    a_idx = np.repeat(np.arange(len(a)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    b_idx = np.repeat(lo, counts) + offsets
+
+    starts = np.maximum(a[a_idx, 0], b[b_idx, 0])
+    ends = np.minimum(a[a_idx, 1], b[b_idx, 1])
+    keep = starts < ends
+    return np.column_stack((starts[keep], ends[keep]))
+
+
+def subtract_intervals(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """a trừ b (cả 2 đã merge, không chồng lấn)"""
+    if len(a) == 0 or len(b) == 0:
+        return a
+
+    lower = min(int(a[0, 0]), int(b[0, 0]))
+    upper = max(int(a[-1, 1]), int(b[-1, 1]))
+
+    # phần bù của b trong [lower, upper]
+    gap_starts = np.concatenate(([lower], b[:, 1]))
+    gap_ends = np.concatenate((b[:, 0], [upper]))
+    keep = gap_starts < gap_ends
+    complement = np.column_stack((gap_starts[keep], gap_ends[keep]))
+
+    return intersect_intervals(a, complement)
+
+
+def total_seconds(intervals: np.ndarray) -> int:
+    """Tổng số giây được phủ (phần chồng nhau chỉ tính 1 lần)"""
+    merged = merge_intervals(intervals, gap_seconds=0)
+    if len(merged) == 0:
+        return 0
+    return int((merged[:, 1] - merged[:, 0]).sum())
+
+
+# =========================
+# DAY BUCKETING
+# =========================
+
+def split_by_day(
+    intervals: np.ndarray,
+    start_day: date,
+    end_day: date,
+    gap_seconds: int = DEFAULT_MERGE_GAP_SECONDS
+) -> dict[date, np.ndarray]:
+    """
+    Clip interval vào từng ngày trong [start_day, end_day] rồi merge trong ngày.
+    Mỗi ngày được clip trong [00:00:00, 23:59:59] giống get_time_ranges_segment cũ.
+    Ngày không có interval thì không có key.
+    """
+    result: dict[date, np.ndarray] = {}
+    if len(intervals) == 0:
+        return result
+
+    intervals = sort_intervals(intervals)
+    starts = intervals[:, 0]
+    # end lớn nhất tính tới mỗi vị trí (tăng dần) → mọi interval trước `lo` đều kết thúc trước ngày
+    running_end = np.maximum.accumulate(intervals[:, 1])
+
+    day = start_day
+    day_start = to_epoch(datetime.combine(start_day, time(0, 0, 0)))
+    while day <= end_day:
+        day_end = day_start + 86399
+
+        lo = np.searchsorted(running_end, day_start, side="right")
+        hi = np.searchsorted(starts, day_end, side="left")
+        candidates = intervals[lo:hi]
+        candidates = candidates[candidates[:, 1] > day_start]
+
+        clipped = clip_intervals(candidates, day_start, day_end)
+        if len(clipped):
+            result[day] = merge_intervals(clipped, gap_seconds)
+
+        day += timedelta(days=1)
+        day_start += 86400
+
+    return result
+
+
+# =========================
+# COVERAGE BITMAP
+# =========================
+
+def coverage_bitmap(
+    intervals: np.ndarray,
+    window_start: int,
+    slot_count: int,
+    slot_seconds: int
+) -> bytes:
+    """
+    Bitmap độ phủ: bit i = 1 nếu có record trong slot
+    [window_start + i*slot_seconds, window_start + (i+1)*slot_seconds).
+    Bit 0 là bit cao nhất của byte đầu (np.packbits mặc định).
+    vd: 1 ngày, slot 60s → 1440 bit = 180 byte.
+    """
+    slots = np.zeros(slot_count, dtype=bool)
+
+    if len(intervals):
+        window_end = window_start + slot_count * slot_seconds
+        clipped = clip_intervals(intervals, window_start, window_end)
+
+        first = (clipped[:, 0] - window_start) // slot_seconds
+        last = -((window_start - clipped[:, 1]) // slot_seconds)  # ceil
+
+        diff = np.zeros(slot_count + 1, dtype=np.int32)
+        np.add.at(diff, first, 1)
+        np.add.at(diff, last, -1)
+        slots = np.cumsum(diff[:-1]) > 0
+
+    return np.packbits(slots).tobytes()
@@ -0,0 +1,123 @@
+"""
+Hàng đợi refresh segment theo channel, được đẩy từ alertStream
+
+AlarmSupervisor gọi channel_refresh_queue.signal() khi thấy event liên quan
+tới việc ghi hình (video loss, motion...). Event cùng channel được gom lại trong
+CHANNEL_REFRESH_DEBOUNCE_SECONDS rồi chỉ refresh segment hôm nay của các channel đó.
+"""
+import asyncio
+import time
+from collections import defaultdict
+
+from app.db.session import AsyncSessionLocal
+from app.Models.device import Device
+from app.features.RecordInfo.hikrecord import HikRecordService
+from app.core.constants import CHANNEL_REFRESH_DEBOUNCE_SECONDS, CHANNEL_REFRESH_WORKERS
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class ChannelRefreshQueue:
+    """
+    Gom tín hiệu "channel activity" theo (device_id, channel_no) và refresh theo device.
+    """
+
+    def __init__(
+        self,
+        debounce_seconds: float = CHANNEL_REFRESH_DEBOUNCE_SECONDS,
+        workers: int = CHANNEL_REFRESH_WORKERS
+    ):
+        self.debounce_seconds = debounce_seconds
+        self.workers = workers
+
+        # (device_id, channel_no) -> thời điểm tín hiệu đầu tiên chưa xử lý
+        self._pending: dict[tuple[int, int], float] = {}
+        self._tasks: set[asyncio.Task] = set()
+        # run() đang chạy trong process này (chỉ process giữ lease alarm_stream)
+        self.running = False
+
+        self.signals = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    def signal(self, device_id: int, channel_no: int):
+        """Không block: chỉ đánh dấu channel cần refresh"""
+        self.signals += 1
+        self._pending.setdefault((device_id, channel_no), time.monotonic())
+
+    def _pop_due(self) -> dict[int, list[int]]:
+        now = time.monotonic()
+        due = [
+            key for key, first_seen in self._pending.items()
+            if now - first_seen >= self.debounce_seconds
+        ]
+
+        by_device: dict[int, list[int]] = defaultdict(list)
+        for device_id, channel_no in due:
+            del self._pending[(device_id, channel_no)]
+            by_device[device_id].append(channel_no)
+
+        return by_device
+
+    async def _refresh_device(self, sem: asyncio.Semaphore, device_id: int, channel_nos: list[int]):
+        async with sem:
+            async with AsyncSessionLocal() as db:
+                try:
+                    device = await db.get(Device, device_id)
+                    if not device or not device.is_checked:
+                        return
+
+                    await HikRecordService().sync_device_today_segments(
+                        db=db,
+                        device=device,
+                        channel_nos=channel_nos
+                    )
+                    await db.commit()
+                    self.refreshes += 1
+                except Exception as e:
+                    await db.rollback()
+                    self.failures += 1
+                    logger.error(f"[REFRESH] Device {device_id} channels {channel_nos}: {e}")
+
+    async def run(self):
+        """
+        Main loop: mỗi giây lấy các channel đã qua debounce và refresh theo device.
+        Bị cancel (shutdown / mất lease) → dừng cả các refresh đang chạy.
+        """
+        sem = asyncio.Semaphore(max(1, self.workers))
+        self.running = True
+
+        try:
+            while True:
+                try:
+                    for device_id, channel_nos in self._pop_due().items():
+                        task = asyncio.create_task(
+                            self._refresh_device(sem, device_id, channel_nos)
+                        )
+                        self._tasks.add(task)
+                        task.add_done_callback(self._tasks.discard)
+                except Exception as ex:
+                    logger.error(f"[REFRESH] Error dispatching refresh: {ex}")
+
+                await asyncio.sleep(1)
+        finally:
+            self.running = False
+            self._pending.clear()
+            tasks = list(self._tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "in_flight": len(self._tasks),
+            "signals": self.signals,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+
+
+channel_refresh_queue = ChannelRefreshQueue()
@@ -0,0 +1,245 @@
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import select, delete, insert, update, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.Models.channel_record_day import ChannelRecordDay
+from app.Models.channel_record_time_range import ChannelRecordTimeRange
+from app.schemas.record import RecordTimeRange
+from app.features.RecordInfo import coverage_store
+
+# asyncpg giới hạn 32767 bind param / statement → chia nhỏ số row mỗi statement
+BULK_CHUNK_SIZE = 5000
+
+# pg_advisory_xact_lock(namespace, device_id): khóa ghi record data theo device
+# (dạng 2 key int4 → không đụng key bigint của lease trong app/core/leader.py)
+RECORD_WRITE_LOCK_NAMESPACE = 0x5EC0
+
+# (record_date, has_record, segments) - output của HikRecordService._fetch_device_record_data
+ChannelRecordData = list[tuple[date, bool, list[RecordTimeRange]]]
+
+
+def _chunks(items: list, size: int = BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def lock_device_record_writes(db: AsyncSession, device_id: int):
+    """
+    Serialize các transaction ghi record data của cùng 1 device
+    (hot sync, reconcile, refresh theo event alarm, backfill, init):
+    bulk_sync_time_ranges diff với row đọc trong transaction, 2 writer song song
+    sẽ cùng INSERT 1 segment mới.
+    Khóa tự nhả khi commit / rollback. Gọi sau khi fetch NVR xong (không giữ khóa lúc chờ mạng)
+    và trước lệnh ghi đầu tiên của transaction (không giữ row lock nào lúc chờ khóa → không deadlock).
+    """
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(:namespace, :device_id)"),
+        {"namespace": RECORD_WRITE_LOCK_NAMESPACE, "device_id": device_id}
+    )
+
+
+async def bulk_upsert_record_days(
+    db: AsyncSession,
+    rows: list[dict]
+) -> dict[tuple[int, date], int]:
+    """
+    rows = [{"channel_id": int, "record_date": date, "has_record": bool}, ...]
+
+    INSERT ... ON CONFLICT (channel_id, record_date) DO UPDATE has_record
+    RETURNING id → trả về { (channel_id, record_date): record_day_id }
+    """
+    id_map: dict[tuple[int, date], int] = {}
+
+    for chunk in _chunks(rows):
+        stmt = pg_insert(ChannelRecordDay).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ChannelRecordDay.channel_id, ChannelRecordDay.record_date],
+            set_={"has_record": stmt.excluded.has_record}
+        ).returning(
+            ChannelRecordDay.id,
+            ChannelRecordDay.channel_id,
+            ChannelRecordDay.record_date
+        )
+
+        result = await db.execute(stmt)
+        for row in result:
+            id_map[(row.channel_id, row.record_date)] = row.id
+
+    return id_map
+
+
+def diff_time_ranges(
+    stored: list[tuple[int, datetime, datetime]],
+    fresh: list[RecordTimeRange]
+) -> tuple[list[RecordTimeRange], list[dict], list[int]]:
+    """
+    So sánh segment đang lưu [(id, start, end)] với segment mới (đã merge).
+    Cả 2 list đều không chồng lấn nên đi song song theo thứ tự thời gian:
+    - stored chồng lên fresh → cùng 1 segment, UPDATE nếu start/end đổi
+    - stored nằm trước fresh → segment đã mất, DELETE
+    - fresh nằm trước stored → segment mới, INSERT
+
+    Trả về (inserts, updates [{id, start_time, end_time}], delete_ids)
+    """
+    stored = sorted(stored, key=lambda r: r[1])
+    fresh = sorted(fresh, key=lambda r: r.start_time)
+
+    inserts: list[RecordTimeRange] = []
+    updates: list[dict] = []
+    delete_ids: list[int] = []
+
+    i = j = 0
+    while i < len(stored) and j < len(fresh):
+        range_id, s_start, s_end = stored[i]
+        f = fresh[j]
+
+        overlaps = (
+            s_start < f.end_time and f.start_time < s_end
+        ) or s_start == f.start_time
+
+        if overlaps:
+            if (s_start, s_end) != (f.start_time, f.end_time):
+                updates.append({
+                    "id": range_id,
+                    "start_time": f.start_time,
+                    "end_time": f.end_time
+                })
+            i += 1
+            j += 1
+        elif s_end <= f.start_time:
+            delete_ids.append(range_id)
+            i += 1
+        else:
+            inserts.append(f)
+            j += 1
+
+    delete_ids.extend(r[0] for r in stored[i:])
+    inserts.extend(fresh[j:])
+
+    return inserts, updates, delete_ids
+
+
+async def bulk_sync_time_ranges(
+    db: AsyncSession,
+    ranges_by_day: dict[int, list[RecordTimeRange]]
+) -> dict[str, int]:
+    """
+    ranges_by_day = { record_day_id: [RecordTimeRange] }
+    Diff với time range đang lưu và chỉ ghi phần thay đổi
+    (ngày cũ không đổi → không ghi gì, hôm nay chỉ dài thêm → 1 UPDATE).
+    Trả về số row inserted / updated / deleted.
+    """
+    day_ids = list(ranges_by_day.keys())
+
+    stored_by_day: dict[int, list[tuple[int, datetime, datetime]]] = defaultdict(list)
+    for chunk in _chunks(day_ids):
+        result = await db.execute(
+            select(
+                ChannelRecordTimeRange.id,
+                ChannelRecordTimeRange.record_day_id,
+                ChannelRecordTimeRange.start_time,
+                ChannelRecordTimeRange.end_time
+            ).where(ChannelRecordTimeRange.record_day_id.in_(chunk))
+        )
+        for row in result:
+            stored_by_day[row.record_day_id].append(
+                (row.id, row.start_time, row.end_time)
+            )
+
+    insert_rows: list[dict] = []
+    update_rows: list[dict] = []
+    delete_ids: list[int] = []
+
+    for record_day_id, segments in ranges_by_day.items():
+        inserts, updates, deletes = diff_time_ranges(
+            stored_by_day.get(record_day_id, []),
+            segments
+        )
+        insert_rows.extend(
+            {
+                "record_day_id": record_day_id,
+                "start_time": seg.start_time,
+                "end_time": seg.end_time
+            }
+            for seg in inserts
+        )
+        update_rows.extend(updates)
+        delete_ids.extend(deletes)
+
+    for chunk in _chunks(delete_ids):
+        await db.execute(
+            delete(ChannelRecordTimeRange).where(ChannelRecordTimeRange.id.in_(chunk))
+        )
+
+    for chunk in _chunks(update_rows):
+        # ORM bulk UPDATE theo primary key (executemany)
+        await db.execute(update(ChannelRecordTimeRange), chunk)
+
+    for chunk in _chunks(insert_rows):
+        await db.execute(insert(ChannelRecordTimeRange), chunk)
+
+    return {
+        "inserted": len(insert_rows),
+        "updated": len(update_rows),
+        "deleted": len(delete_ids),
+    }
+
+
+async def write_record_segments(
+    db: AsyncSession,
+    ranges_by_day: dict[int, list[RecordTimeRange]]
+) -> dict[str, int]:
+    """
+    Ghi segment của các record day theo RECORD_COVERAGE_STORAGE:
+    row từng segment (bulk_sync_time_ranges) và/hoặc tsmultirange (coverage_store).
+    Trả về số row inserted / updated / deleted + coverage_updated.
+    """
+    changes = {"inserted": 0, "updated": 0, "deleted": 0, "coverage_updated": 0}
+    if not ranges_by_day:
+        return changes
+
+    if coverage_store.writes_rows():
+        changes.update(await bulk_sync_time_ranges(db, ranges_by_day))
+
+    if coverage_store.writes_multirange():
+        changes["coverage_updated"] = await coverage_store.bulk_write_coverage(db, ranges_by_day)
+
+    return changes
+
+
+async def bulk_write_channel_record_data(
+    db: AsyncSession,
+    data_by_channel: dict[int, ChannelRecordData]
+) -> tuple[int, dict[str, int]]:
+    """
+    Ghi record day + time range cho nhiều channel bằng vài statement.
+    data_by_channel = { channel.id: [(record_date, has_record, segments), ...] }
+
+    Ngày has_record=False chỉ cập nhật record day, giữ nguyên time range cũ
+    (giống logic sync cũ).
+    Trả về (số record day, số time range inserted / updated / deleted).
+    """
+    day_rows = [
+        {
+            "channel_id": channel_id,
+            "record_date": record_date,
+            "has_record": has_record
+        }
+        for channel_id, channel_data in data_by_channel.items()
+        for record_date, has_record, _ in channel_data
+    ]
+    if not day_rows:
+        return 0, await write_record_segments(db, {})
+
+    id_map = await bulk_upsert_record_days(db, day_rows)
+
+    ranges_by_day = {
+        id_map[(channel_id, record_date)]: segments
+        for channel_id, channel_data in data_by_channel.items()
+        for record_date, has_record, segments in channel_data
+        if has_record
+    }
+    range_changes = await write_record_segments(db, ranges_by_day)
+
+    return len(day_rows), range_changes
@@ -5,6 +5,9 @@ from app.Models.channel_recoding_mode_time_line import ChannelRecordingModeTimel
 from app.features.Schedule_Racord_Mode.HikRecordingModeService import HikRecordingModeService
 from datetime import time
 from app.Models.recording_mode_enum_class import RecordingMode
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
 
 DAY_MAP = {
     "Monday": 0,
@@ -122,6 +125,45 @@ async def sync_channel_recording_mode(
 
         return data
 
+async def sync_recording_mode_of_channels(
+    db: AsyncSession,
+    device,
+    channels,
+    headers,
+    progress=None
+) -> dict:
+    """
+    Sync recording mode cho các channel của device (từng channel, lỗi channel nào ghi lại channel đó).
+    progress(done, total): callback tiến độ (vd JobContext.progress), có thể None.
+    """
+    success = []
+    failed = []
+
+    for index, ch in enumerate(channels):
+        try:
+            await sync_channel_recording_mode(
+                db=db,
+                device=device,
+                channel=ch,
+                headers=headers
+            )
+            success.append(ch.id)
+        except Exception as e:
+            logger.error(f"Failed to sync recording mode for channel {ch.id}: {e}")
+            failed.append({
+                "channel_id": ch.id,
+                "error": str(e)
+            })
+
+        if progress:
+            await progress(index + 1, len(channels))
+
+    return {
+        "success": True,
+        "synced_channels": success,
+        "failed_channels": failed
+    }
+
 async def get_channel_recording_mode_from_db(
     db: AsyncSession,
     channel_id: int
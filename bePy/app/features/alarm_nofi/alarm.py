@@ -1,8 +1,12 @@
-import xml.etree.ElementTree as ET
+from sqlalchemy import insert
 from app.core.http_client import get_http_client
 from app.Models.AlarmMessege import AlarmMessage
-from app.Models.channel import Channel
-from app.db.session import AsyncSessionLocal, SessionLocal
+from app.Models.webhook_outbox import WebhookOutbox
+from app.db.session import AsyncSessionLocal
+from app.features.RecordInfo.refresh_queue import channel_refresh_queue
+from app.services.channel_cache import channel_cache
+from app.features.alarm_nofi.alert_stream_parser import AlertStreamParser, boundary_from_content_type
+from app.features.alarm_nofi.webhook_outbox import webhook_enabled, build_outbox_rows
 from app.core.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -20,6 +24,14 @@ ALLOWED_EVENT_TYPES = {
     "hdError"
 
 }
+# Event làm thay đổi việc ghi hình của channel → báo record subsystem refresh segment hôm nay
+CHANNEL_ACTIVITY_EVENT_TYPES = {
+    "videoloss",
+    "VMD",
+    "linedetection",
+    "fielddetection",
+}
+
 EVENT_TYPE_LABEL_MAP = {
     "videoloss": "Video Signal Loss",
     "networkDisconnected": "Network Disconnected",
@@ -29,50 +41,83 @@ EVENT_TYPE_LABEL_MAP = {
 }
 
 
-XML_NS = {"ns": "http://www.hikvision.com/ver20/XMLSchema"}
-
 # =========================
-# CHANNEL NAME CACHE
-# key = (ip_web, device_id)
-# value = { channel_no: channel_name }
+# EVENT PROCESSOR
 # =========================
 
-CHANNEL_NAME_CACHE: dict[tuple[str, int], dict[int, str]] = {}
-
-
-# =========================
-# CACHE HELPERS
-# =========================
-
-def _cache_key(device) -> tuple[str, int]:
-    return (device.ip_web, device.id)
-
-
-def load_channel_name_map(device) -> dict[int, str]:
+class AlarmEventProcessor:
     """
-    Load channel_no -> channel_name from DB
+    Field của 1 EventNotificationAlert → alarm dict cho pipeline (alarm_ingest_queue).
+    Dùng chung cho pull (alertStream) và push (HTTP host notification):
+    báo refresh segment khi channel đổi trạng thái (active mới / active → inactive),
+    lọc ALLOWED_EVENT_TYPES, debounce theo (eventType, channelID).
     """
-    with SessionLocal() as db:
-        rows = (
-            db.query(Channel.channel_no, Channel.name)
-            .filter(Channel.device_id == device.id)
-            .all()
-        )
-
-    return {row.channel_no: row.name for row in rows}
-
-
-def get_channel_name_map(device) -> dict[int, str]:
-    key = _cache_key(device)
-
-    if key not in CHANNEL_NAME_CACHE:
-        CHANNEL_NAME_CACHE[key] = load_channel_name_map(device)
-
-    return CHANNEL_NAME_CACHE[key]
 
+    def __init__(self, device):
+        self.device_id = device.id
+        self.ip_web = device.ip_web
+        # debounce theo (eventType, channelID)
+        self.active_events: set[tuple[str, str]] = set()
+
+    async def process(self, fields: dict[str, str]) -> dict | None:
+        event_type = fields.get("eventType")
+        event_state = fields.get("eventState")
+        channel_id = fields.get("channelID")
+
+        if not event_type or (
+            event_type not in ALLOWED_EVENT_TYPES
+            and event_type not in CHANNEL_ACTIVITY_EVENT_TYPES
+        ):
+            return None
+
+        if not channel_id or not channel_id.isdigit():
+            return None
+
+        key = (event_type, channel_id)
+
+        was_active = key in self.active_events
+        if event_state == "active":
+            self.active_events.add(key)
+        elif event_state == "inactive":
+            self.active_events.discard(key)
+
+        # convert channelID -> channel_no
+        channel_no = int(channel_id) * 100 + 1
+
+        # refresh chỉ khi channel đổi trạng thái (active mới / active → inactive):
+        # active lặp lại mỗi giây khi còn motion, inactive heartbeat (videoloss) không báo
+        # push mode chạy ở API process: không có ai xử lý queue → không báo
+        state_changed = (
+            (event_state == "active" and not was_active)
+            or (event_state == "inactive" and was_active)
+        )
+        if (
+            event_type in CHANNEL_ACTIVITY_EVENT_TYPES
+            and state_changed
+            and channel_refresh_queue.running
+        ):
+            channel_refresh_queue.signal(self.device_id, channel_no)
+
+        if event_type not in ALLOWED_EVENT_TYPES:
+            return None
+
+        # debounce
+        if event_state == "active" and was_active:
+            return None
+
+        channel_name = await channel_cache.get_channel_name(self.device_id, channel_no)
+
+        return {
+            "device_id": self.device_id,
+            "ip_web": self.ip_web,
+            "eventType": event_type,
+            "eventState": event_state,
+            "channelID": channel_id,
+            "channelName": channel_name,
+            "time": fields.get("dateTime"),
+            "ipAddress": fields.get("ipAddress"),
+        }
 
-def invalidate_channel_cache(device):
-    CHANNEL_NAME_CACHE.pop(_cache_key(device), None)
 
 # =========================
 # ALARM STREAM LISTENER
@@ -86,79 +131,30 @@ async def get_alarm(device, headers):
     base_url = f"http://{device.ip_web}"
     url = f"{base_url}/ISAPI/Event/notification/alertStream"
 
-    # debounce theo (eventType, channelID)
-    active_events: dict[tuple[str, str], bool] = {}
-
-    buffer = ""
+    processor = AlarmEventProcessor(device)
     client = get_http_client()
 
-    channel_name_map = get_channel_name_map(device)
-
     async with client.stream("GET", url, headers=headers, timeout=None) as resp:
         resp.raise_for_status()
 
-        async for chunk in resp.aiter_text():
-            if not chunk:
-                continue
-
-            buffer += chunk
-
-            while True:
-                start = buffer.find("<EventNotificationAlert")
-                end = buffer.find("</EventNotificationAlert>")
-
-                if start == -1 or end == -1:
-                    break
-
-                end += len("</EventNotificationAlert>")
-                xml_str = buffer[start:end]
-                buffer = buffer[end:]
-
-                try:
-                    root = ET.fromstring(xml_str)
-
-                    event_type = root.findtext("ns:eventType", namespaces=XML_NS)
-                    event_state = root.findtext("ns:eventState", namespaces=XML_NS)
-                    channel_id = root.findtext("ns:channelID", namespaces=XML_NS)
-                    event_time = root.findtext("ns:dateTime", namespaces=XML_NS)
-                    ip_address = root.findtext("ns:ipAddress", namespaces=XML_NS)
-
-                    if not event_type or event_type not in ALLOWED_EVENT_TYPES:
-                        continue
-
-                    if not channel_id:
-                        continue
-
-                    key = (event_type, channel_id)
-
-                    # debounce
-                    if event_state == "active":
-                        if key in active_events:
-                            continue          
-                        active_events[key] = True
+        parser = AlertStreamParser(
+            boundary_from_content_type(resp.headers.get("content-type"))
+        )
 
-                    elif event_state == "inactive":
-                       active_events.pop(key, None)
+        try:
+            async for chunk in resp.aiter_bytes():
+                if not chunk:
+                    continue
 
-                    # convert channelID -> channel_no
-                    channel_no = int(channel_id) * 100 + 1
-                    channel_name = channel_name_map.get(channel_no)
+                for fields in parser.feed(chunk):
+                    alarm = await processor.process(fields)
+                    if alarm is not None:
+                        yield alarm
+        finally:
+            if parser.overflows or parser.parts_skipped:
+                logger.info(f"[ALERT_STREAM] device={device.id} parser stats: {parser.stats()}")
 
-                    yield {
-                        "device_id": device.id,
-                        "ip_web": device.ip_web,
-                        "eventType": event_type,
-                        "eventState": event_state,
-                        "channelID": channel_id,
-                        "channelName": channel_name,
-                        "time": event_time,
-                        "ipAddress": ip_address,
-                    }
 
-                except ET.ParseError:
-                    continue
-                except Exception as ex:
-                    logger.error(f"[ALERT_STREAM] Error: {ex}")
 # =========================
 # MESSAGE BUILDER
 # =========================
@@ -188,59 +184,41 @@ def build_alarm_message(alarm: dict) -> str:
 # SAVE MESSAGE
 # =========================
 
-
-
-
-from dotenv import load_dotenv
-import os
-
-async def send_alarm_to_n8n_webhook(
+def build_alarm_message_row(
     *,
     user_id: int,
     device_id: int,
-   
+    alarm: dict,
     message: str,
-):
-    load_dotenv("./app/.env")
-    N8N_WEBHOOK_URL=os.getenv("N8N_WEBHOOK_URL")
-    payload = {
+) -> dict:
+    """1 row alarm_messages (dùng cho insert nhiều row 1 lần)"""
+    raw_event_type = alarm["eventType"]
+    return {
         "user_id": user_id,
         "device_id": device_id,
-
-        # message đã build để hiển thị
-        "message": message
+        "channel_id_in_device": alarm.get("channelID"),
+        "channel_name": alarm.get("channelName"),
+        "event": EVENT_TYPE_LABEL_MAP.get(raw_event_type, raw_event_type),
+        "message": message,
     }
-    client = get_http_client()
-    try:
-        resp = await client.post(
-            N8N_WEBHOOK_URL,
-            json=payload,
-            timeout=10,
-        )
-        resp.raise_for_status()
 
-    except Exception as ex:
-        logger.error(f"[N8N WEBHOOK] Send failed: {ex}")
 
-
-async def save_alarm_message_async(
-    *,
-    user_id: int,
-    device_id: int,
-    alarm: dict,
-    message: str,
-):
+async def save_alarm_messages_async(rows: list[dict]):
+    """
+    Insert nhiều alarm trong 1 transaction (executemany),
+    kèm row webhook_outbox cho từng alarm nếu có cấu hình N8N_WEBHOOK_URL
+    """
+    if not rows:
+        return
     async with AsyncSessionLocal() as session:
         async with session.begin():
-            raw_event_type = alarm["eventType"]
-            event_type = EVENT_TYPE_LABEL_MAP.get(raw_event_type, raw_event_type)
-            session.add(
-                AlarmMessage(
-                    user_id=user_id,
-                    device_id=device_id,
-                    channel_id_in_device=alarm.get("channelID"),
-                    channel_name=alarm.get("channelName"),
-                    event=event_type,
-                    message=message,
-                )
+            if not webhook_enabled():
+                await session.execute(insert(AlarmMessage), rows)
+                return
+
+            result = await session.execute(
+                insert(AlarmMessage).returning(AlarmMessage.id, sort_by_parameter_order=True),
+                rows
             )
+            alarm_ids = result.scalars().all()
+            await session.execute(insert(WebhookOutbox), build_outbox_rows(alarm_ids, rows))
@@ -0,0 +1,205 @@
+"""
+Parser tăng dần (incremental) cho Hikvision alertStream
+
+alertStream là multipart/mixed kéo dài mãi:
+    --boundary\r\n
+    Content-Type: application/xml; charset="UTF-8"\r\n
+    Content-Length: 478\r\n
+    \r\n
+    <EventNotificationAlert ...>...</EventNotificationAlert>\r\n
+    --boundary\r\n
+    Content-Type: image/jpeg\r\n
+    Content-Length: 123456\r\n
+    ...
+
+- làm việc trên bytes, cắt part theo Content-Length (không có thì theo boundary /
+  thẻ đóng </EventNotificationAlert>)
+- buffer không vượt quá max_buffer: part không phải XML (ảnh...) được bỏ qua mà
+  không giữ trong buffer, part XML quá lớn / rác không có header thì bị bỏ và đồng bộ
+  lại ở boundary tiếp theo
+- chỉ lấy các field cần dùng bằng regex, không dựng cây XML
+"""
+import re
+
+from app.core.constants import ALERT_STREAM_MAX_BUFFER_BYTES
+
+# field dùng trong get_alarm → key trong dict trả về
+ALERT_FIELDS = (b"eventType", b"eventState", b"channelID", b"dateTime", b"ipAddress")
+
+_FIELD_RE = re.compile(
+    rb"<(" + b"|".join(ALERT_FIELDS) + rb")>\s*([^<]*?)\s*</\1>"
+)
+_CONTENT_LENGTH_RE = re.compile(rb"content-length:\s*(\d+)", re.IGNORECASE)
+_CONTENT_TYPE_RE = re.compile(rb"content-type:\s*([^\r\n;]+)", re.IGNORECASE)
+_BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+
+_HEADER_END = b"\r\n\r\n"
+_ALERT_CLOSE = b"</EventNotificationAlert>"
+# header của 1 part không bao giờ dài hơn mức này
+_MAX_HEADER_BYTES = 4096
+
+
+def boundary_from_content_type(content_type: str | None) -> bytes | None:
+    """'multipart/mixed; boundary=boundary' → b'boundary'"""
+    if not content_type:
+        return None
+    match = _BOUNDARY_RE.search(content_type)
+    return match.group(1).strip().encode() if match else None
+
+
+def parse_alert_fields(body: bytes) -> dict[str, str]:
+    """Lấy các field trong ALERT_FIELDS (lần xuất hiện đầu tiên) từ 1 EventNotificationAlert"""
+    fields: dict[str, str] = {}
+    for name, value in _FIELD_RE.findall(body):
+        key = name.decode()
+        if key not in fields:
+            fields[key] = value.decode("utf-8", "replace")
+    return fields
+
+
+class AlertStreamParser:
+    def __init__(self, boundary: bytes | None = None, max_buffer: int = ALERT_STREAM_MAX_BUFFER_BYTES):
+        self.delimiter = b"--" + boundary if boundary else None
+        self.max_buffer = max_buffer
+
+        self._buffer = bytearray()
+        # None = đang chờ header; số = còn bao nhiêu byte body (-1 = không biết độ dài)
+        self._body_remaining: int | None = None
+        self._body_is_xml = True
+        # bỏ qua bao nhiêu byte nữa (body không phải XML / quá lớn) mà không buffer
+        self._skip = 0
+
+        self.events = 0
+        self.parts_skipped = 0
+        self.bytes_dropped = 0
+        self.overflows = 0
+
+    def stats(self) -> dict:
+        return {
+            "events": self.events,
+            "parts_skipped": self.parts_skipped,
+            "bytes_dropped": self.bytes_dropped,
+            "overflows": self.overflows,
+            "buffered": len(self._buffer),
+        }
+
+    def feed(self, data: bytes) -> list[dict[str, str]]:
+        """Đẩy thêm bytes vào, trả về các event (dict field) đã đủ dữ liệu"""
+        if self._skip:
+            skipped = min(self._skip, len(data))
+            self._skip -= skipped
+            data = data[skipped:]
+            if not data:
+                return []
+
+        self._buffer += data
+        alerts: list[dict[str, str]] = []
+
+        while True:
+            if self._body_remaining is None:
+                if not self._read_headers():
+                    break
+                continue
+
+            body = self._read_body()
+            if body is None:
+                break
+            if self._body_is_xml and _ALERT_CLOSE in body:
+                alerts.append(parse_alert_fields(body))
+
+        self.events += len(alerts)
+        self._enforce_limit()
+        return alerts
+
+    # =========================
+    # INTERNAL
+    # =========================
+
+    def _read_headers(self) -> bool:
+        buf = self._buffer
+        start = 0
+        while start < len(buf) and buf[start] in b"\r\n \t":
+            start += 1
+        if start:
+            del buf[:start]
+        if not buf:
+            return False
+
+        # firmware cũ: XML trần không có header multipart
+        if buf[:1] == b"<":
+            self._body_remaining = -1
+            self._body_is_xml = True
+            return True
+
+        header_end = buf.find(_HEADER_END)
+        if header_end == -1:
+            if len(buf) > _MAX_HEADER_BYTES:
+                self._resync()
+            return False
+
+        headers = bytes(buf[:header_end])
+        del buf[:header_end + len(_HEADER_END)]
+
+        length_match = _CONTENT_LENGTH_RE.search(headers)
+        type_match = _CONTENT_TYPE_RE.search(headers)
+        content_type = type_match.group(1).lower() if type_match else b""
+        self._body_is_xml = not content_type or b"xml" in content_type
+
+        length = int(length_match.group(1)) if length_match else -1
+
+        if length >= 0 and (not self._body_is_xml or length > self.max_buffer):
+            # ảnh / part quá lớn: bỏ qua không buffer
+            self.parts_skipped += 1
+            self.bytes_dropped += length
+            dropped = min(length, len(buf))
+            del buf[:dropped]
+            self._skip = length - dropped
+            self._body_remaining = None
+            return True
+
+        self._body_remaining = length
+        return True
+
+    def _read_body(self) -> bytes | None:
+        buf = self._buffer
+
+        if self._body_remaining >= 0:
+            if len(buf) < self._body_remaining:
+                return None
+            body = bytes(buf[:self._body_remaining])
+            del buf[:self._body_remaining]
+            self._body_remaining = None
+            return body
+
+        # không có Content-Length: tới thẻ đóng hoặc boundary tiếp theo
+        end = buf.find(_ALERT_CLOSE)
+        if end != -1:
+            end += len(_ALERT_CLOSE)
+        elif self.delimiter:
+            end = buf.find(self.delimiter)
+        if end == -1:
+            return None
+
+        body = bytes(buf[:end])
+        del buf[:end]
+        self._body_remaining = None
+        return body
+
+    def _resync(self):
+        """Bỏ dữ liệu hỏng, giữ lại từ boundary tiếp theo (nếu có)"""
+        self.overflows += 1
+        buf = self._buffer
+        keep_from = buf.find(self.delimiter, 1) if self.delimiter else -1
+        if keep_from == -1:
+            # giữ lại đuôi có thể là đầu của boundary / thẻ đang tới
+            keep_from = max(0, len(buf) - 64)
+        self.bytes_dropped += keep_from
+        del buf[:keep_from]
+        self._body_remaining = None
+
+    def _enforce_limit(self):
+        if len(self._buffer) > self.max_buffer:
+            self._resync()
+            if len(self._buffer) > self.max_buffer:
+                self.bytes_dropped += len(self._buffer)
+                self._buffer.clear()
@@ -0,0 +1,164 @@
+"""
+Hàng đợi alarm giữa listener alertStream và DB (alarm_messages + webhook_outbox)
+
+Listener chỉ đẩy alarm vào queue (gần như không block) rồi đọc tiếp stream:
+- queue có giới hạn ALARM_QUEUE_MAX_SIZE; đầy thì chờ tối đa
+  ALARM_QUEUE_PUT_TIMEOUT_SECONDS (backpressure) rồi bỏ alarm (dropped)
+- writer gom alarm thành batch (ALARM_DB_BATCH_SIZE hoặc sau ALARM_DB_FLUSH_SECONDS)
+  và insert nhiều row trong 1 transaction (kèm outbox webhook)
+- ghi xong thì báo webhook_delivery_worker gửi ngay (webhook_outbox.py)
+
+Writer chạy ở mọi process có producer (duty alarm_stream, API nhận push):
+start() / stop(), không cần lease vì chỉ insert.
+"""
+import asyncio
+
+from app.features.alarm_nofi.alarm import build_alarm_message_row, save_alarm_messages_async
+from app.features.alarm_nofi.webhook_outbox import webhook_delivery_worker
+from app.core.constants import (
+    ALARM_QUEUE_MAX_SIZE,
+    ALARM_QUEUE_PUT_TIMEOUT_SECONDS,
+    ALARM_DB_BATCH_SIZE,
+    ALARM_DB_FLUSH_SECONDS,
+)
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class AlarmIngestQueue:
+    def __init__(
+        self,
+        maxsize: int = ALARM_QUEUE_MAX_SIZE,
+        put_timeout: float = ALARM_QUEUE_PUT_TIMEOUT_SECONDS,
+        batch_size: int = ALARM_DB_BATCH_SIZE,
+        flush_seconds: float = ALARM_DB_FLUSH_SECONDS
+    ):
+        self.maxsize = maxsize
+        self.put_timeout = put_timeout
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=maxsize)
+        # batch đang ghi dở (để flush nốt khi bị cancel)
+        self._batch: list[dict] = []
+        self._task: asyncio.Task | None = None
+
+        self.enqueued = 0
+        self.backpressure = 0
+        self.dropped = 0
+        self.saved = 0
+        self.batches = 0
+        self.db_failures = 0
+
+    # =========================
+    # PRODUCER (listener)
+    # =========================
+
+    async def put(self, *, user_id: int, device_id: int, alarm: dict, message: str) -> bool:
+        """
+        Đưa alarm vào queue. Queue đầy → chờ tối đa put_timeout rồi bỏ.
+        Trả về False nếu alarm bị bỏ.
+        """
+        item = {
+            "user_id": user_id,
+            "device_id": device_id,
+            "alarm": alarm,
+            "message": message,
+        }
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.backpressure += 1
+            try:
+                await asyncio.wait_for(self._queue.put(item), timeout=self.put_timeout)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 100 == 0:
+                    logger.warning(f"[ALARM_QUEUE] Queue full, dropped {self.dropped} alarm(s) so far")
+                return False
+
+        self.enqueued += 1
+        return True
+
+    # =========================
+    # CONSUMER (DB writer)
+    # =========================
+
+    async def _collect_batch(self):
+        """Chờ alarm đầu tiên rồi gom thêm tới batch_size hoặc hết flush_seconds"""
+        self._batch.append(await self._queue.get())
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_seconds
+        while len(self._batch) < self.batch_size:
+            try:
+                self._batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _write_batch(self, batch: list[dict]):
+        rows = [build_alarm_message_row(**item) for item in batch]
+        try:
+            await save_alarm_messages_async(rows)
+            self.saved += len(rows)
+            self.batches += 1
+            webhook_delivery_worker.notify()
+        except Exception as ex:
+            self.db_failures += len(rows)
+            logger.error(f"[ALARM_QUEUE] Save batch of {len(rows)} alarm(s) failed: {ex}")
+
+    async def run(self):
+        """
+        Main loop: gom batch → insert DB.
+        Bị cancel (shutdown / mất lease) → ghi nốt batch đang gom và phần còn trong queue.
+        """
+        try:
+            while True:
+                await self._collect_batch()
+                batch, self._batch = self._batch, []
+                await self._write_batch(batch)
+        finally:
+            batch, self._batch = self._batch, []
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if batch:
+                await self._write_batch(batch)
+
+    def start(self):
+        """Chạy writer trong process hiện tại (gọi nhiều lần chỉ chạy 1 writer)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Dừng writer, ghi nốt alarm còn trong queue"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "queued": self._queue.qsize(),
+            "maxsize": self.maxsize,
+            "enqueued": self.enqueued,
+            "backpressure": self.backpressure,
+            "dropped": self.dropped,
+            "saved": self.saved,
+            "batches": self.batches,
+            "db_failures": self.db_failures,
+        }
+
+
+alarm_ingest_queue = AlarmIngestQueue()
@@ -0,0 +1,244 @@
+"""
+Alarm push mode: device tự gửi event tới HTTP host (ISAPI httpHosts) thay vì
+server giữ 1 kết nối alertStream / device → chi phí theo số event, không theo số device.
+
+- configure_http_host / remove_http_host: cấu hình slot httpHosts/{ALARM_PUSH_HTTP_HOST_ID}
+  trỏ về POST {ALARM_PUSH_PATH}/{device_id}/{token} (token: device_push_token)
+- set_devices_alarm_mode: đổi mode hàng loạt (job configure_alarm_mode)
+- ingest_pushed_events: body của 1 notification → cùng pipeline với pull
+  (AlertStreamParser → AlarmEventProcessor → alarm_ingest_queue)
+"""
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from xml.sax.saxutils import escape
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.device import Device
+from app.core.device_crypto import device_push_token
+from app.core.http_client import get_http_client
+from app.features.deps import build_hik_auth
+from app.features.alarm_nofi.alarm import AlarmEventProcessor, build_alarm_message
+from app.features.alarm_nofi.alert_stream_parser import AlertStreamParser, boundary_from_content_type
+from app.features.alarm_nofi.ingest_queue import alarm_ingest_queue
+from app.core.exceptions import DeviceNotFoundError
+from app.core.constants import (
+    ALARM_MODE_PULL,
+    ALARM_MODE_PUSH,
+    ALARM_MODES,
+    ALARM_PUSH_HOST,
+    ALARM_PUSH_PORT,
+    ALARM_PUSH_HTTP_HOST_ID,
+    ALARM_PUSH_PATH,
+    ALARM_MODE_CONFIGURE_CONCURRENCY,
+    ERROR_MSG_INVALID_ALARM_MODE,
+    ERROR_MSG_ALARM_PUSH_HOST_REQUIRED,
+    ERROR_MSG_NO_DEVICES,
+)
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ProgressCallback = Callable[..., Awaitable[None]]
+
+# debounce của device push giữ giữa các request (trong process này)
+_push_processors: dict[int, AlarmEventProcessor] = {}
+
+
+def alarm_push_path(device_id: int) -> str:
+    return f"{ALARM_PUSH_PATH}/{device_id}/{device_push_token(device_id)}"
+
+
+# =========================
+# DEVICE CONFIG (ISAPI)
+# =========================
+
+def build_http_host_xml(device_id: int, host: str, port: int) -> str:
+    # host là IP → ipaddress, ngược lại → hostname
+    is_ip = host.replace(".", "").isdigit()
+    address = (
+        f"<addressingFormatType>ipaddress</addressingFormatType>\n"
+        f"    <ipAddress>{escape(host)}</ipAddress>"
+        if is_ip else
+        f"<addressingFormatType>hostname</addressingFormatType>\n"
+        f"    <hostName>{escape(host)}</hostName>"
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<HttpHostNotification version="2.0" xmlns="http://www.hikvision.com/ver20/XMLSchema">
+    <id>{ALARM_PUSH_HTTP_HOST_ID}</id>
+    <url>{alarm_push_path(device_id)}</url>
+    <protocolType>HTTP</protocolType>
+    <parameterFormatType>XML</parameterFormatType>
+    {address}
+    <portNo>{port}</portNo>
+    <httpAuthenticationMethod>none</httpAuthenticationMethod>
+</HttpHostNotification>
+"""
+
+
+def _http_host_url(device: Device) -> str:
+    return f"http://{device.ip_web}/ISAPI/Event/notification/httpHosts/{ALARM_PUSH_HTTP_HOST_ID}"
+
+
+async def configure_http_host(device: Device, host: str, port: int):
+    resp = await get_http_client().put(
+        _http_host_url(device),
+        content=build_http_host_xml(device.id, host, port),
+        headers=build_hik_auth(device)
+    )
+    resp.raise_for_status()
+
+
+async def remove_http_host(device: Device):
+    """Best effort: firmware cũ không cho DELETE thì push vẫn bị bỏ qua ở endpoint (mode = pull)"""
+    try:
+        resp = await get_http_client().delete(
+            _http_host_url(device),
+            headers=build_hik_auth(device)
+        )
+        resp.raise_for_status()
+    except Exception as e:
+        logger.warning(f"[ALARM_PUSH] Device {device.id}: remove http host failed: {e}")
+
+
+async def build_alarm_mode_job_params(db: AsyncSession, params: dict, superadmin_id) -> dict:
+    """
+    Kiểm tra params của job configure_alarm_mode (device thuộc superadmin, mode, host)
+    → params đã chuẩn hóa để enqueue
+    """
+    mode = params.get("mode")
+    if mode not in ALARM_MODES:
+        raise HTTPException(400, ERROR_MSG_INVALID_ALARM_MODE)
+
+    device_ids = sorted({int(device_id) for device_id in params.get("device_ids") or []})
+    if not device_ids:
+        raise HTTPException(400, ERROR_MSG_NO_DEVICES)
+
+    result = await db.execute(
+        select(Device.id).where(
+            Device.id.in_(device_ids),
+            Device.owner_superadmin_id == superadmin_id
+        )
+    )
+    owned = set(result.scalars().all())
+    missing = [device_id for device_id in device_ids if device_id not in owned]
+    if missing:
+        raise DeviceNotFoundError(f"Device not found: {missing}")
+
+    job_params = {"device_ids": device_ids, "mode": mode}
+    if mode == ALARM_MODE_PUSH:
+        host = params.get("host") or ALARM_PUSH_HOST
+        if not host:
+            raise HTTPException(400, ERROR_MSG_ALARM_PUSH_HOST_REQUIRED)
+        job_params["host"] = host
+        job_params["port"] = int(params.get("port") or ALARM_PUSH_PORT)
+    return job_params
+
+
+async def set_devices_alarm_mode(
+    db: AsyncSession,
+    device_ids: list[int],
+    mode: str,
+    host: str | None = None,
+    port: int | None = None,
+    progress: ProgressCallback | None = None
+) -> dict:
+    """
+    push: cấu hình http host trên device, thành công mới đổi alarm_mode
+    pull: đổi alarm_mode trước (supervisor mở lại alertStream), rồi gỡ http host
+    Commit sau mỗi lượt, lỗi 1 device không ảnh hưởng device khác (xem "failed").
+    """
+    result = await db.execute(
+        select(Device).where(Device.id.in_(device_ids)).order_by(Device.id)
+    )
+    devices = result.scalars().all()
+
+    failed: dict[int, str] = {}
+
+    async def configure(device: Device):
+        try:
+            if mode == ALARM_MODE_PUSH:
+                await configure_http_host(device, host, port)
+            else:
+                await remove_http_host(device)
+        except Exception as e:
+            failed[device.id] = str(e) or type(e).__name__
+
+    if mode == ALARM_MODE_PULL:
+        for device in devices:
+            device.alarm_mode = ALARM_MODE_PULL
+        await db.commit()
+
+    # mỗi lượt tối đa ALARM_MODE_CONFIGURE_CONCURRENCY device song song
+    done = 0
+    total = len(devices)
+    for start in range(0, total, ALARM_MODE_CONFIGURE_CONCURRENCY):
+        chunk = devices[start:start + ALARM_MODE_CONFIGURE_CONCURRENCY]
+        await asyncio.gather(*(configure(device) for device in chunk))
+
+        if mode == ALARM_MODE_PUSH:
+            for device in chunk:
+                if device.id not in failed:
+                    device.alarm_mode = ALARM_MODE_PUSH
+            await db.commit()
+
+        done += len(chunk)
+        if progress:
+            await progress(done, total, f"{mode}: {done}/{total} devices")
+
+    return {
+        "mode": mode,
+        "configured": [device.id for device in devices if device.id not in failed],
+        "failed": failed,
+        "not_found": sorted(set(device_ids) - {device.id for device in devices}),
+    }
+
+
+# =========================
+# INGEST
+# =========================
+
+def _processor_for(device: Device) -> AlarmEventProcessor:
+    processor = _push_processors.get(device.id)
+    if processor is None or processor.ip_web != device.ip_web:
+        processor = AlarmEventProcessor(device)
+        _push_processors[device.id] = processor
+    return processor
+
+
+async def ingest_pushed_events(
+    device: Device,
+    body: AsyncIterator[bytes],
+    content_type: str | None
+) -> dict:
+    """
+    Parse body (XML trần hoặc multipart kèm ảnh) của 1 notification, đưa alarm vào
+    alarm_ingest_queue như pull mode
+    """
+    parser = AlertStreamParser(boundary_from_content_type(content_type))
+    processor = _processor_for(device)
+
+    events = 0
+    accepted = 0
+    dropped = 0
+    async for chunk in body:
+        for fields in parser.feed(chunk):
+            events += 1
+            alarm = await processor.process(fields)
+            if alarm is None:
+                continue
+
+            queued = await alarm_ingest_queue.put(
+                user_id=device.owner_superadmin_id,
+                device_id=device.id,
+                alarm=alarm,
+                message=build_alarm_message(alarm),
+            )
+            if queued:
+                accepted += 1
+            else:
+                dropped += 1
+
+    return {"events": events, "accepted": accepted, "dropped": dropped}
@@ -0,0 +1,285 @@
+"""
+Outbox webhook n8n
+
+save_alarm_messages_async ghi alarm_messages + webhook_outbox trong cùng 1 transaction
+(build_outbox_rows), nên alarm đã lưu thì chắc chắn sẽ được gửi webhook.
+
+WebhookDeliveryWorker (chạy trong duty alarm_stream):
+- lấy các row pending đã tới hạn (FOR UPDATE SKIP LOCKED), đẩy next_attempt_at lên
+  WEBHOOK_CLAIM_SECONDS để worker khác không lấy trùng
+- gom theo user → 1 request chứa tối đa WEBHOOK_MAX_EVENTS_PER_CALL event
+- thành công: delivered + latency_ms; lỗi: retry sau min(BASE * 2^attempts, MAX) giây,
+  quá WEBHOOK_MAX_ATTEMPTS lần thì failed
+
+Body webhook:
+    { user_id, device_id (nếu mọi event cùng device), count,
+      message: các message nối bằng xuống dòng, events: [payload] }
+"""
+import asyncio
+import os
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import select, update, delete, case, cast, func, literal_column, Integer
+
+from app.core.http_client import get_http_client
+from app.db.session import AsyncSessionLocal
+from app.Models.webhook_outbox import WebhookOutbox
+from app.core.constants import (
+    WEBHOOK_STATUS_PENDING,
+    WEBHOOK_STATUS_DELIVERED,
+    WEBHOOK_STATUS_FAILED,
+    WEBHOOK_CLAIM_BATCH_SIZE,
+    WEBHOOK_MAX_EVENTS_PER_CALL,
+    WEBHOOK_CONCURRENCY,
+    WEBHOOK_TIMEOUT_SECONDS,
+    WEBHOOK_CLAIM_SECONDS,
+    WEBHOOK_MAX_ATTEMPTS,
+    WEBHOOK_RETRY_BASE_SECONDS,
+    WEBHOOK_RETRY_MAX_SECONDS,
+    WEBHOOK_POLL_INTERVAL_SECONDS,
+    WEBHOOK_OUTBOX_RETENTION_DAYS,
+)
+from app.core.logger import setup_logger
+
+load_dotenv("./app/.env")
+N8N_WEBHOOK_URL = os.getenv("N8N_WEBHOOK_URL")
+
+logger = setup_logger(__name__)
+
+# dọn row cũ mỗi giờ
+_CLEANUP_INTERVAL_SECONDS = 3600
+
+
+def webhook_enabled() -> bool:
+    return bool(N8N_WEBHOOK_URL)
+
+
+def build_outbox_rows(alarm_ids: list[int], alarm_rows: list[dict]) -> list[dict]:
+    """Row webhook_outbox cho các alarm vừa insert (alarm_ids cùng thứ tự alarm_rows)"""
+    return [
+        {
+            "user_id": row["user_id"],
+            "alarm_message_id": alarm_id,
+            "payload": {
+                "device_id": row["device_id"],
+                "channel_id_in_device": row["channel_id_in_device"],
+                "channel_name": row["channel_name"],
+                "event": row["event"],
+                "message": row["message"],
+            },
+            "status": WEBHOOK_STATUS_PENDING,
+            "attempts": 0,
+        }
+        for alarm_id, row in zip(alarm_ids, alarm_rows)
+    ]
+
+
+def build_webhook_body(user_id: str, events: list[dict]) -> dict:
+    device_ids = {event.get("device_id") for event in events}
+    return {
+        "user_id": user_id,
+        "device_id": device_ids.pop() if len(device_ids) == 1 else None,
+        "count": len(events),
+        "message": "\n".join(event["message"] for event in events),
+        "events": events,
+    }
+
+
+class WebhookDeliveryWorker:
+    def __init__(
+        self,
+        claim_batch_size: int = WEBHOOK_CLAIM_BATCH_SIZE,
+        max_events_per_call: int = WEBHOOK_MAX_EVENTS_PER_CALL,
+        concurrency: int = WEBHOOK_CONCURRENCY
+    ):
+        self.claim_batch_size = claim_batch_size
+        self.max_events_per_call = max(1, max_events_per_call)
+        self.concurrency = max(1, concurrency)
+
+        self._wake = asyncio.Event()
+        self._last_cleanup = 0.0
+        # latency (ms) của các event gửi thành công gần đây
+        self._latencies: deque[int] = deque(maxlen=1000)
+
+        self.calls = 0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+
+    def notify(self):
+        """Có row outbox mới → gửi ngay, không chờ hết poll interval"""
+        self._wake.set()
+
+    # =========================
+    # INTERNAL
+    # =========================
+
+    async def _claim(self) -> list:
+        async with AsyncSessionLocal() as db:
+            due_ids = (
+                select(WebhookOutbox.id)
+                .where(
+                    WebhookOutbox.status == WEBHOOK_STATUS_PENDING,
+                    WebhookOutbox.next_attempt_at <= func.now()
+                )
+                .order_by(WebhookOutbox.id)
+                .limit(self.claim_batch_size)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                update(WebhookOutbox)
+                .where(WebhookOutbox.id.in_(due_ids))
+                .values(next_attempt_at=func.now() + timedelta(seconds=WEBHOOK_CLAIM_SECONDS))
+                .returning(
+                    WebhookOutbox.id,
+                    WebhookOutbox.user_id,
+                    WebhookOutbox.payload,
+                    WebhookOutbox.created_at
+                )
+            )
+            rows = result.all()
+            await db.commit()
+            return sorted(rows, key=lambda row: row.id)
+
+    async def _deliver(self, sem: asyncio.Semaphore, user_id: str, rows: list):
+        body = build_webhook_body(user_id, [row.payload for row in rows])
+
+        error = None
+        async with sem:
+            try:
+                resp = await get_http_client().post(
+                    N8N_WEBHOOK_URL,
+                    json=body,
+                    timeout=WEBHOOK_TIMEOUT_SECONDS,
+                )
+                resp.raise_for_status()
+            except Exception as ex:
+                error = str(ex) or type(ex).__name__
+        self.calls += 1
+
+        ids = [row.id for row in rows]
+        gave_up = 0
+        async with AsyncSessionLocal() as db:
+            if error is None:
+                await db.execute(
+                    update(WebhookOutbox)
+                    .where(WebhookOutbox.id.in_(ids))
+                    .values(
+                        status=WEBHOOK_STATUS_DELIVERED,
+                        attempts=WebhookOutbox.attempts + 1,
+                        delivered_at=func.now(),
+                        last_error=None,
+                        latency_ms=cast(
+                            func.extract("epoch", func.now() - WebhookOutbox.created_at) * 1000,
+                            Integer
+                        )
+                    )
+                )
+            else:
+                backoff_seconds = func.least(
+                    WEBHOOK_RETRY_BASE_SECONDS * func.power(2, WebhookOutbox.attempts),
+                    WEBHOOK_RETRY_MAX_SECONDS
+                )
+                result = await db.execute(
+                    update(WebhookOutbox)
+                    .where(WebhookOutbox.id.in_(ids))
+                    .values(
+                        status=case(
+                            (WebhookOutbox.attempts + 1 >= WEBHOOK_MAX_ATTEMPTS, WEBHOOK_STATUS_FAILED),
+                            else_=WEBHOOK_STATUS_PENDING
+                        ),
+                        attempts=WebhookOutbox.attempts + 1,
+                        next_attempt_at=func.now() + backoff_seconds * literal_column("interval '1 second'"),
+                        last_error=error[:1000]
+                    )
+                    .returning(WebhookOutbox.status)
+                )
+                gave_up = sum(1 for status in result.scalars() if status == WEBHOOK_STATUS_FAILED)
+            await db.commit()
+
+        if error is None:
+            self.delivered += len(rows)
+            now = datetime.now(timezone.utc)
+            self._latencies.extend(
+                int((now - row.created_at).total_seconds() * 1000) for row in rows
+            )
+        else:
+            self.retried += len(rows) - gave_up
+            self.failed += gave_up
+            logger.error(f"[N8N WEBHOOK] Send {len(rows)} event(s) of user {user_id} failed: {error}")
+
+    async def _cleanup(self):
+        if time.monotonic() - self._last_cleanup < _CLEANUP_INTERVAL_SECONDS:
+            return
+        self._last_cleanup = time.monotonic()
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(WebhookOutbox)
+                .where(
+                    WebhookOutbox.status.in_([WEBHOOK_STATUS_DELIVERED, WEBHOOK_STATUS_FAILED]),
+                    WebhookOutbox.created_at < func.now() - timedelta(days=WEBHOOK_OUTBOX_RETENTION_DAYS)
+                )
+            )
+            await db.commit()
+            if result.rowcount:
+                logger.info(f"[N8N WEBHOOK] Removed {result.rowcount} old outbox row(s)")
+
+    async def run(self):
+        """
+        Main loop: lấy row tới hạn → gửi song song theo user → cập nhật kết quả.
+        Còn row đầy batch thì làm tiếp ngay, không thì chờ notify() / poll interval.
+        """
+        if not webhook_enabled():
+            logger.warning("[N8N WEBHOOK] N8N_WEBHOOK_URL is not set, webhook delivery disabled")
+            return
+
+        sem = asyncio.Semaphore(self.concurrency)
+        while True:
+            self._wake.clear()
+            rows = []
+            try:
+                rows = await self._claim()
+
+                by_user: dict[str, list] = defaultdict(list)
+                for row in rows:
+                    by_user[row.user_id].append(row)
+
+                await asyncio.gather(*(
+                    self._deliver(sem, user_id, user_rows[i:i + self.max_events_per_call])
+                    for user_id, user_rows in by_user.items()
+                    for i in range(0, len(user_rows), self.max_events_per_call)
+                ))
+
+                await self._cleanup()
+            except Exception as ex:
+                logger.error(f"[N8N WEBHOOK] Delivery loop error: {ex}")
+
+            if len(rows) >= self.claim_batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=WEBHOOK_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            "enabled": webhook_enabled(),
+            "calls": self.calls,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "failed": self.failed,
+            "latency_ms": {
+                "avg": sum(latencies) // len(latencies) if latencies else None,
+                "p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+                "max": latencies[-1] if latencies else None,
+            },
+        }
+
+
+webhook_delivery_worker = WebhookDeliveryWorker()
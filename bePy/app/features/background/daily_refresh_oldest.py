@@ -10,9 +10,10 @@ from app.core.logger import setup_logger
 logger = setup_logger(__name__)
 
 
-async def daily_refresh_oldest():
+async def daily_refresh_oldest(on_progress=None):
     """
     Background task to refresh the oldest record date for all active devices daily.
+    on_progress(done, total): called after each device (total = devices of all active users).
     """
     logger.info("=== Start daily refresh oldest_record_date for all devices ===")
 
@@ -21,11 +22,18 @@ async def daily_refresh_oldest():
             result = await db.execute(select(User).where(User.is_active == True))
             users = result.scalars().all()
 
+            devices_by_user = {}
             for user in users:
                 result = await db.execute(
                     select(Device).where(Device.owner_superadmin_id == user.id)
                 )
-                devices = result.scalars().all()
+                devices_by_user[user.id] = result.scalars().all()
+
+            total = sum(len(devices) for devices in devices_by_user.values())
+            done = 0
+
+            for user in users:
+                devices = devices_by_user[user.id]
 
                 logger.info(f"Refreshing oldest for user: {user.username}")
 
@@ -37,6 +45,10 @@ async def daily_refresh_oldest():
                         await db.rollback()
                         logger.error(f"Error refreshing device {device.id}: {e}")
 
+                    done += 1
+                    if on_progress:
+                        on_progress(done, total)
+
             logger.info("=== Daily refresh oldest completed ===")
 
         except Exception as e:
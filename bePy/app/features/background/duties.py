@@ -0,0 +1,36 @@
+"""
+Các duty background (chạy mãi tới khi bị cancel), mỗi duty giữ 1 lease (app/core/leader.py)
+
+Dùng chung cho:
+- API process (app/main.py) khi RUN_BACKGROUND_DUTIES_IN_API=true
+- worker process riêng (python -m app.worker)
+"""
+from app.features.sync.auto_sync import sync_background_worker
+from app.features.background.scheduler import run_record_sync_duty
+from app.features.background.save_alarm import run_alarm_duty
+from app.features.jobs.handlers import job_worker_pool
+from app.features.alarm_nofi.ingest_queue import alarm_ingest_queue
+from app.core.leader import lease_manager
+
+BACKGROUND_DUTIES = {
+    #bg auto sync time
+    "auto_sync_settings": sync_background_worker,
+    # Bắt alert steam + refresh segment theo event
+    "alarm_stream": run_alarm_duty,
+    # sync ngay khi nhận lease + scheduler (hot sync / đối soát / refresh oldest) + resume backfill
+    "record_sync": run_record_sync_duty,
+    # job queue (device init, sync permission / recording mode, sync now)
+    "job_worker": job_worker_pool.run,
+}
+
+
+def start_background_duties(names: list[str] | None = None):
+    """names=None → mọi duty"""
+    for name in names or BACKGROUND_DUTIES:
+        lease_manager.start(name, BACKGROUND_DUTIES[name])
+
+
+async def stop_background_duties():
+    await lease_manager.stop()
+    # sau khi listener đã dừng: ghi nốt alarm còn trong queue
+    await alarm_ingest_queue.stop()
@@ -1,10 +1,14 @@
 import asyncio
 from sqlalchemy import select
-from app.features.alarm_nofi.alarm import get_alarm, build_alarm_message, send_alarm_to_n8n_webhook,save_alarm_message_async
+from app.features.alarm_nofi.alarm import get_alarm, build_alarm_message
+from app.features.alarm_nofi.ingest_queue import alarm_ingest_queue
+from app.features.alarm_nofi.webhook_outbox import webhook_delivery_worker
 from app.Models.device import Device
 from app.features.deps import build_hik_auth
 from app.db.session import AsyncSessionLocal
 from app.Models.user import User
+from app.features.RecordInfo.refresh_queue import channel_refresh_queue
+from app.core.constants import ALARM_MODE_PULL
 from app.core.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -25,18 +29,12 @@ class AlarmSupervisor:
             try:
                 headers = build_hik_auth(device)
                 async for alarm in get_alarm(device, headers):
-                    message = build_alarm_message(alarm)
-
-                    await send_alarm_to_n8n_webhook(
-                        user_id=device.owner_superadmin_id,
-                        device_id=device.id,
-                        message=message,
-                    )
-                    await save_alarm_message_async(
+                    # chỉ đưa vào queue, ghi DB do alarm_ingest_queue, webhook do outbox worker
+                    await alarm_ingest_queue.put(
                         user_id=device.owner_superadmin_id,
-                        alarm= alarm,
                         device_id=device.id,
-                        message=message,
+                        alarm=alarm,
+                        message=build_alarm_message(alarm),
                     )
             except asyncio.CancelledError:
                 logger.info(f"[ALARM][{device.id}] Worker task cancelled")
@@ -47,7 +45,8 @@ class AlarmSupervisor:
 
     async def fetch_valid_devices(self):
         """
-        Fetch devices that are checked and belong to active users.
+        Fetch devices that are checked, belong to active users and use pull mode
+        (push-mode devices send events to POST /api/alarm/push/...).
         """
         async with AsyncSessionLocal() as session:
             stmt = (
@@ -55,6 +54,7 @@ class AlarmSupervisor:
                 .join(User, Device.owner_superadmin_id == User.id)
                 .where(
                     Device.is_checked == True,
+                    Device.alarm_mode == ALARM_MODE_PULL,
                     User.is_active == True,
                 )
             )
@@ -86,12 +86,33 @@ class AlarmSupervisor:
     async def run(self):
         """
         Main loop for the supervisor.
+        Stops every device listener when cancelled (shutdown / lease lost).
         """
-        while True:
-            try:
-                await self.sync_tasks()
-            except Exception as ex:
-                logger.error(f"[SUPERVISOR] Error syncing tasks: {ex}")
+        try:
+            while True:
+                try:
+                    await self.sync_tasks()
+                except Exception as ex:
+                    logger.error(f"[SUPERVISOR] Error syncing tasks: {ex}")
+
+                await asyncio.sleep(10)  # sync interval
+        finally:
+            for task in self.tasks.values():
+                task.cancel()
+            self.tasks.clear()
+
 
-            await asyncio.sleep(10)  # sync interval
+async def run_alarm_duty():
+    """
+    Duty alert stream: listener cho từng device (pull mode) + refresh segment theo event
+    + gửi webhook từ outbox.
+    Listener và refresh đi chung 1 lease vì event được đẩy vào queue của cùng process.
+    Writer alarm_ingest_queue không cần lease (mỗi process ghi alarm của mình) nên chỉ start.
+    """
+    alarm_ingest_queue.start()
+    await asyncio.gather(
+        AlarmSupervisor().run(),
+        channel_refresh_queue.run(),
+        webhook_delivery_worker.run()
+    )
 
@@ -1,15 +1,32 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
-from app.features.background.update_data_record  import auto_sync_all_devices
+from app.features.background.update_data_record  import auto_sync_all_devices, sync_today_all_devices
 import asyncio
 from app.features.background.daily_refresh_oldest import daily_refresh_oldest
+from app.features.background.trigger_init_record_data import resume_pending_backfills
+from app.features.background.warmup import warmup_state
+from app.core.logger import setup_logger
+from app.core.constants import HOT_SYNC_INTERVAL_MINUTES, RECONCILE_SYNC_INTERVAL_MINUTES
+
+logger = setup_logger(__name__)
+
 scheduler = AsyncIOScheduler(timezone="Asia/Ho_Chi_Minh")
 
 def start_scheduler():
+    # tầng nóng: chỉ segment hôm nay
+    scheduler.add_job(
+        sync_today_all_devices,
+        trigger=IntervalTrigger(minutes=HOT_SYNC_INTERVAL_MINUTES),
+        id="hot_sync_today",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    # tầng chậm: đối soát lịch sử từ last_sync_at
     scheduler.add_job(
         auto_sync_all_devices,
-        trigger=IntervalTrigger(minutes=5),
+        trigger=IntervalTrigger(minutes=RECONCILE_SYNC_INTERVAL_MINUTES),
         id="auto_sync_devices",
         replace_existing=True,
         max_instances=1,
@@ -31,3 +48,32 @@ def start_scheduler():
 def stop_scheduler():
     if scheduler.running:
         scheduler.shutdown(wait=False)
+
+
+async def run_record_sync_duty():
+    """
+    Duty sync record data (chỉ process giữ lease "record_sync" chạy):
+    resume backfill dở dang, chạy sync 1 lần rồi giữ scheduler cho tới khi bị cancel
+    """
+    backfill_task = asyncio.create_task(resume_pending_backfills())
+    try:
+        # 2 cái này là cái scheduler nhưng active ngay 1 lần khi nhận lease (start/restart server BE)
+        # chạy nền, không chặn startup; tiến độ xem ở /health/ready
+        warmup_state.reset()
+        for phase, run_phase in (
+            ("auto_sync_devices", auto_sync_all_devices),
+            ("refresh_oldest", daily_refresh_oldest),
+        ):
+            warmup_state.begin(phase)
+            try:
+                await run_phase(on_progress=warmup_state.progress(phase))
+                warmup_state.finish(phase)
+            except Exception as e:
+                warmup_state.finish(phase, ok=False)
+                logger.error(f"[WARMUP] {phase} failed: {e}")
+
+        start_scheduler()
+        await asyncio.Event().wait()
+    finally:
+        stop_scheduler()
+        backfill_task.cancel()
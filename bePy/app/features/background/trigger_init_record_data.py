@@ -1,8 +1,18 @@
+import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, or_
 from app.db.session import AsyncSessionLocal
 from app.Models.device import Device
+from app.Models.channel import Channel
+from app.Models.background_job import BackgroundJob
 from app.features.RecordInfo.hikrecord import HikRecordService
+from app.core.constants import (
+    BACKFILL_RESUME_WORKERS,
+    JOB_TYPE_DEVICE_INIT,
+    JOB_TYPE_DEVICE_BACKFILL,
+    JOB_STATUS_QUEUED,
+    JOB_STATUS_RUNNING
+)
 from app.core.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -26,3 +36,68 @@ async def trigger_device_init_data(device_id: int):
             await db.rollback()
             logger.error(f"[AUTO SYNC ERROR] {e}")
             raise
+
+
+async def resume_device_backfill(device_id: int):
+    """
+    Chạy tiếp backfill record data của device từ checkpoint (channel.backfill_until)
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await db.execute(select(Device).where(Device.id == device_id))
+            device = result.scalars().first()
+            if not device:
+                return
+
+            done = await HikRecordService().backfill_device_record_data(db, device)
+            logger.info(f"Device {device_id} backfill {'done' if done else 'stopped'}")
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"[BACKFILL ERROR] Device {device_id}: {e}")
+
+
+async def resume_pending_backfills():
+    """
+    Khi start server: resume backfill của các device còn channel chưa backfill xong
+    (vd server restart giữa chừng lúc init).
+    Bỏ qua device đang có job device_init / device_backfill queued / running: job đó tự backfill tiếp,
+    chạy song song thì 2 bên ghi đè nhau.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(BackgroundJob.params["device_id"].as_integer())
+            .where(
+                BackgroundJob.job_type.in_([JOB_TYPE_DEVICE_INIT, JOB_TYPE_DEVICE_BACKFILL]),
+                BackgroundJob.status.in_([JOB_STATUS_QUEUED, JOB_STATUS_RUNNING])
+            )
+        )
+        init_job_device_ids = set(result.scalars().all())
+
+        result = await db.execute(
+            select(Channel.device_id)
+            .where(
+                Channel.is_active == True,
+                Channel.oldest_record_date.is_not(None),
+                or_(
+                    Channel.backfill_until.is_(None),
+                    Channel.backfill_until > Channel.oldest_record_date
+                )
+            )
+            .distinct()
+        )
+        device_ids = [
+            device_id for device_id in result.scalars().all()
+            if device_id not in init_job_device_ids
+        ]
+
+    if not device_ids:
+        return
+
+    logger.info(f"Resume backfill for devices: {device_ids}")
+    sem = asyncio.Semaphore(max(1, BACKFILL_RESUME_WORKERS))
+
+    async def run(device_id: int):
+        async with sem:
+            await resume_device_backfill(device_id)
+
+    await asyncio.gather(*(run(device_id) for device_id in device_ids))
@@ -1,4 +1,6 @@
 import asyncio
+import random
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from app.db.session import AsyncSessionLocal
@@ -10,35 +12,124 @@ from app.Models.channel_record_day import ChannelRecordDay
 from app.Models.channel_record_time_range import ChannelRecordTimeRange
 from app.features.RecordInfo.hikrecord import HikRecordService
 from app.features.deps import build_hik_auth
+from app.features.RecordInfo.daily_distribution_cache import daily_distribution_cache
+from app.features.RecordInfo.work_with_db import write_record_segments
 from app.utils.date_helpers import to_date
 from app.core.time_provider import TimeProvider
+from app.core.constants import (
+    DEVICE_SYNC_WORKERS,
+    DEVICE_SYNC_JITTER_SECONDS,
+    DEVICE_SYNC_RUN_DEADLINE_SECONDS,
+    HOT_SYNC_RUN_DEADLINE_SECONDS
+)
 from app.core.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 
-async def auto_sync_all_devices():
-    async with AsyncSessionLocal() as db:
-        try:
+async def run_device_sync_pool(
+    sync_device,
+    label: str,
+    workers: int | None = None,
+    deadline_seconds: float = DEVICE_SYNC_RUN_DEADLINE_SECONDS,
+    on_progress=None
+):
+    """
+    Chạy `sync_device(db, device)` cho tất cả device đang checked theo worker pool:
+    tối đa `workers` device cùng lúc (mặc định DEVICE_SYNC_WORKERS),
+    mỗi device có session + transaction riêng, có jitter trước khi bắt đầu
+    và cả lượt bị cắt ở `deadline_seconds`.
+    on_progress(done, total): gọi sau mỗi device (xong hoặc lỗi).
+    """
+    try:
+        async with AsyncSessionLocal() as db:
             result = await db.execute(
-                select(Device).where(Device.is_checked == True)
+                select(Device.id).where(Device.is_checked == True)
             )
-            devices = result.scalars().all()
-            
-            record_service = HikRecordService()
-            for device in devices:
+            device_ids = result.scalars().all()
+    except Exception as e:
+        logger.error(f"[{label} ERROR] Global: {e}")
+        return
+
+    if not device_ids:
+        return
+
+    sem = asyncio.Semaphore(max(1, workers or DEVICE_SYNC_WORKERS))
+    finished = 0
+    if on_progress:
+        on_progress(0, len(device_ids))
+
+    async def sync_one(device_id: int):
+        nonlocal finished
+        # jitter trước khi lấy slot → worker không ngồi chờ jitter mà không sync gì
+        await asyncio.sleep(random.uniform(0, DEVICE_SYNC_JITTER_SECONDS))
+
+        async with sem:
+            async with AsyncSessionLocal() as db:
                 try:
-                    await record_service.sync_device_channels_data_core(
-                        db=db,
-                        device=device
-                    )
+                    device = await db.get(Device, device_id)
+                    if not device:
+                        return
+
+                    await sync_device(db, device)
                     await db.commit()
                 except Exception as e:
                     await db.rollback()
-                    logger.error(f"[SYNC ERROR] Device {device.id}: {e}")
+                    logger.error(f"[{label} ERROR] Device {device_id}: {e}")
+
+        finished += 1
+        if on_progress:
+            on_progress(finished, len(device_ids))
+
+    started = time.monotonic()
+    tasks = [asyncio.create_task(sync_one(device_id)) for device_id in device_ids]
+    _, pending = await asyncio.wait(tasks, timeout=deadline_seconds)
+
+    # quá deadline → hủy các device còn lại, lượt sau sẽ sync tiếp
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning(
+            f"[{label}] Deadline {deadline_seconds}s reached, "
+            f"cancelled {len(pending)}/{len(tasks)} devices"
+        )
+
+    logger.info(
+        f"[{label}] Synced {len(tasks) - len(pending)}/{len(tasks)} devices "
+        f"in {time.monotonic() - started:.1f}s | "
+        f"dailyDistribution cache: {daily_distribution_cache.stats()}"
+    )
+
+
+async def auto_sync_all_devices(workers: int | None = None, on_progress=None):
+    """
+    Tầng chậm: đối soát toàn bộ record data (channel list + từ last_sync_at tới hôm nay).
+    on_progress(done, total): tiến độ theo device (xem run_device_sync_pool).
+    """
+    record_service = HikRecordService()
 
-        except Exception as e:
-            logger.error(f"[SYNC ERROR] Global: {e}")
+    async def sync_device(db: AsyncSession, device: Device):
+        await record_service.sync_device_channels_data_core(db=db, device=device)
+
+    await run_device_sync_pool(sync_device, "SYNC", workers, on_progress=on_progress)
+
+
+async def sync_today_all_devices(workers: int | None = None):
+    """
+    Tầng nóng: chỉ làm mới segment của hôm nay cho mọi device (rẻ, chạy dày).
+    """
+    record_service = HikRecordService()
+
+    async def sync_device(db: AsyncSession, device: Device):
+        await record_service.sync_device_today_segments(db=db, device=device)
+
+    await run_device_sync_pool(
+        sync_device,
+        "HOT SYNC",
+        workers,
+        deadline_seconds=HOT_SYNC_RUN_DEADLINE_SECONDS
+    )
 
 
 async def delete_records_before_date(db: AsyncSession, channel_id: int, before_date):
@@ -96,7 +187,8 @@ async def refresh_oldest_record_of_channel(
         channel.channel_no,
         start_date=oldest_date,
         end_date=oldest_date,
-        header=headers
+        header=headers,
+        use_cache=False  # biên retention → luôn hỏi device
     )
 
     if status and status[0]["has_record"]:
@@ -105,8 +197,16 @@ async def refresh_oldest_record_of_channel(
 
     logger.info(f"Channel {channel.channel_no} oldest_record_date {oldest_date} đã mất record, tìm oldest mới...")
 
+    # oldest đã đổi → các tháng đã cache của channel không còn đúng
+    daily_distribution_cache.invalidate_channel(device.id, channel.channel_no)
+
     # 2. Lấy oldest mới từ device
-    new_oldest = await hik_service.oldest_record_date(device, channel.channel_no, headers)
+    new_oldest = await hik_service.oldest_record_date(
+        device,
+        channel.channel_no,
+        headers,
+        hint=oldest_date
+    )
     if not new_oldest:
         logger.info(f"Channel {channel.channel_no} không tìm thấy oldest record mới, đặt oldest_record_date = None")
         channel.oldest_record_date = None
@@ -153,21 +253,8 @@ async def refresh_oldest_record_of_channel(
         db.add(record_day)
         await db.flush()
 
-    # Xóa các segment cũ của record_day (nếu có)
-    await db.execute(
-        delete(ChannelRecordTimeRange).where(
-            ChannelRecordTimeRange.record_day_id == record_day.id
-        )
-    )
-    await db.flush()
-
-    # Thêm lại segment mới
-    for seg in segments:
-        db.add(ChannelRecordTimeRange(
-            record_day_id=record_day.id,
-            start_time=seg.start_time,
-            end_time=seg.end_time
-        ))
+    # Chỉ ghi phần segment thay đổi
+    await write_record_segments(db, {record_day.id: segments})
 
     await db.flush()
     logger.info(f"Channel {channel.channel_no} oldest_record_date đã cập nhật: {new_oldest_dt}, {len(segments)} segments mới")
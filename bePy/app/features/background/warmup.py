@@ -0,0 +1,60 @@
+"""
+Tiến độ warm-up khi process nhận lease "record_sync" (sync toàn bộ device + refresh oldest).
+Chỉ lưu trong memory của process đang chạy duty, đọc qua /health/ready.
+"""
+from datetime import datetime, timezone
+
+WARMUP_PENDING = "pending"
+WARMUP_RUNNING = "running"
+WARMUP_DONE = "done"
+WARMUP_FAILED = "failed"
+
+
+class WarmupState:
+    def __init__(self, phases: list[str]):
+        self.phase_names = phases
+        self.reset()
+
+    def reset(self):
+        self.phases = {
+            name: {
+                "status": WARMUP_PENDING,
+                "done": 0,
+                "total": None,
+                "started_at": None,
+                "finished_at": None,
+            }
+            for name in self.phase_names
+        }
+
+    def begin(self, name: str):
+        self.phases[name].update(
+            status=WARMUP_RUNNING,
+            done=0,
+            total=None,
+            started_at=datetime.now(timezone.utc).isoformat(),
+            finished_at=None
+        )
+
+    def progress(self, name: str):
+        """Callback (done, total) cho run_device_sync_pool / daily_refresh_oldest"""
+        def report(done: int, total: int | None = None):
+            self.phases[name].update(done=done, total=total)
+        return report
+
+    def finish(self, name: str, ok: bool = True):
+        self.phases[name].update(
+            status=WARMUP_DONE if ok else WARMUP_FAILED,
+            finished_at=datetime.now(timezone.utc).isoformat()
+        )
+
+    def snapshot(self) -> dict:
+        return {
+            "complete": all(
+                p["status"] in (WARMUP_DONE, WARMUP_FAILED) for p in self.phases.values()
+            ),
+            "phases": {name: dict(p) for name, p in self.phases.items()},
+        }
+
+
+warmup_state = WarmupState(["auto_sync_devices", "refresh_oldest"])
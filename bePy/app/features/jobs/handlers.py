@@ -0,0 +1,131 @@
+"""
+Handler cho từng loại job: (db, params, ctx) -> result (dict, lưu vào background_jobs.result)
+"""
+from sqlalchemy import select
+
+from app.Models.channel import Channel
+from app.features.deps import build_hik_auth
+from app.features.jobs.queue import JobContext, JobWorkerPool
+from app.features.RecordInfo.hikrecord import HikRecordService
+from app.features.GetDevicesDetail.WorkWithDb import sync_all_user_permissions_of_device
+from app.features.Schedule_Racord_Mode.work_with_db import sync_recording_mode_of_channels
+from app.features.sync.engine import SyncEngine
+from app.features.alarm_nofi.push_mode import set_devices_alarm_mode
+from app.services.device_service import get_device_or_404, get_device_channels
+from app.core.constants import (
+    JOB_TYPE_DEVICE_INIT,
+    JOB_TYPE_DEVICE_BACKFILL,
+    JOB_TYPE_SYNC_USER_PERMISSIONS,
+    JOB_TYPE_SYNC_RECORDING_MODE,
+    JOB_TYPE_SYNC_NOW,
+    JOB_TYPE_CONFIGURE_ALARM_MODE,
+)
+
+
+async def _has_backfill_checkpoint(db, device_id: int) -> bool:
+    result = await db.execute(
+        select(Channel.id)
+        .where(
+            Channel.device_id == device_id,
+            Channel.backfill_until.is_not(None)
+        )
+        .limit(1)
+    )
+    return result.first() is not None
+
+
+async def run_device_init(db, params: dict, ctx: JobContext) -> dict:
+    """
+    Init channel + record data, báo tiến độ sau mỗi chunk backfill.
+    Cancel giữa chừng vẫn giữ checkpoint (channel.backfill_until).
+    Chỉ job bị requeue (shutdown / mất heartbeat, xem JobContext.requeued) mà device đã có checkpoint
+    mới backfill tiếp, không init lại (init xóa channel + checkpoint).
+    Job mới luôn init lại từ đầu, kể cả khi device đã backfill xong từ trước.
+    """
+    device = await get_device_or_404(db, params["device_id"])
+    service = HikRecordService()
+
+    if ctx.requeued and await _has_backfill_checkpoint(db, device.id):
+        await ctx.progress(0, message="resume backfill")
+        done = await service.backfill_device_record_data(db, device, max_chunks=1)
+    else:
+        await ctx.progress(0, message="init channels")
+        done = await service.device_channels_init_data(db, device, max_chunks=1)
+    chunks = 1
+    await ctx.progress(chunks, message="backfill")
+
+    while not done:
+        done = await service.backfill_device_record_data(db, device, max_chunks=1)
+        chunks += 1
+        await ctx.progress(chunks, message="backfill")
+
+    return {"device_id": device.id, "chunks": chunks}
+
+
+async def run_device_backfill(db, params: dict, ctx: JobContext) -> dict:
+    """
+    Backfill tiếp record data từ checkpoint (vd phần lịch sử sau khi API init xong tuần hiện tại),
+    báo tiến độ sau mỗi chunk.
+    """
+    device = await get_device_or_404(db, params["device_id"])
+    service = HikRecordService()
+
+    chunks = 0
+    done = False
+    while not done:
+        done = await service.backfill_device_record_data(db, device, max_chunks=1)
+        chunks += 1
+        await ctx.progress(chunks, message="backfill")
+
+    return {"device_id": device.id, "chunks": chunks}
+
+
+async def run_sync_user_permissions(db, params: dict, ctx: JobContext) -> dict:
+    device = await get_device_or_404(db, params["device_id"])
+    return await sync_all_user_permissions_of_device(
+        db=db,
+        device=device,
+        headers=build_hik_auth(device),
+        progress=ctx.progress
+    )
+
+
+async def run_sync_recording_mode(db, params: dict, ctx: JobContext) -> dict:
+    device = await get_device_or_404(db, params["device_id"])
+    channels = await get_device_channels(db, device.id)
+    return await sync_recording_mode_of_channels(
+        db=db,
+        device=device,
+        channels=channels,
+        headers=build_hik_auth(device),
+        progress=ctx.progress
+    )
+
+
+async def run_sync_now(db, params: dict, ctx: JobContext) -> dict:
+    superadmin_id = params.get("superadmin_id")
+    await SyncEngine().sync_by_superadmin(db, superadmin_id, progress=ctx.progress)
+    return {"message": "Sync done"}
+
+
+async def run_configure_alarm_mode(db, params: dict, ctx: JobContext) -> dict:
+    return await set_devices_alarm_mode(
+        db=db,
+        device_ids=params["device_ids"],
+        mode=params["mode"],
+        host=params.get("host"),
+        port=params.get("port"),
+        progress=ctx.progress
+    )
+
+
+JOB_HANDLERS = {
+    JOB_TYPE_DEVICE_INIT: run_device_init,
+    JOB_TYPE_DEVICE_BACKFILL: run_device_backfill,
+    JOB_TYPE_SYNC_USER_PERMISSIONS: run_sync_user_permissions,
+    JOB_TYPE_SYNC_RECORDING_MODE: run_sync_recording_mode,
+    JOB_TYPE_SYNC_NOW: run_sync_now,
+    JOB_TYPE_CONFIGURE_ALARM_MODE: run_configure_alarm_mode,
+}
+
+job_worker_pool = JobWorkerPool(JOB_HANDLERS)
@@ -0,0 +1,274 @@
+"""
+Job queue lưu trong DB (bảng background_jobs) + worker pool asyncio
+
+- enqueue_job: API chỉ insert 1 row rồi trả về job_id ngay
+- JobWorkerPool.run: poll job "queued", claim bằng FOR UPDATE SKIP LOCKED
+  (nhiều process cùng chạy không lấy trùng job), giới hạn số job chạy cùng lúc
+  theo từng loại (JOB_TYPE_CONCURRENCY)
+- handler nhận JobContext để báo tiến độ; mỗi lần báo tiến độ cũng là điểm
+  kiểm tra cancel
+"""
+import asyncio
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.Models.background_job import BackgroundJob
+from app.core.constants import (
+    JOB_TYPE_CONCURRENCY,
+    JOB_POLL_INTERVAL_SECONDS,
+    JOB_STALE_SECONDS,
+    JOB_STATUS_QUEUED,
+    JOB_STATUS_RUNNING,
+    JOB_STATUS_SUCCEEDED,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_CANCELLED,
+)
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+JOB_FINISHED_STATUSES = (JOB_STATUS_SUCCEEDED, JOB_STATUS_FAILED, JOB_STATUS_CANCELLED)
+
+
+class JobCancelledError(Exception):
+    """Job bị cancel trong lúc chạy (raise từ JobContext.progress)"""
+
+
+class JobContext:
+    def __init__(self, job_id: int, requeued: bool = False):
+        self.job_id = job_id
+        # True: job đã từng chạy dở rồi bị requeue (shutdown / mất heartbeat)
+        self.requeued = requeued
+
+    async def progress(self, done: int, total: int | None = None, message: str | None = None):
+        """
+        Ghi tiến độ (session riêng → client thấy ngay, không phụ thuộc transaction của job).
+        Raise JobCancelledError nếu job đã bị yêu cầu cancel.
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id == self.job_id)
+                .values(
+                    progress_done=done,
+                    progress_total=total,
+                    progress_message=message,
+                    heartbeat_at=func.now()
+                )
+                .returning(BackgroundJob.cancel_requested)
+            )
+            cancel_requested = result.scalar()
+            await db.commit()
+
+        if cancel_requested:
+            raise JobCancelledError()
+
+
+JobHandler = Callable[[AsyncSession, dict, JobContext], Awaitable[dict | None]]
+
+
+async def enqueue_job(
+    db: AsyncSession,
+    job_type: str,
+    params: dict,
+    owner_superadmin_id=None
+) -> BackgroundJob:
+    if job_type not in JOB_TYPE_CONCURRENCY:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    job = BackgroundJob(
+        job_type=job_type,
+        status=JOB_STATUS_QUEUED,
+        params=params,
+        owner_superadmin_id=owner_superadmin_id
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    logger.info(f"Job {job.id} ({job_type}) queued: {params}")
+    return job
+
+
+async def request_cancel(db: AsyncSession, job: BackgroundJob) -> BackgroundJob:
+    """
+    Job đang chờ → cancelled luôn.
+    Job đang chạy → đặt cờ cancel_requested, worker dừng ở lần báo tiến độ tiếp theo
+    (hoặc cancel task nếu job chạy trong process này).
+    """
+    if job.status == JOB_STATUS_QUEUED:
+        job.status = JOB_STATUS_CANCELLED
+        job.finished_at = func.now()
+    elif job.status == JOB_STATUS_RUNNING:
+        job.cancel_requested = True
+
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+class JobWorkerPool:
+    def __init__(self, handlers: dict[str, JobHandler]):
+        self.handlers = handlers
+        # job_id -> (job_type, task) của các job đang chạy trong process này
+        self._running: dict[int, tuple[str, asyncio.Task]] = {}
+        self._cancelling: set[int] = set()
+
+    async def run(self):
+        logger.info("Job worker pool started")
+        try:
+            while True:
+                try:
+                    await self._heartbeat()
+                    await self._requeue_stale()
+                    await self._claim_and_dispatch()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"[JOB POOL ERROR] {e}")
+
+                await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
+        finally:
+            # shutdown: job đang chạy sẽ được đưa lại vào hàng đợi (xem _run_job)
+            for _, task in self._running.values():
+                task.cancel()
+
+    def stats(self) -> dict:
+        running: dict[str, int] = {}
+        for job_type, _ in self._running.values():
+            running[job_type] = running.get(job_type, 0) + 1
+        return {
+            "running": running,
+            "limits": dict(JOB_TYPE_CONCURRENCY),
+        }
+
+    async def _heartbeat(self):
+        """Cập nhật heartbeat cho job đang chạy + cancel task của job bị yêu cầu cancel"""
+        if not self._running:
+            return
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id.in_(list(self._running)))
+                .values(heartbeat_at=func.now())
+                .returning(BackgroundJob.id, BackgroundJob.cancel_requested)
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+            await db.commit()
+
+        for job_id, cancel_requested in rows:
+            if cancel_requested and job_id not in self._cancelling and job_id in self._running:
+                self._cancelling.add(job_id)
+                self._running[job_id][1].cancel()
+
+    async def _requeue_stale(self):
+        """Job "running" mất heartbeat (process chạy nó đã chết) → queued lại"""
+        async with AsyncSessionLocal() as db:
+            query = (
+                update(BackgroundJob)
+                .where(
+                    BackgroundJob.status == JOB_STATUS_RUNNING,
+                    BackgroundJob.heartbeat_at < func.now() - timedelta(seconds=JOB_STALE_SECONDS)
+                )
+                .values(status=JOB_STATUS_QUEUED, started_at=None, heartbeat_at=None, requeued=True)
+                .returning(BackgroundJob.id)
+                .execution_options(synchronize_session=False)
+            )
+            if self._running:
+                query = query.where(BackgroundJob.id.not_in(list(self._running)))
+
+            result = await db.execute(query)
+            requeued = result.scalars().all()
+            await db.commit()
+
+        if requeued:
+            logger.warning(f"Requeued stale jobs: {requeued}")
+
+    async def _claim_and_dispatch(self):
+        for job_type, limit in JOB_TYPE_CONCURRENCY.items():
+            if job_type not in self.handlers:
+                continue
+
+            running = sum(1 for t, _ in self._running.values() if t == job_type)
+            free = limit - running
+            if free <= 0:
+                continue
+
+            async with AsyncSessionLocal() as db:
+                claim = (
+                    select(BackgroundJob.id)
+                    .where(
+                        BackgroundJob.status == JOB_STATUS_QUEUED,
+                        BackgroundJob.job_type == job_type
+                    )
+                    .order_by(BackgroundJob.id)
+                    .limit(free)
+                    .with_for_update(skip_locked=True)
+                    .scalar_subquery()
+                )
+                result = await db.execute(
+                    update(BackgroundJob)
+                    .where(BackgroundJob.id.in_(claim))
+                    .values(
+                        status=JOB_STATUS_RUNNING,
+                        started_at=func.now(),
+                        heartbeat_at=func.now()
+                    )
+                    .returning(BackgroundJob.id, BackgroundJob.params, BackgroundJob.requeued)
+                    .execution_options(synchronize_session=False)
+                )
+                claimed = result.all()
+                await db.commit()
+
+            for job_id, params, requeued in claimed:
+                task = asyncio.create_task(
+                    self._run_job(job_id, job_type, params or {}, requeued=bool(requeued))
+                )
+                self._running[job_id] = (job_type, task)
+
+    async def _run_job(self, job_id: int, job_type: str, params: dict, requeued: bool = False):
+        logger.info(f"Job {job_id} ({job_type}) started")
+        values = {"finished_at": func.now()}
+
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await self.handlers[job_type](db, params, JobContext(job_id, requeued))
+            values.update(status=JOB_STATUS_SUCCEEDED, result=result)
+        except JobCancelledError:
+            values.update(status=JOB_STATUS_CANCELLED)
+        except asyncio.CancelledError:
+            if job_id in self._cancelling:
+                values.update(status=JOB_STATUS_CANCELLED)
+            else:
+                # process đang tắt → trả job về hàng đợi để chạy lại
+                values = {
+                    "status": JOB_STATUS_QUEUED,
+                    "started_at": None,
+                    "heartbeat_at": None,
+                    "requeued": True
+                }
+        except Exception as e:
+            logger.error(f"[JOB ERROR] Job {job_id} ({job_type}): {e}")
+            values.update(status=JOB_STATUS_FAILED, error=str(e))
+        finally:
+            self._running.pop(job_id, None)
+            self._cancelling.discard(job_id)
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(BackgroundJob)
+                    .where(BackgroundJob.id == job_id)
+                    .values(**values)
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"[JOB ERROR] Cannot save result of job {job_id}: {e}")
+
+        logger.info(f"Job {job_id} ({job_type}) {values['status']}")
@@ -48,33 +48,39 @@ async def sync_for_superadmin(owner_id):
 
 
 async def sync_background_worker():
-    while True:
-        async with AsyncSessionLocal() as db:
-            try:
-                result = await db.execute(
-                    select(SyncSetting)
-                    .where(SyncSetting.is_enabled == True)
-                )
-                settings = result.scalars().all()
-
-                active_owner_ids = {s.owner_superadmin_id for s in settings}
-
-                # Start task mới
-                for owner_id in active_owner_ids:
-                    if owner_id not in running_tasks:
-                        running_tasks[owner_id] = asyncio.create_task(
-                            sync_for_superadmin(owner_id)
-                        )
-                        logger.info(f"[AUTO SYNC] started for owner_superadmin_id={owner_id}")
-
-                # Cleanup task không còn setting
-                for owner_id in list(running_tasks.keys()):
-                    if owner_id not in active_owner_ids:
-                        task = running_tasks.pop(owner_id)
-                        task.cancel()
-                        logger.info(f"[AUTO SYNC] cancelled for owner_superadmin_id={owner_id}")
+    try:
+        while True:
+            async with AsyncSessionLocal() as db:
+                try:
+                    result = await db.execute(
+                        select(SyncSetting)
+                        .where(SyncSetting.is_enabled == True)
+                    )
+                    settings = result.scalars().all()
+
+                    active_owner_ids = {s.owner_superadmin_id for s in settings}
+
+                    # Start task mới
+                    for owner_id in active_owner_ids:
+                        if owner_id not in running_tasks:
+                            running_tasks[owner_id] = asyncio.create_task(
+                                sync_for_superadmin(owner_id)
+                            )
+                            logger.info(f"[AUTO SYNC] started for owner_superadmin_id={owner_id}")
+
+                    # Cleanup task không còn setting
+                    for owner_id in list(running_tasks.keys()):
+                        if owner_id not in active_owner_ids:
+                            task = running_tasks.pop(owner_id)
+                            task.cancel()
+                            logger.info(f"[AUTO SYNC] cancelled for owner_superadmin_id={owner_id}")
             
-            except Exception as e:
-                logger.error(f"[AUTO SYNC] worker error: {e}")
-
-        await asyncio.sleep(30)
+                except Exception as e:
+                    logger.error(f"[AUTO SYNC] worker error: {e}")
+
+            await asyncio.sleep(30)
+    finally:
+        # shutdown / mất lease → dừng mọi task sync theo superadmin
+        for task in running_tasks.values():
+            task.cancel()
+        running_tasks.clear()
@@ -16,7 +16,8 @@ class SyncEngine:
         self.time = TimeProvider()
         self.resolver = StrategyResolver()
 
-    async def sync_by_superadmin(self, db: AsyncSession, superadmin_id):
+    async def sync_by_superadmin(self, db: AsyncSession, superadmin_id, progress=None):
+        """progress(done, total): callback tiến độ theo device (vd JobContext.progress), có thể None"""
         # Nếu superadmin_id là UUID object, chuyển sang string
         if isinstance(superadmin_id, uuid.UUID):
             superadmin_id = str(superadmin_id)
@@ -30,8 +31,10 @@ class SyncEngine:
         )
         devices = result.scalars().all()
 
-        for d in devices:
+        for index, d in enumerate(devices):
             await self._sync_one(db, d, superadmin_id)
+            if progress:
+                await progress(index + 1, len(devices))
 
         await db.commit()
 
@@ -3,15 +3,12 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import Response
 from contextlib import asynccontextmanager
-import asyncio
 import os
 from dotenv import load_dotenv
 from app.routers import api_router
-from app.features.sync.auto_sync import sync_background_worker
-from app.features.background.update_data_record import auto_sync_all_devices
-from app.features.background.daily_refresh_oldest import daily_refresh_oldest
-from app.features.background.scheduler import start_scheduler, stop_scheduler
-from app.features.background.save_alarm import AlarmSupervisor
+from app.features.background.duties import start_background_duties, stop_background_duties
+from app.features.alarm_nofi.ingest_queue import alarm_ingest_queue
+from app.core.constants import RUN_BACKGROUND_DUTIES_IN_API
 from app.core.http_client import close_http_client
 from app.core.logger import setup_logger
 
@@ -41,35 +38,23 @@ if not HLS_DIR:
 # =========================
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    supervisor = AlarmSupervisor()
-    #bg auto sync time
-    sync_task = asyncio.create_task(sync_background_worker())
-    # Bắt alert steam
-    asyncio.create_task(supervisor.run())
-
-    # chạy sync ngay khi start
-    
-    # 2 cái này là cái scheduler nhưng active ngay 1 lần khi start/restart server BE 
-    await auto_sync_all_devices()
-    
-    await daily_refresh_oldest()
-
-    # scheduler để cập nhật data monitor mỗi /5p và cập nhật data monitor ngày cũ nhất mỗi 1h sáng 
-    start_scheduler()
-    logger.info("AUTO SYNC (data) STARTED")
+    # mỗi duty chỉ chạy ở 1 process (pg advisory lock), process chết thì process khác nhận
+    # RUN_BACKGROUND_DUTIES_IN_API=false → duty chạy ở worker riêng (python -m app.worker)
+    if RUN_BACKGROUND_DUTIES_IN_API:
+        start_background_duties()
+        logger.info("BACKGROUND DUTIES STARTED (waiting for leases)")
+    else:
+        logger.info("BACKGROUND DUTIES DISABLED IN API PROCESS")
+
+    # alarm push mode (POST /api/alarm/push/...) ghi qua queue của process này
+    alarm_ingest_queue.start()
 
     yield
 
     # shutdown
-    stop_scheduler()
+    await stop_background_duties()
     await close_http_client()
 
-    sync_task.cancel()
-    try:
-        await sync_task
-    except asyncio.CancelledError:
-        logger.info("AUTO SYNC CANCELLED")
-
 # =========================
 # APP
 # =========================
@@ -11,6 +11,9 @@ from app.api.device_user_permission import router as device_user_permission_rout
 from app.api.live import router as live_router
 from app.api.channels import router as channels_router
 from app.api.alarm import router as alarm_router
+from app.api.alarm_push import router as alarm_push_router
+from app.api.jobs import router as jobs_router
+from app.api.health import router as health_router
 
 api_router = APIRouter()
 api_router.include_router(auth_router)
@@ -25,3 +28,6 @@ api_router.include_router(device_user_permission_router)
 api_router.include_router(live_router)
 api_router.include_router(channels_router)
 api_router.include_router(alarm_router)
+api_router.include_router(alarm_push_router)
+api_router.include_router(jobs_router)
+api_router.include_router(health_router)
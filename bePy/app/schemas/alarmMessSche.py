@@ -18,3 +18,12 @@ class AlarmPage(BaseModel):
     next_cursor_time: datetime | None
     next_cursor_id: int | None
     has_more: bool
+
+
+class AlarmModeUpdate(BaseModel):
+    device_ids: list[int]
+    # pull | push
+    mode: str
+    # địa chỉ server mà device push tới, mặc định ALARM_PUSH_HOST / ALARM_PUSH_PORT
+    host: Optional[str] = None
+    port: Optional[int] = None
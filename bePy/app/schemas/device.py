@@ -32,6 +32,7 @@ class DeviceOut(BaseModel):
     username: str
     brand: str
     is_checked: bool
+    alarm_mode: str = "pull"
 
     class Config:
         from_attributes = True
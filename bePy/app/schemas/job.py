@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Optional
+
+
+class JobCreate(BaseModel):
+    job_type: str
+    params: dict[str, Any] = {}
+
+
+class JobOut(BaseModel):
+    id: int
+    job_type: str
+    status: str
+    params: dict[str, Any]
+    progress_done: int
+    progress_total: Optional[int]
+    progress_message: Optional[str]
+    cancel_requested: bool
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class JobResultOut(BaseModel):
+    id: int
+    status: str
+    result: Optional[Any]
+    error: Optional[str]
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,165 @@
+"""
+Cache metadata channel theo device (channel_no → id, name, connected_type, is_active)
+
+Dùng chung cho alarm (tên channel trong message) và hot sync record (danh sách channel active):
+- load bằng AsyncSession, nhiều request miss cùng lúc chỉ chạy 1 query / device
+- chỗ nào sửa / xóa channel thì gọi `await invalidate_on_commit(db, device_id)`:
+  + tăng devices.channels_version trong cùng transaction
+  + cache của process hiện tại bị xóa ngay sau khi transaction commit (rollback thì bỏ qua)
+- process khác (uvicorn worker / scheduler): sau CHANNEL_CACHE_REVALIDATE_SECONDS entry được
+  đối chiếu lại với devices.channels_version (1 query theo PK), khác version thì load lại
+- dù version không đổi, entry vẫn hết hạn hẳn sau CHANNEL_CACHE_TTL_SECONDS
+  (phòng chỗ sửa channel quên gọi invalidate_on_commit)
+"""
+import asyncio
+import time
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from app.db.session import AsyncSessionLocal
+from app.Models.channel import Channel
+from app.Models.device import Device
+from app.core.constants import CHANNEL_CACHE_TTL_SECONDS, CHANNEL_CACHE_REVALIDATE_SECONDS
+
+# key trong Session.info: device_id cần invalidate khi commit
+_PENDING_INVALIDATE_KEY = "channel_cache_invalidate"
+
+
+class ChannelMetadataCache:
+    def __init__(
+        self,
+        ttl: float = CHANNEL_CACHE_TTL_SECONDS,
+        revalidate: float = CHANNEL_CACHE_REVALIDATE_SECONDS
+    ):
+        self.ttl = ttl
+        self.revalidate = revalidate
+
+        # device_id -> (expires_at, revalidate_at (monotonic), channels_version, {channel_no: metadata})
+        self._entries: dict[int, tuple[float, float, int, dict[int, dict]]] = {}
+        # device_id -> task đang load / revalidate (single-flight)
+        self._loading: dict[int, asyncio.Task] = {}
+        # tăng mỗi lần invalidate → load bắt đầu trước đó không được ghi vào cache
+        self._generation: dict[int, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.revalidations = 0
+        self.invalidations = 0
+
+    async def _load(self, device_id: int) -> dict[int, dict]:
+        generation = self._generation.get(device_id, 0)
+        entry = self._entries.get(device_id)
+
+        async with AsyncSessionLocal() as db:
+            # đọc version TRƯỚC channel: commit chen giữa thì lần revalidate sau thấy lệch và load lại
+            version = await db.scalar(
+                select(Device.channels_version).where(Device.id == device_id)
+            )
+            if version is None:
+                # device đã bị xóa
+                self._entries.pop(device_id, None)
+                return {}
+
+            now = time.monotonic()
+            if entry is not None and entry[0] > now and entry[2] == version:
+                # version không đổi → giữ channel cũ, chỉ lùi mốc revalidate
+                self.revalidations += 1
+                if self._generation.get(device_id, 0) == generation:
+                    self._entries[device_id] = (entry[0], now + self.revalidate, version, entry[3])
+                return entry[3]
+
+            result = await db.execute(
+                select(
+                    Channel.id,
+                    Channel.channel_no,
+                    Channel.name,
+                    Channel.connected_type,
+                    Channel.is_active
+                )
+                .where(Channel.device_id == device_id)
+            )
+            channels = {
+                row.channel_no: {
+                    "id": row.id,
+                    "channel_no": row.channel_no,
+                    "name": row.name,
+                    "connected_type": row.connected_type,
+                    "is_active": row.is_active,
+                }
+                for row in result
+            }
+
+        self.loads += 1
+        if self._generation.get(device_id, 0) == generation:
+            now = time.monotonic()
+            self._entries[device_id] = (now + self.ttl, now + self.revalidate, version, channels)
+        return channels
+
+    async def get_device_channels(self, device_id: int) -> dict[int, dict]:
+        """{channel_no: {id, channel_no, name, connected_type, is_active}} của device"""
+        entry = self._entries.get(device_id)
+        if entry is not None and min(entry[0], entry[1]) > time.monotonic():
+            self.hits += 1
+            return entry[3]
+
+        self.misses += 1
+        task = self._loading.get(device_id)
+        if task is None:
+            task = asyncio.create_task(self._load(device_id))
+            self._loading[device_id] = task
+            task.add_done_callback(
+                lambda done: self._loading.pop(device_id, None)
+                if self._loading.get(device_id) is done else None
+            )
+        # caller bị cancel không làm hỏng load của caller khác
+        return await asyncio.shield(task)
+
+    async def get_channel_name(self, device_id: int, channel_no: int) -> str | None:
+        channel = (await self.get_device_channels(device_id)).get(channel_no)
+        return channel["name"] if channel else None
+
+    def invalidate_device(self, device_id: int):
+        self.invalidations += 1
+        self._generation[device_id] = self._generation.get(device_id, 0) + 1
+        self._entries.pop(device_id, None)
+        self._loading.pop(device_id, None)
+
+    async def invalidate_on_commit(self, db, device_id: int):
+        """
+        Tăng devices.channels_version trong transaction của `db` (AsyncSession) để process khác biết,
+        và đánh dấu device cần invalidate local khi `db` commit.
+        """
+        await db.execute(
+            update(Device)
+            .where(Device.id == device_id)
+            .values(channels_version=Device.channels_version + 1)
+        )
+        db.info.setdefault(_PENDING_INVALIDATE_KEY, set()).add(device_id)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "loads": self.loads,
+            "revalidations": self.revalidations,
+            "invalidations": self.invalidations,
+        }
+
+
+channel_cache = ChannelMetadataCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_channels(session):
+    for device_id in session.info.pop(_PENDING_INVALIDATE_KEY, ()):
+        channel_cache.invalidate_device(device_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session):
+    session.info.pop(_PENDING_INVALIDATE_KEY, None)
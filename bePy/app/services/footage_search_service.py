@@ -0,0 +1,121 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, func, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.device import Device
+from app.Models.channel import Channel
+from app.Models.channel_record_day import ChannelRecordDay
+from app.Models.channel_record_time_range import ChannelRecordTimeRange
+from app.features.RecordInfo import coverage_store
+
+
+def _channel_filters(
+    query,
+    owner_superadmin_id: Optional[str],
+    device_ids: Optional[list[int]],
+    channel_ids: Optional[list[int]]
+):
+    if owner_superadmin_id is not None:
+        query = query.where(Device.owner_superadmin_id == owner_superadmin_id)
+    if device_ids:
+        query = query.where(Channel.device_id.in_(device_ids))
+    if channel_ids:
+        query = query.where(Channel.id.in_(channel_ids))
+    return query
+
+
+async def find_channels_with_footage(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    owner_superadmin_id: Optional[str] = None,
+    device_ids: Optional[list[int]] = None,
+    channel_ids: Optional[list[int]] = None
+) -> list[dict]:
+    """
+    Channel nào có record trong [start, end) - 1 query cho toàn bộ device của tenant.
+
+    Với coverage tsmultirange: lọc bằng && trên GiST index, phần giao
+    (coverage * window) tính ngay trong Postgres.
+    Với storage "rows": lọc overlap trên channel_record_time_ranges (không có GiST).
+
+    Trả về [{channel_id, device_id, channel_no, name, overlap_seconds,
+             first_start, last_end}] sắp theo device, channel_no.
+    """
+    # (channel_id) -> [(start, end)] phần giao với window
+    overlaps: dict[int, list[tuple[datetime, datetime]]] = defaultdict(list)
+    channels: dict[int, tuple] = {}
+
+    if coverage_store.reads_multirange():
+        window = func.tsmultirange(func.tsrange(start, end, literal("[)")))
+        query = (
+            select(
+                Channel.id,
+                Channel.device_id,
+                Channel.channel_no,
+                Channel.name,
+                ChannelRecordDay.coverage.op("*")(window).label("overlap")
+            )
+            .join(Channel, Channel.id == ChannelRecordDay.channel_id)
+            .join(Device, Device.id == Channel.device_id)
+            .where(
+                ChannelRecordDay.record_date >= start.date(),
+                ChannelRecordDay.record_date <= end.date(),
+                ChannelRecordDay.coverage.op("&&")(window)
+            )
+        )
+        query = _channel_filters(query, owner_superadmin_id, device_ids, channel_ids)
+
+        result = await db.execute(query)
+        for row in result:
+            channels[row.id] = (row.device_id, row.channel_no, row.name)
+            overlaps[row.id].extend(coverage_store.to_spans(row.overlap))
+    else:
+        query = (
+            select(
+                Channel.id,
+                Channel.device_id,
+                Channel.channel_no,
+                Channel.name,
+                ChannelRecordTimeRange.start_time,
+                ChannelRecordTimeRange.end_time
+            )
+            .join(ChannelRecordDay, ChannelRecordDay.id == ChannelRecordTimeRange.record_day_id)
+            .join(Channel, Channel.id == ChannelRecordDay.channel_id)
+            .join(Device, Device.id == Channel.device_id)
+            .where(
+                ChannelRecordDay.record_date >= start.date(),
+                ChannelRecordDay.record_date <= end.date(),
+                ChannelRecordTimeRange.start_time < end,
+                ChannelRecordTimeRange.end_time > start
+            )
+        )
+        query = _channel_filters(query, owner_superadmin_id, device_ids, channel_ids)
+
+        result = await db.execute(query)
+        for row in result:
+            channels[row.id] = (row.device_id, row.channel_no, row.name)
+            overlaps[row.id].append((max(row.start_time, start), min(row.end_time, end)))
+
+    matches = []
+    for channel_id, spans in overlaps.items():
+        spans = [(s, e) for s, e in spans if s < e]
+        if not spans:
+            continue
+
+        device_id, channel_no, name = channels[channel_id]
+        matches.append({
+            "channel_id": channel_id,
+            "device_id": device_id,
+            "channel_no": channel_no,
+            "name": name,
+            "overlap_seconds": int(sum((e - s).total_seconds() for s, e in spans)),
+            "first_start": min(s for s, _ in spans).isoformat(),
+            "last_end": max(e for _, e in spans).isoformat()
+        })
+
+    matches.sort(key=lambda m: (m["device_id"], m["channel_no"]))
+    return matches
@@ -0,0 +1,256 @@
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from datetime import date, datetime, time
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.Models.channel import Channel
+from app.Models.channel_record_day import ChannelRecordDay
+from app.Models.channel_record_time_range import ChannelRecordTimeRange
+from app.features.RecordInfo import intervals, coverage_store
+
+
+def _iso(value) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _month_rows_query(device_id: int, first_day: date, last_day: date):
+    """
+    record day LEFT JOIN time range của mọi channel thuộc device trong khoảng ngày,
+    sắp theo channel, ngày giảm dần, start_time
+    """
+    return (
+        select(
+            ChannelRecordDay.id,
+            ChannelRecordDay.channel_id,
+            ChannelRecordDay.record_date,
+            ChannelRecordDay.has_record,
+            ChannelRecordTimeRange.start_time,
+            ChannelRecordTimeRange.end_time
+        )
+        .join(Channel, Channel.id == ChannelRecordDay.channel_id)
+        .outerjoin(
+            ChannelRecordTimeRange,
+            ChannelRecordTimeRange.record_day_id == ChannelRecordDay.id
+        )
+        .where(
+            Channel.device_id == device_id,
+            ChannelRecordDay.record_date >= first_day,
+            ChannelRecordDay.record_date <= last_day
+        )
+        .order_by(
+            ChannelRecordDay.channel_id,
+            ChannelRecordDay.record_date.desc(),
+            ChannelRecordTimeRange.start_time
+        )
+    )
+
+
+def _month_coverage_query(device_id: int, first_day: date, last_day: date):
+    """record day (kèm coverage tsmultirange) của mọi channel thuộc device, 1 row / ngày"""
+    return (
+        select(
+            ChannelRecordDay.channel_id,
+            ChannelRecordDay.record_date,
+            ChannelRecordDay.has_record,
+            ChannelRecordDay.coverage
+        )
+        .join(Channel, Channel.id == ChannelRecordDay.channel_id)
+        .where(
+            Channel.device_id == device_id,
+            ChannelRecordDay.record_date >= first_day,
+            ChannelRecordDay.record_date <= last_day
+        )
+        .order_by(
+            ChannelRecordDay.channel_id,
+            ChannelRecordDay.record_date.desc()
+        )
+    )
+
+
+async def _iter_month_days(
+    db: AsyncSession,
+    device_id: int,
+    first_day: date,
+    last_day: date
+) -> AsyncIterator[tuple[int, date, bool, list[tuple[datetime, datetime]]]]:
+    """
+    Stream (channel_id, record_date, has_record, [(start, end)]) theo thứ tự
+    channel, ngày giảm dần - đọc từ coverage hoặc từ time range row
+    tùy RECORD_COVERAGE_STORAGE. Luôn chỉ 1 query.
+    """
+    if coverage_store.reads_multirange():
+        rows = await db.stream(_month_coverage_query(device_id, first_day, last_day))
+        async for row in rows:
+            yield (
+                row.channel_id,
+                row.record_date,
+                row.has_record,
+                coverage_store.to_spans(row.coverage)
+            )
+        return
+
+    rows = await db.stream(_month_rows_query(device_id, first_day, last_day))
+    current = None
+    last_day_id = None
+    async for row in rows:
+        if row.id != last_day_id:
+            if current is not None:
+                yield current
+            last_day_id = row.id
+            current = (row.channel_id, row.record_date, row.has_record, [])
+
+        if row.start_time is not None:
+            current[3].append((row.start_time, row.end_time))
+
+    if current is not None:
+        yield current
+
+
+async def get_device_month_timeline(
+    db: AsyncSession,
+    device_id: int,
+    first_day: date,
+    last_day: date,
+    columnar: bool = False
+) -> dict:
+    """
+    Channel + record day + time range của device trong [first_day, last_day].
+
+    Chỉ 2 query cố định bất kể số channel:
+      1. danh sách channel
+      2. record day + segment của mọi channel (_iter_month_days: coverage
+         tsmultirange hoặc LEFT JOIN time range, stream theo channel, ngày giảm dần)
+
+    columnar=False: shape cũ của /channels/month_data
+      { oldest_record_month, channels: [ {channel, record_days: [...]} ] }
+    columnar=True: các cột song song, time_ranges.day là index trong record_days
+      { oldest_record_month,
+        channels:    {id, channel_no, name, oldest_record_date, latest_record_date},
+        record_days: {channel_id, record_date, has_record},
+        time_ranges: {day, start_time, end_time} }
+    """
+    result = await db.execute(
+        select(Channel)
+        .where(Channel.device_id == device_id)
+        .order_by(Channel.id)
+    )
+    channels = result.scalars().all()
+
+    oldest_dates = [ch.oldest_record_date for ch in channels if ch.oldest_record_date]
+    oldest_record_month = min(oldest_dates).strftime("%Y-%m") if oldest_dates else None
+
+    days = _iter_month_days(db, device_id, first_day, last_day)
+
+    if columnar:
+        channel_cols = {
+            "id": [ch.id for ch in channels],
+            "channel_no": [ch.channel_no for ch in channels],
+            "name": [ch.name for ch in channels],
+            "oldest_record_date": [_iso(ch.oldest_record_date) for ch in channels],
+            "latest_record_date": [_iso(ch.latest_record_date) for ch in channels],
+        }
+        day_cols = {"channel_id": [], "record_date": [], "has_record": []}
+        range_cols = {"day": [], "start_time": [], "end_time": []}
+
+        async for channel_id, record_date, has_record, spans in days:
+            day_index = len(day_cols["record_date"])
+            day_cols["channel_id"].append(channel_id)
+            day_cols["record_date"].append(record_date.isoformat())
+            day_cols["has_record"].append(has_record)
+
+            for start, end in spans:
+                range_cols["day"].append(day_index)
+                range_cols["start_time"].append(start.isoformat())
+                range_cols["end_time"].append(end.isoformat())
+
+        return {
+            "oldest_record_month": oldest_record_month,
+            "channels": channel_cols,
+            "record_days": day_cols,
+            "time_ranges": range_cols,
+        }
+
+    days_by_channel: dict[int, list[dict]] = {ch.id: [] for ch in channels}
+    async for channel_id, record_date, has_record, spans in days:
+        days_by_channel.setdefault(channel_id, []).append({
+            "record_date": record_date.isoformat(),
+            "has_record": has_record,
+            "time_ranges": [
+                {
+                    "start_time": start.isoformat(),
+                    "end_time": end.isoformat()
+                }
+                for start, end in spans
+            ]
+        })
+
+    return {
+        "oldest_record_month": oldest_record_month,
+        "channels": [
+            {
+                "channel": {
+                    "id": ch.id,
+                    "channel_no": ch.channel_no,
+                    "name": ch.name,
+                    "oldest_record_date": _iso(ch.oldest_record_date),
+                    "latest_record_date": _iso(ch.latest_record_date)
+                },
+                "record_days": days_by_channel[ch.id]
+            }
+            for ch in channels
+        ]
+    }
+
+
+async def get_device_month_coverage(
+    db: AsyncSession,
+    device_id: int,
+    first_day: date,
+    last_day: date,
+    resolution_minutes: int
+) -> tuple[list[Channel], list[dict]]:
+    """
+    Độ phủ record dạng bitmap cho calendar / thanh timeline.
+
+    Trả về (channels, coverage) với coverage[i] ứng với channels[i]:
+      { "has_record_bits": int  (bit d-1 = ngày d của tháng có record),
+        "days": { date: bytes bitmap của ngày (xem intervals.coverage_bitmap) } }
+    """
+    result = await db.execute(
+        select(Channel)
+        .where(Channel.device_id == device_id)
+        .order_by(Channel.id)
+    )
+    channels = result.scalars().all()
+
+    slot_seconds = resolution_minutes * 60
+    slot_count = 86400 // slot_seconds
+
+    has_record_bits: dict[int, int] = defaultdict(int)
+    days_by_channel: dict[int, dict[date, bytes]] = defaultdict(dict)
+
+    async for channel_id, record_date, has_record, spans in _iter_month_days(
+        db, device_id, first_day, last_day
+    ):
+        if has_record:
+            has_record_bits[channel_id] |= 1 << (record_date.day - 1)
+        if not spans:
+            continue
+
+        day_start = intervals.to_epoch(datetime.combine(record_date, time(0, 0, 0)))
+        days_by_channel[channel_id][record_date] = intervals.coverage_bitmap(
+            intervals.from_spans(spans),
+            day_start,
+            slot_count,
+            slot_seconds
+        )
+
+    coverage = [
+        {
+            "has_record_bits": has_record_bits.get(ch.id, 0),
+            "days": days_by_channel.get(ch.id, {})
+        }
+        for ch in channels
+    ]
+    return channels, coverage
@@ -0,0 +1,76 @@
+"""
+Worker process chạy các duty background (scheduler, sync, alert stream, job queue)
+tách khỏi API → sync nặng / parse XML không làm chậm request của API.
+
+Chạy từ thư mục bePy:
+    uv run python -m app.worker
+    uv run python -m app.worker --duties alarm_stream,record_sync
+
+API chạy riêng với RUN_BACKGROUND_DUTIES_IN_API=false.
+Chạy nhiều worker cũng được: mỗi duty chỉ chạy ở 1 process (lease).
+"""
+import argparse
+import asyncio
+import signal
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.features.background.duties import (
+    BACKGROUND_DUTIES,
+    start_background_duties,
+    stop_background_duties
+)
+from app.core.http_client import close_http_client
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+async def run_worker(duties: list[str] | None = None):
+    stop_event = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows: không có add_signal_handler, Ctrl+C → KeyboardInterrupt
+            pass
+
+    start_background_duties(duties)
+    logger.info(f"WORKER STARTED: {duties or list(BACKGROUND_DUTIES)}")
+
+    try:
+        await stop_event.wait()
+    finally:
+        await stop_background_duties()
+        await close_http_client()
+        logger.info("WORKER STOPPED")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bePy background worker")
+    parser.add_argument(
+        "--duties",
+        help="danh sách duty, cách nhau bởi dấu phẩy (mặc định: tất cả): "
+             + ", ".join(BACKGROUND_DUTIES)
+    )
+    args = parser.parse_args()
+
+    duties = None
+    if args.duties:
+        duties = [name.strip() for name in args.duties.split(",") if name.strip()]
+        unknown = [name for name in duties if name not in BACKGROUND_DUTIES]
+        if unknown:
+            parser.error(f"unknown duties: {unknown}")
+
+    try:
+        asyncio.run(run_worker(duties))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark: parser alertStream theo bytes (app/features/alarm_nofi/alert_stream_parser.py)
+so với cách cũ (aiter_text + nối chuỗi + find + ElementTree cho từng event)
+
+Chạy từ thư mục bePy:
+    uv run python -m benchmarks.bench_alert_stream
+"""
+import random
+import timeit
+import xml.etree.ElementTree as ET
+
+from app.features.alarm_nofi.alert_stream_parser import AlertStreamParser
+
+
+# =========================
+# CÁCH CŨ (copy từ get_alarm trước khi đổi)
+# =========================
+
+XML_NS = {"ns": "http://www.hikvision.com/ver20/XMLSchema"}
+
+
+def legacy_parse(chunks: list[bytes]) -> list[dict]:
+    events = []
+    buffer = ""
+    for raw in chunks:
+        buffer += raw.decode("utf-8", "replace")
+        while True:
+            start = buffer.find("<EventNotificationAlert")
+            end = buffer.find("</EventNotificationAlert>")
+            if start == -1 or end == -1:
+                break
+            end += len("</EventNotificationAlert>")
+            xml_str = buffer[start:end]
+            buffer = buffer[end:]
+            try:
+                root = ET.fromstring(xml_str)
+            except ET.ParseError:
+                continue
+            events.append({
+                "eventType": root.findtext("ns:eventType", namespaces=XML_NS),
+                "eventState": root.findtext("ns:eventState", namespaces=XML_NS),
+                "channelID": root.findtext("ns:channelID", namespaces=XML_NS),
+                "dateTime": root.findtext("ns:dateTime", namespaces=XML_NS),
+                "ipAddress": root.findtext("ns:ipAddress", namespaces=XML_NS),
+            })
+    return events
+
+
+def fresh_parse(chunks: list[bytes], boundary: bytes) -> list[dict]:
+    parser = AlertStreamParser(boundary)
+    events = []
+    for raw in chunks:
+        events.extend(parser.feed(raw))
+    return events
+
+
+# =========================
+# DATA
+# =========================
+
+ALERT_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<EventNotificationAlert version="2.0" xmlns="http://www.hikvision.com/ver20/XMLSchema">
+<ipAddress>192.168.1.64</ipAddress>
+<portNo>80</portNo>
+<protocol>HTTP</protocol>
+<macAddress>44:19:b6:00:00:01</macAddress>
+<channelID>{channel}</channelID>
+<dateTime>2026-01-01T08:{minute:02d}:{second:02d}+07:00</dateTime>
+<activePostCount>{count}</activePostCount>
+<eventType>{event_type}</eventType>
+<eventState>{state}</eventState>
+<eventDescription>{event_type} alarm</eventDescription>
+<DetectionRegionList>
+<DetectionRegionEntry>
+<regionID>1</regionID>
+<sensitivityLevel>50</sensitivityLevel>
+</DetectionRegionEntry>
+</DetectionRegionList>
+<channelName>Camera {channel}</channelName>
+</EventNotificationAlert>
+"""
+
+
+def make_stream(n_events: int, image_every: int, seed: int = 1) -> list[bytes]:
+    """
+    Luồng multipart kiểu NVR: heartbeat videoloss inactive + event thật,
+    thỉnh thoảng kèm part ảnh JPEG, cắt thành chunk ngẫu nhiên 200-4000 byte
+    """
+    rng = random.Random(seed)
+    parts = []
+    for i in range(n_events):
+        body = ALERT_TEMPLATE.format(
+            channel=rng.randint(1, 32),
+            minute=i // 60 % 60,
+            second=i % 60,
+            count=i,
+            event_type=rng.choice(["videoloss", "videoloss", "VMD", "linedetection", "hdError"]),
+            state=rng.choice(["active", "inactive"]),
+        ).encode()
+        parts.append(
+            b"--boundary\r\n"
+            b'Content-Type: application/xml; charset="UTF-8"\r\n'
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n"
+            + body + b"\r\n"
+        )
+        if image_every and i % image_every == 0:
+            image = bytes(rng.getrandbits(8) for _ in range(20_000))
+            parts.append(
+                b"--boundary\r\n"
+                b"Content-Type: image/jpeg\r\n"
+                b"Content-Length: " + str(len(image)).encode() + b"\r\n\r\n"
+                + image + b"\r\n"
+            )
+
+    stream = b"".join(parts)
+    chunks = []
+    pos = 0
+    while pos < len(stream):
+        size = rng.randint(200, 4000)
+        chunks.append(stream[pos:pos + size])
+        pos += size
+    return chunks
+
+
+def main():
+    for n_events, image_every in ((2000, 0), (20000, 0), (2000, 50)):
+        chunks = make_stream(n_events, image_every)
+
+        fresh = fresh_parse(chunks, b"boundary")
+        assert len(fresh) == n_events
+
+        # cách cũ đọc cả part ảnh như text → chỉ so sánh khi không có ảnh
+        if not image_every:
+            legacy = legacy_parse(chunks)
+            assert legacy == fresh
+
+        runs = 3
+        t_legacy = timeit.timeit(lambda: legacy_parse(chunks), number=runs) / runs
+        t_fresh = timeit.timeit(lambda: fresh_parse(chunks, b"boundary"), number=runs) / runs
+
+        label = f"{n_events:>6} events" + (f" + jpeg/{image_every}" if image_every else "")
+        print(
+            f"{label:<24} | "
+            f"legacy {n_events / t_legacy:>10,.0f} ev/s | "
+            f"bytes {n_events / t_fresh:>10,.0f} ev/s | "
+            f"x{t_legacy / t_fresh:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark: interval engine NumPy (app/features/RecordInfo/intervals.py)
+so với cách cũ (RecordTimeRange từng segment + clip/merge bằng vòng lặp Python)
+
+Chạy từ thư mục bePy:
+    uv run python -m benchmarks.bench_intervals
+"""
+import random
+import timeit
+from datetime import date, datetime, time, timedelta
+
+from app.schemas.record import RecordTimeRange
+from app.features.RecordInfo import intervals
+
+
+# =========================
+# CÁCH CŨ (copy từ HikRecordService trước khi đổi)
+# =========================
+
+def legacy_clip_day(spans, day: date) -> list[RecordTimeRange]:
+    day_start = datetime.combine(day, time(0, 0, 0))
+    day_end = datetime.combine(day, time(23, 59, 59))
+
+    result = []
+    for start, end in spans:
+        if end <= day_start or start >= day_end:
+            continue
+        clipped_start = max(start, day_start)
+        clipped_end = min(end, day_end)
+        if clipped_start < clipped_end:
+            result.append(RecordTimeRange(start_time=clipped_start, end_time=clipped_end))
+    return result
+
+
+def legacy_merge(ranges: list[RecordTimeRange], gap_seconds: int = 5) -> list[RecordTimeRange]:
+    if not ranges:
+        return []
+
+    ranges = sorted(ranges, key=lambda r: r.start_time)
+    merged = []
+    tol = timedelta(seconds=gap_seconds)
+
+    for r in ranges:
+        if not merged:
+            merged.append(r)
+            continue
+        last = merged[-1]
+        if r.start_time <= last.end_time + tol:
+            last.end_time = max(last.end_time, r.end_time)
+        else:
+            merged.append(r)
+    return merged
+
+
+def legacy_month(iso_spans, days: list[date]) -> dict[date, list[RecordTimeRange]]:
+    spans = [
+        (datetime.fromisoformat(start), datetime.fromisoformat(end))
+        for start, end in iso_spans
+    ]
+    result = {}
+    for day in days:
+        merged = legacy_merge(legacy_clip_day(spans, day))
+        if merged:
+            result[day] = merged
+    return result
+
+
+# =========================
+# DATA
+# =========================
+
+def make_spans(first_day: date, n_days: int, per_day: int, seed: int = 1):
+    """
+    Segment ngẫu nhiên kiểu NVR (chuỗi ISO như trong CMSearch):
+    độ dài ngẫu nhiên ~ 1 ngày / per_day, khoảng hở 0-8s hoặc 5 phút
+    """
+    rng = random.Random(seed)
+    spans = []
+    cursor = datetime.combine(first_day, time(0, 0, 0)) - timedelta(minutes=30)
+    end_all = datetime.combine(first_day + timedelta(days=n_days), time(0, 0, 0))
+    max_length = max(2, 86400 // per_day)
+
+    while cursor < end_all:
+        length = timedelta(seconds=rng.randint(1, max_length))
+        spans.append((
+            cursor.strftime("%Y-%m-%dT%H:%M:%S"),
+            (cursor + length).strftime("%Y-%m-%dT%H:%M:%S")
+        ))
+        gap = rng.choice([0, 2, 5, 8, 300])
+        cursor = cursor + length + timedelta(seconds=gap)
+
+    rng.shuffle(spans)
+    return spans
+
+
+def main():
+    first_day = date(2026, 1, 1)
+    n_days = 31
+    days = [first_day + timedelta(days=i) for i in range(n_days)]
+
+    for per_day in (50, 300, 1500):
+        spans = make_spans(first_day, n_days, per_day)
+
+        legacy = legacy_month(spans, days)
+        fresh = {
+            day: intervals.to_ranges(arr)
+            for day, arr in intervals.split_by_day(
+                intervals.from_iso_spans(spans), days[0], days[-1]
+            ).items()
+        }
+        assert legacy.keys() == fresh.keys()
+        for day in legacy:
+            assert [(r.start_time, r.end_time) for r in legacy[day]] == \
+                   [(r.start_time, r.end_time) for r in fresh[day]], day
+
+        runs = 5
+        t_legacy = timeit.timeit(lambda: legacy_month(spans, days), number=runs) / runs
+        t_numpy = timeit.timeit(
+            lambda: {
+                day: intervals.to_ranges(arr)
+                for day, arr in intervals.split_by_day(
+                    intervals.from_iso_spans(spans), days[0], days[-1]
+                ).items()
+            },
+            number=runs
+        ) / runs
+
+        print(
+            f"{len(spans):>6} segments / {n_days} days | "
+            f"legacy {t_legacy * 1000:8.2f} ms | "
+            f"numpy {t_numpy * 1000:8.2f} ms | "
+            f"x{t_legacy / t_numpy:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.features.alarm_nofi import alarm
+
+
+def make_processor(monkeypatch):
+    signals = []
+    queue = SimpleNamespace(
+        running=True,
+        signal=lambda device_id, channel_no: signals.append((device_id, channel_no))
+    )
+
+    async def get_channel_name(device_id, channel_no):
+        return f"Camera {channel_no}"
+
+    monkeypatch.setattr(alarm, "channel_refresh_queue", queue)
+    monkeypatch.setattr(alarm.channel_cache, "get_channel_name", get_channel_name)
+
+    processor = alarm.AlarmEventProcessor(SimpleNamespace(id=3, ip_web="10.0.0.3"))
+    return processor, signals
+
+
+def process(processor, event_type, event_state, channel_id="1"):
+    return asyncio.run(processor.process({
+        "eventType": event_type,
+        "eventState": event_state,
+        "channelID": channel_id,
+    }))
+
+
+def test_recovery_alarm_without_prior_active_is_kept(monkeypatch):
+    # reconnect / restart: "inactive" tới mà không thấy "active" trước đó vẫn phải lưu + gửi webhook
+    processor, signals = make_processor(monkeypatch)
+
+    result = process(processor, "hdFull", "inactive")
+
+    assert result is not None
+    assert result["eventState"] == "inactive"
+    assert signals == []
+
+
+def test_repeated_active_alarm_is_debounced(monkeypatch):
+    processor, _ = make_processor(monkeypatch)
+
+    assert process(processor, "netBroken", "active") is not None
+    assert process(processor, "netBroken", "active") is None
+    assert process(processor, "netBroken", "inactive") is not None
+
+
+def test_refresh_only_on_state_transition(monkeypatch):
+    processor, signals = make_processor(monkeypatch)
+
+    # videoloss heartbeat "inactive": alarm vẫn đi qua, nhưng không refresh
+    assert process(processor, "videoloss", "inactive") is not None
+    assert signals == []
+
+    process(processor, "VMD", "active")
+    process(processor, "VMD", "active")
+    process(processor, "VMD", "inactive")
+    process(processor, "VMD", "inactive")
+
+    assert signals == [(3, 101), (3, 101)]
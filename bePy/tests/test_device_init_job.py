@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.features.jobs import handlers
+from app.features.jobs.queue import JobContext
+
+
+class FakeContext(JobContext):
+    def __init__(self, requeued: bool):
+        super().__init__(job_id=1, requeued=requeued)
+        self.messages = []
+
+    async def progress(self, done, total=None, message=None):
+        self.messages.append(message)
+
+
+class FakeRecordService:
+    def __init__(self):
+        self.calls = []
+
+    async def device_channels_init_data(self, db, device, max_chunks=None):
+        self.calls.append("init")
+        return True
+
+    async def backfill_device_record_data(self, db, device, max_chunks=None):
+        self.calls.append("backfill")
+        return True
+
+
+def run_device_init(monkeypatch, requeued: bool) -> FakeRecordService:
+    service = FakeRecordService()
+
+    async def get_device(db, device_id):
+        return SimpleNamespace(id=device_id)
+
+    async def has_checkpoint(db, device_id):
+        # device đã backfill xong từ trước: mọi channel đều có backfill_until
+        return True
+
+    monkeypatch.setattr(handlers, "get_device_or_404", get_device)
+    monkeypatch.setattr(handlers, "_has_backfill_checkpoint", has_checkpoint)
+    monkeypatch.setattr(handlers, "HikRecordService", lambda: service)
+
+    asyncio.run(handlers.run_device_init(None, {"device_id": 7}, FakeContext(requeued)))
+    return service
+
+
+def test_new_job_on_backfilled_device_runs_full_init(monkeypatch):
+    service = run_device_init(monkeypatch, requeued=False)
+    assert service.calls == ["init"]
+
+
+def test_requeued_job_resumes_backfill(monkeypatch):
+    service = run_device_init(monkeypatch, requeued=True)
+    assert service.calls == ["backfill"]
+
+
+def test_backfill_job_runs_until_done(monkeypatch):
+    results = iter([False, False, True])
+    calls = []
+
+    class BackfillService:
+        async def backfill_device_record_data(self, db, device, max_chunks=None):
+            calls.append(max_chunks)
+            return next(results)
+
+    async def get_device(db, device_id):
+        return SimpleNamespace(id=device_id)
+
+    monkeypatch.setattr(handlers, "get_device_or_404", get_device)
+    monkeypatch.setattr(handlers, "HikRecordService", BackfillService)
+
+    ctx = FakeContext(requeued=False)
+    result = asyncio.run(handlers.run_device_backfill(None, {"device_id": 7}, ctx))
+
+    assert calls == [1, 1, 1]
+    assert result == {"device_id": 7, "chunks": 3}
+    assert ctx.messages == ["backfill"] * 3
@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+from app.api import health
+from app.features.RecordInfo.refresh_queue import ChannelRefreshQueue
+
+
+class FakeConnection:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        return None
+
+
+class FakeEngine:
+    def connect(self):
+        return FakeConnection()
+
+
+def test_ready_reports_channel_refresh_stats(monkeypatch):
+    queue = ChannelRefreshQueue()
+    queue.running = True
+    queue.signal(1, 101)
+    queue.signal(1, 201)
+
+    monkeypatch.setattr(health, "async_engine", FakeEngine())
+    monkeypatch.setattr(health, "channel_refresh_queue", queue)
+
+    response = asyncio.run(health.ready())
+    body = json.loads(response.body)
+
+    assert response.status_code == 200
+    refresh = body["channel_refresh"]
+    assert refresh["running"] is True
+    assert refresh["in_flight"] == 0
+    assert refresh["pending"] == 2
+    assert refresh["signals"] == 2
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+import app.Models._init_  # noqa: F401  (đăng ký đủ model cho relationship của Channel)
+from app.features.RecordInfo import hikrecord
+
+
+class FakeResult:
+    def scalars(self):
+        return self
+
+    def all(self):
+        return []
+
+
+class FakeSession:
+    def __init__(self, events):
+        self.events = events
+        self.added = []
+
+    async def execute(self, statement, params=None):
+        self.events.append("select")
+        return FakeResult()
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def flush(self):
+        self.events.append("flush")
+        for i, obj in enumerate(self.added, start=1):
+            obj.id = i
+
+
+def test_reconcile_sync_locks_after_fetch_and_before_writes(monkeypatch):
+    events = []
+
+    async def get_channels(self, device, headers):
+        return [{"id": 101, "name": "Camera 01", "connected_type": "local"}]
+
+    async def fetch(self, device, sync_ranges, until, headers, sem):
+        events.append("fetch")
+        return {channel_no: [(until, False, [])] for channel_no in sync_ranges}
+
+    async def lock(db, device_id):
+        events.append("lock")
+
+    async def bulk_write(db, data_by_channel):
+        events.append("write")
+        return 1, {"inserted": 0, "updated": 0, "deleted": 0}
+
+    async def invalidate_on_commit(db, device_id):
+        events.append("invalidate")
+
+    monkeypatch.setattr(hikrecord.HikRecordService, "_get_channels", get_channels)
+    monkeypatch.setattr(hikrecord.HikRecordService, "_fetch_device_record_data", fetch)
+    monkeypatch.setattr(hikrecord, "lock_device_record_writes", lock)
+    monkeypatch.setattr(hikrecord, "bulk_write_channel_record_data", bulk_write)
+    monkeypatch.setattr(hikrecord.channel_cache, "invalidate_on_commit", invalidate_on_commit)
+    monkeypatch.setattr(hikrecord, "build_hik_auth", lambda device: {})
+    monkeypatch.setattr(
+        hikrecord,
+        "TimeProvider",
+        lambda: SimpleNamespace(now=lambda: SimpleNamespace(date=lambda: date(2026, 10, 18)))
+    )
+
+    db = FakeSession(events)
+    device = SimpleNamespace(id=5)
+
+    asyncio.run(hikrecord.HikRecordService().sync_device_channels_data_core(db, device))
+
+    # không ghi gì trước khi fetch NVR xong và lấy khóa ghi của device
+    assert events == ["select", "fetch", "lock", "flush", "invalidate", "write"]
+    assert db.added[0].last_sync_at is not None